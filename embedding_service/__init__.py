@@ -0,0 +1,14 @@
+"""
+Embedding layer shared by pdfs_qna_llm and github_qa.
+
+create_embeddings() returns an EmbeddingService: a langchain-compatible
+Embeddings object that batches requests, runs several batches
+concurrently, backs off on rate limits and caches vectors on disk by
+(model, text hash), so unchanged chunks are never embedded twice.
+EMBEDDING_BACKEND=local swaps OpenAI for deterministic offline vectors.
+"""
+from .cache import EmbeddingCache
+from .local import LocalEmbeddings
+from .service import EMBEDDING_BACKENDS, EmbeddingService, create_embeddings
+
+__all__ = ["EMBEDDING_BACKENDS", "EmbeddingCache", "EmbeddingService", "LocalEmbeddings", "create_embeddings"]
@@ -0,0 +1,116 @@
+import os
+import time
+import sqlite3
+import threading
+from array import array
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "ai-agents" / "embeddings.sqlite3"
+DEFAULT_CACHE_ENTRIES = 500_000
+PRUNE_EVERY = 10_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    used_at REAL NOT NULL,
+    PRIMARY KEY (model, text_hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS embeddings_used_at ON embeddings(used_at);
+"""
+
+# SQLite limits the number of ? parameters per statement
+LOOKUP_BATCH = 500
+
+
+class EmbeddingCache:
+    """Persistent LRU cache of embedding vectors keyed by (model, text hash)."""
+
+    def __init__(self, db_path=None, max_entries=None):
+        self.db_path = str(db_path or os.environ.get("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH))
+        self.max_entries = max_entries or int(os.environ.get("EMBEDDING_CACHE_SIZE", DEFAULT_CACHE_ENTRIES))
+        self._conn = None
+        self._lock = threading.RLock()
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, model, text_hashes):
+        """Cached vectors for the hashes that have one, as {text_hash: vector}."""
+        found = {}
+        text_hashes = list(text_hashes)
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(text_hashes), LOOKUP_BATCH):
+                part = text_hashes[i:i + LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(part))
+                rows = self.conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    (model, *part)
+                ).fetchall()
+                for text_hash, vector in rows:
+                    found[text_hash] = array("f", vector).tolist()
+                self.conn.executemany(
+                    "UPDATE embeddings SET used_at = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, text_hash) for text_hash, _ in rows]
+                )
+            self.conn.commit()
+            self.hits += len(found)
+            self.misses += len(text_hashes) - len(found)
+        return found
+
+    def put_many(self, model, vectors):
+        """Store {text_hash: vector} for model."""
+        now = time.time()
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, used_at) VALUES (?, ?, ?, ?)",
+                [(model, text_hash, array("f", vector).tobytes(), now) for text_hash, vector in vectors.items()]
+            )
+            previous = self._puts
+            self._puts += len(vectors)
+            if self._puts // PRUNE_EVERY != previous // PRUNE_EVERY:
+                self.prune()
+            self.conn.commit()
+
+    def prune(self):
+        """Evict least recently used entries beyond max_entries."""
+        with self._lock:
+            # Delete by key: a batch shares one used_at, so a cut-off by time would
+            # evict the whole tie group at the boundary
+            cursor = self.conn.execute(
+                "DELETE FROM embeddings WHERE (model, text_hash) IN ("
+                "SELECT model, text_hash FROM embeddings "
+                "ORDER BY used_at DESC, model, text_hash LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self.conn.commit()
+            return cursor.rowcount
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM embeddings")
+            self.conn.commit()
+
+    def stats(self):
+        with self._lock:
+            (entries,) = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            return {
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "path": self.db_path,
+            }
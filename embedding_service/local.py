@@ -0,0 +1,40 @@
+import re
+import math
+import hashlib
+
+DEFAULT_DIMENSIONS = 384
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class LocalEmbeddings:
+    """
+    Deterministic, offline embeddings by feature hashing.
+
+    Each lowercased word and word bigram is hashed to a dimension and a
+    sign; the counts are L2-normalized. Texts sharing vocabulary end up close,
+    which is enough for tests and offline runs. The same text always gives
+    the same vector, on any machine, with no network or model download.
+    """
+
+    def __init__(self, dimensions=DEFAULT_DIMENSIONS):
+        self.dimensions = dimensions
+        self.model = f"local-hash-{dimensions}"
+
+    def _features(self, text):
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        yield from tokens
+        yield from (f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+
+    def embed_query(self, text):
+        vector = [0.0] * self.dimensions
+        for feature in self._features(text):
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector))
+        if norm:
+            vector = [v / norm for v in vector]
+        return vector
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
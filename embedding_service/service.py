@@ -0,0 +1,155 @@
+import os
+import time
+import random
+import hashlib
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from langchain.embeddings.base import Embeddings
+except ImportError:  # only needed to be accepted as a langchain embedding
+    Embeddings = object
+
+from .cache import EmbeddingCache
+from .local import LocalEmbeddings
+
+EMBEDDING_BACKENDS = ("openai", "local")
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_RETRIES = 6
+BASE_DELAY = 1.0
+MAX_DELAY = 60.0
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def is_rate_limit(error):
+    """True for rate-limit (429) and overload errors worth waiting out."""
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(error, "http_status", None) or getattr(response, "status_code", None)
+    if status in (429, 503):
+        return True
+    name = type(error).__name__.lower()
+    return "ratelimit" in name or "rate limit" in str(error).lower()
+
+
+def retry_after(error):
+    """Seconds the server asked us to wait (Retry-After header), if any."""
+    headers = getattr(error, "headers", None) or getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after") or headers.get("Retry-After"))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+class EmbeddingService(Embeddings):
+    """
+    Embeddings front end with caching, batching and rate-limit backoff.
+
+    Texts are hashed, deduplicated and looked up in the persistent cache;
+    only the misses go to the backend, in batches of batch_size with up to
+    max_concurrency batches in flight. A rate-limited batch makes every
+    batch pause (honouring Retry-After, else exponential backoff with
+    jitter) before it is retried. Usable anywhere langchain expects an
+    Embeddings object (Chroma, vector store retrievers).
+    """
+
+    def __init__(self, backend, model=None, batch_size=DEFAULT_BATCH_SIZE, max_concurrency=DEFAULT_CONCURRENCY,
+                 cache=None, max_retries=DEFAULT_MAX_RETRIES):
+        self.backend = backend
+        self.model = model or getattr(backend, "model", None) or type(backend).__name__
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.cache = cache
+        self.max_retries = max_retries
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.retries = 0
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        hashes = [text_hash(text) for text in texts]
+        unique = dict(zip(hashes, texts))
+        vectors = self.cache.get_many(self.model, unique) if self.cache is not None else {}
+        missing = [h for h in unique if h not in vectors]
+        if missing:
+            batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+
+            def embed(batch):
+                embedded = dict(zip(batch, self._embed_batch([unique[h] for h in batch])))
+                if self.cache is not None:
+                    self.cache.put_many(self.model, embedded)
+                return embedded
+
+            if len(batches) == 1 or self.max_concurrency <= 1:
+                for batch in batches:
+                    vectors.update(embed(batch))
+            else:
+                with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as executor:
+                    for embedded in executor.map(embed, batches):
+                        vectors.update(embedded)
+        return [vectors[h] for h in hashes]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def _embed_batch(self, texts):
+        attempt = 0
+        while True:
+            # Another batch was rate limited: wait with it instead of piling on
+            delay = self._resume_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                vectors = self.backend.embed_documents(texts)
+                with self._lock:
+                    self.batches += 1
+                # Same float32 precision as the cache, so hits and misses agree exactly
+                return [array("f", vector).tolist() for vector in vectors]
+            except Exception as e:
+                if not is_rate_limit(e) or attempt >= self.max_retries:
+                    raise
+                wait = retry_after(e) or min(MAX_DELAY, BASE_DELAY * 2 ** attempt) * (0.5 + random.random())
+                attempt += 1
+                with self._lock:
+                    self.retries += 1
+                    self._resume_at = max(self._resume_at, time.monotonic() + wait)
+
+    def stats(self):
+        return {
+            "model": self.model,
+            "batches": self.batches,
+            "retries": self.retries,
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+
+def create_embeddings(backend=None, batch_size=None, max_concurrency=None, cache=True):
+    """
+    The shared embedding service, configured from the environment.
+
+    EMBEDDING_BACKEND selects openai (default) or local (deterministic,
+    offline); EMBEDDING_BATCH_SIZE, EMBEDDING_CONCURRENCY,
+    EMBEDDING_CACHE_PATH and EMBEDDING_CACHE_SIZE tune the rest.
+    """
+    backend = backend or os.environ.get("EMBEDDING_BACKEND", "openai")
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend}. Use one of: {', '.join(EMBEDDING_BACKENDS)}")
+    batch_size = batch_size or int(os.environ.get("EMBEDDING_BATCH_SIZE", DEFAULT_BATCH_SIZE))
+    max_concurrency = max_concurrency or int(os.environ.get("EMBEDDING_CONCURRENCY", DEFAULT_CONCURRENCY))
+    if backend == "local":
+        embeddings = LocalEmbeddings()
+    else:
+        from langchain.embeddings import OpenAIEmbeddings
+        # Retries are ours (shared backoff across batches), not the client's
+        embeddings = OpenAIEmbeddings(chunk_size=batch_size, max_retries=0)
+    return EmbeddingService(
+        embeddings,
+        batch_size=batch_size,
+        max_concurrency=max_concurrency,
+        cache=EmbeddingCache() if cache else None
+    )
@@ -20,6 +20,13 @@ def run_single_test(test_name):
         'batch': test_batch_operations,
         'organize': test_organize_by_extension,
         'resources': test_resources,
+        'index': test_metadata_index,
+        'invalidate': test_index_invalidation,
+        'duplicates': test_find_duplicates,
+        'usage': test_disk_usage,
+        'formats': test_compact_output,
+        'http': test_http_server,
+        'metrics': test_server_metrics,
         'errors': test_error_handling,
     }
 
@@ -44,6 +51,13 @@ def main():
         test_batch_operations()
         test_organize_by_extension()
         test_resources()
+        test_metadata_index()
+        test_index_invalidation()
+        test_find_duplicates()
+        test_disk_usage()
+        test_compact_output()
+        test_http_server()
+        test_server_metrics()
         test_error_handling()
 
 if __name__ == "__main__":
@@ -1,4 +1,12 @@
 """File Manager MCP Server."""
-from .main import mcp, list_files_and_folders, get_file_stats, search_files
 __version__ = "0.1.0"
-__all__ = ['mcp', 'list_files_and_folders', 'get_file_stats', 'search_files']
\ No newline at end of file
+__all__ = ['mcp', 'list_files_and_folders', 'get_file_stats', 'search_files']
+
+
+def __getattr__(name):
+    # The server (and fastmcp) is imported on first use, so the CLI and
+    # worker processes that only need helper modules start quickly
+    if name in __all__:
+        from . import main
+        return getattr(main, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,144 @@
+"""
+Execution engine for batch_operations.
+
+Operations are planned into a dependency graph and then run concurrently
+with a bounded number in flight. An operation waits for an earlier one only
+when they touch the same path, or one touches a path inside the other's,
+and at least one of them writes it. So two copies from the same source run
+together, a create_folder listed before copies into it runs first, and a
+delete waits for every earlier operation under the deleted folder.
+Operations keep the meaning they had when batches ran one by one.
+"""
+import os
+import asyncio
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+DEFAULT_BATCH_CONCURRENCY = 8
+ERROR_POLICIES = ("continue", "stop_on_error")
+
+# Paths each operation type touches: (parameter, writes)
+OPERATION_PATHS: Dict[str, Tuple[Tuple[str, bool], ...]] = {
+    "copy": (("source_path", False), ("target_path", True)),
+    "move": (("source_path", True), ("target_path", True)),
+    "delete": (("path", True),),
+    "create_folder": (("folder_path", True),),
+}
+
+Access = Tuple[str, bool]
+
+
+def operation_accesses(op_type: str, params: Dict[str, Any]) -> List[Access]:
+    """Resolved (path, writes) pairs an operation touches."""
+    accesses = []
+    for name, writes in OPERATION_PATHS.get(op_type, ()):
+        value = params.get(name)
+        if isinstance(value, str):
+            accesses.append((str(Path(value).expanduser().resolve()), writes))
+    return accesses
+
+
+def _ancestors(path: str) -> List[str]:
+    parents = []
+    parent = os.path.dirname(path)
+    while parent != path:
+        parents.append(parent)
+        path, parent = parent, os.path.dirname(parent)
+    return parents
+
+
+def plan_dependencies(accesses: Sequence[List[Access]]) -> List[Set[int]]:
+    """
+    For each operation, the earlier operations it must wait for.
+
+    Per path we remember the last writer and the readers since, and per
+    folder the reads and writes below it, so planning is linear in the
+    number of operations times path depth rather than quadratic.
+    """
+    last_write: Dict[str, int] = {}
+    reads: Dict[str, List[int]] = defaultdict(list)
+    writes_below: Dict[str, List[int]] = defaultdict(list)
+    reads_below: Dict[str, List[int]] = defaultdict(list)
+    dependencies: List[Set[int]] = []
+
+    for index, op_accesses in enumerate(accesses):
+        deps: Set[int] = set()
+        for path, writes in op_accesses:
+            for node in [path, *_ancestors(path)]:
+                if node in last_write:
+                    deps.add(last_write[node])
+                if writes:
+                    deps.update(reads.get(node, ()))
+            deps.update(writes_below.get(path, ()))
+            if writes:
+                deps.update(reads_below.get(path, ()))
+        deps.discard(index)
+        dependencies.append(deps)
+
+        for path, writes in op_accesses:
+            ancestors = _ancestors(path)
+            if writes:
+                # Everything recorded at or below path is now ordered before us
+                last_write[path] = index
+                reads.pop(path, None)
+                writes_below.pop(path, None)
+                reads_below.pop(path, None)
+                for node in ancestors:
+                    writes_below[node].append(index)
+            else:
+                reads[path].append(index)
+                for node in ancestors:
+                    reads_below[node].append(index)
+    return dependencies
+
+
+async def run_graph(
+    dependencies: Sequence[Set[int]],
+    run_one: Callable[[int], Awaitable[Dict[str, Any]]],
+    concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    stop_on_error: bool = False,
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Run operations as their dependencies complete, at most `concurrency` at once.
+
+    run_one returns an operation result dict (failed when it has no
+    "success"). With stop_on_error no new operation starts after a failure;
+    operations already running finish, and the ones never started are left
+    as None in the returned list.
+    """
+    count = len(dependencies)
+    waiting = [len(deps) for deps in dependencies]
+    dependents: Dict[int, List[int]] = defaultdict(list)
+    for index, deps in enumerate(dependencies):
+        for dep in deps:
+            dependents[dep].append(index)
+
+    results: List[Optional[Dict[str, Any]]] = [None] * count
+    ready = deque(i for i in range(count) if waiting[i] == 0)
+    running: Dict[asyncio.Task, int] = {}
+    stopped = False
+    concurrency = max(1, concurrency)
+
+    try:
+        while ready or running:
+            while ready and len(running) < concurrency and not stopped:
+                index = ready.popleft()
+                running[asyncio.ensure_future(run_one(index))] = index
+            if not running:
+                break
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index = running.pop(task)
+                results[index] = task.result()
+                if stop_on_error and not results[index].get("success"):
+                    stopped = True
+                for dependent in dependents[index]:
+                    waiting[dependent] -= 1
+                    if waiting[dependent] == 0:
+                        ready.append(dependent)
+    finally:
+        for task in running:
+            task.cancel()
+    return results
+
@@ -0,0 +1,414 @@
+"""
+Benchmark harness for the file manager tools.
+
+A synthetic tree (breadth x depth folders, files per folder, a size
+distribution and a fixed seed) is generated once, then each scenario is
+timed for a number of iterations:
+
+- in-process: the tool functions are awaited directly
+- stdio: a `file_manager_cli serve` subprocess is driven over JSON-RPC,
+  which adds serialization and transport overhead, as real clients see it
+- startup: cold-start latency of fresh processes (bare interpreter,
+  `file_manager_cli stats` on one file, importing the server, and a stdio
+  server answering initialize), since the CLI and per-session servers pay
+  it on every invocation
+
+The report is JSON: per scenario and mode the iteration count, latency
+percentiles (first, p50, p99, mean, min, max in ms), throughput in
+calls/s and files/s, and peak RSS of the process that ran the tools.
+"""
+import os
+import sys
+import json
+import time
+import math
+import random
+import shutil
+import platform
+import resource
+import tempfile
+import subprocess
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+SCENARIOS = ("list", "list_compact", "search", "content_search", "stats", "batch", "organize")
+MODES = ("inprocess", "stdio", "startup")
+SIZE_DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+EXTENSIONS = (".txt", ".py", ".md", ".json", ".log", ".csv")
+WORDS = (
+    "alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel",
+    "india", "juliet", "kilo", "lima", "mike", "november", "oscar", "papa",
+)
+NEEDLE = "benchmark-needle"
+
+
+def generate_tree(
+    root: str,
+    breadth: int = 4,
+    depth: int = 3,
+    files_per_dir: int = 20,
+    size_distribution: str = "lognormal",
+    mean_size: int = 4096,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Create a synthetic tree of text files under root.
+
+    Every 10th file contains NEEDLE so content searches have matches.
+    Returns a description of the tree (folders, files, bytes).
+    """
+    if size_distribution not in SIZE_DISTRIBUTIONS:
+        raise ValueError(f"Unknown size distribution: {size_distribution}. Use one of: {', '.join(SIZE_DISTRIBUTIONS)}")
+    rng = random.Random(seed)
+
+    def next_size() -> int:
+        if size_distribution == "fixed":
+            return mean_size
+        if size_distribution == "uniform":
+            return rng.randint(0, 2 * mean_size)
+        # lognormal with the requested mean: many small files, a few large ones
+        sigma = 1.0
+        return int(rng.lognormvariate(max(0.0, math.log(mean_size) - sigma ** 2 / 2), sigma))
+
+    folders = [root]
+    frontier = [root]
+    for _ in range(depth):
+        next_frontier = []
+        for parent in frontier:
+            for index in range(breadth):
+                folder = os.path.join(parent, f"dir_{index}")
+                next_frontier.append(folder)
+        folders.extend(next_frontier)
+        frontier = next_frontier
+
+    total_files = 0
+    total_bytes = 0
+    for folder in folders:
+        os.makedirs(folder, exist_ok=True)
+        for index in range(files_per_dir):
+            size = next_size()
+            words = []
+            length = 0
+            while length < size:
+                word = NEEDLE if total_files % 10 == 0 and not words else rng.choice(WORDS)
+                words.append(word)
+                length += len(word) + 1
+            text = " ".join(words)[:size]
+            text = "\n".join(text[i:i + 80] for i in range(0, len(text), 80))
+            path = os.path.join(folder, f"file_{index}{EXTENSIONS[index % len(EXTENSIONS)]}")
+            with open(path, "w") as f:
+                f.write(text)
+            total_files += 1
+            total_bytes += len(text)
+
+    return {
+        "root": root,
+        "breadth": breadth,
+        "depth": depth,
+        "files_per_dir": files_per_dir,
+        "size_distribution": size_distribution,
+        "mean_size": mean_size,
+        "seed": seed,
+        "folders": len(folders),
+        "files": total_files,
+        "bytes": total_bytes,
+    }
+
+
+def scenario_calls(scenario: str, tree: Dict[str, Any], work_dir: str, iteration: int) -> Tuple[List[Tuple[str, Dict[str, Any]]], int]:
+    """Tool calls making up one iteration of a scenario, and the files they touch."""
+    root = tree["root"]
+    files = tree["files"]
+    sample = [
+        os.path.join(root, "dir_0" if tree["depth"] else "", f"file_{i}{EXTENSIONS[i % len(EXTENSIONS)]}")
+        for i in range(min(tree["files_per_dir"], 20))
+    ]
+    if scenario == "list":
+        return [("list_files_and_folders", {"folder_path": root, "recursive": True, "mime_mode": "extension"})], files
+    if scenario == "list_compact":
+        return [("list_files_and_folders", {
+            "folder_path": root, "recursive": True, "mime_mode": "extension", "output_format": "compact"
+        })], files
+    if scenario == "search":
+        return [("search_files", {"search_path": root, "name_pattern": "*.py"})], files
+    if scenario == "content_search":
+        return [("search_files", {"search_path": root, "content_search": NEEDLE, "limit": 100})], files
+    if scenario == "stats":
+        return [("get_file_stats", {"file_path": path}) for path in sample], len(sample)
+    if scenario == "batch":
+        target = os.path.join(work_dir, f"batch_{iteration}")
+        operations = [{"type": "create_folder", "params": {"folder_path": target}}] + [
+            {"type": "copy", "params": {"source_path": path, "target_path": os.path.join(target, f"{i}_{os.path.basename(path)}")}}
+            for i, path in enumerate(sample)
+        ]
+        return [("batch_operations", {"operations": operations})], len(sample)
+    if scenario == "organize":
+        target = os.path.join(work_dir, f"organize_{iteration}")
+        return [("organize_by_extension", {"source_dir": root, "target_dir": target})], files
+    raise ValueError(f"Unknown scenario: {scenario}. Use one of: {', '.join(SCENARIOS)}")
+
+
+def summarize(latencies: List[float], files_per_iteration: int, calls_per_iteration: int) -> Dict[str, Any]:
+    """Latency percentiles (ms) and throughput for one scenario."""
+    ordered = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    total = sum(latencies)
+    return {
+        "iterations": len(latencies),
+        "first_ms": round(latencies[0] * 1000, 3),
+        "p50_ms": round(percentile(50) * 1000, 3),
+        "p99_ms": round(percentile(99) * 1000, 3),
+        "mean_ms": round(total / len(latencies) * 1000, 3),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+        "calls_per_second": round(calls_per_iteration * len(latencies) / total, 3) if total else None,
+        "files_per_second": round(files_per_iteration * len(latencies) / total, 3) if total else None,
+    }
+
+
+def peak_rss_kb() -> int:
+    """Peak resident set size of this process in KiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class StdioServer:
+    """A file manager server subprocess driven over newline-delimited JSON-RPC."""
+
+    def __init__(self, env: Optional[Dict[str, str]] = None):
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "file_manager.cli", "serve"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+            env={**os.environ, **(env or {})},
+        )
+        self._next_id = 0
+        self.request("initialize", {
+            "protocolVersion": "2024-11-05",
+            "capabilities": {},
+            "clientInfo": {"name": "file-manager-benchmark", "version": "0.1.0"},
+        })
+        self.notify("notifications/initialized")
+
+    def notify(self, method: str, params: Optional[Dict[str, Any]] = None) -> None:
+        self.process.stdin.write(json.dumps({"jsonrpc": "2.0", "method": method, "params": params or {}}) + "\n")
+        self.process.stdin.flush()
+
+    def request(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        self._next_id += 1
+        request_id = self._next_id
+        self.process.stdin.write(json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}) + "\n")
+        self.process.stdin.flush()
+        while True:
+            line = self.process.stdout.readline()
+            if not line:
+                raise RuntimeError("Server closed the connection")
+            message = json.loads(line)
+            if message.get("id") == request_id:
+                if "error" in message:
+                    raise RuntimeError(f"{method} failed: {message['error']}")
+                return message["result"]
+
+    def call_tool(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        return self.request("tools/call", {"name": name, "arguments": arguments})
+
+    def peak_rss_kb(self) -> Optional[int]:
+        try:
+            with open(f"/proc/{self.process.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        return None
+
+    def close(self) -> None:
+        self.process.stdin.close()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+def _check(name: str, result: Dict[str, Any]) -> None:
+    if isinstance(result, dict) and "error" in result:
+        raise RuntimeError(f"{name} failed: {result['error']}")
+
+
+STORAGE_FILES = {
+    "FILE_MANAGER_INDEX_PATH": "index.sqlite3",
+    "FILE_MANAGER_CONTENT_INDEX_PATH": "content_index.sqlite3",
+    "FILE_MANAGER_DIGEST_CACHE_PATH": "digests.sqlite3",
+}
+
+
+@contextmanager
+def isolated_storage(env: Dict[str, str]) -> Iterator[None]:
+    """Point this process's indexes and digest cache at the benchmark's files, restoring them after."""
+    from .digest import digest_cache
+    from .index import metadata_index
+    from .trigram import trigram_index
+
+    stores = {
+        "FILE_MANAGER_INDEX_PATH": metadata_index,
+        "FILE_MANAGER_CONTENT_INDEX_PATH": trigram_index,
+        "FILE_MANAGER_DIGEST_CACHE_PATH": digest_cache,
+    }
+    saved_env = {key: os.environ.get(key) for key in env}
+    saved = {key: (store.db_path, store._conn) for key, store in stores.items()}
+    os.environ.update(env)
+    # The stores were created at import time, so repoint them as well
+    for key, store in stores.items():
+        with store._lock:
+            store.db_path, store._conn = env[key], None
+    try:
+        yield
+    finally:
+        for key, store in stores.items():
+            with store._lock:
+                if store._conn is not None:
+                    store._conn.close()
+                store.db_path, store._conn = saved[key]
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+async def run_inprocess(scenarios: List[str], tree: Dict[str, Any], work_dir: str, iterations: int) -> Dict[str, Any]:
+    from . import main as server
+
+    results = {}
+    for scenario in scenarios:
+        latencies = []
+        for iteration in range(iterations):
+            calls, touched = scenario_calls(scenario, tree, work_dir, iteration)
+            started = time.perf_counter()
+            for name, arguments in calls:
+                _check(name, await server.call_tool_fn(getattr(server, name), arguments))
+            latencies.append(time.perf_counter() - started)
+        results[scenario] = summarize(latencies, touched, len(calls))
+    results["peak_rss_kb"] = peak_rss_kb()
+    return results
+
+
+def run_stdio(scenarios: List[str], tree: Dict[str, Any], work_dir: str, iterations: int, env: Dict[str, str]) -> Dict[str, Any]:
+    server = StdioServer(env)
+    results = {}
+    try:
+        for scenario in scenarios:
+            latencies = []
+            for iteration in range(iterations):
+                calls, touched = scenario_calls(scenario, tree, work_dir, iteration + iterations)
+                started = time.perf_counter()
+                for name, arguments in calls:
+                    response = server.call_tool(name, arguments)
+                    if response.get("isError"):
+                        raise RuntimeError(f"{name} failed: {response.get('content')}")
+                    structured = response.get("structuredContent")
+                    if structured is not None:
+                        _check(name, structured.get("result", structured))
+                latencies.append(time.perf_counter() - started)
+            results[scenario] = summarize(latencies, touched, len(calls))
+        results["peak_rss_kb"] = server.peak_rss_kb()
+    finally:
+        server.close()
+    return results
+
+
+def run_startup(tree: Dict[str, Any], iterations: int, env: Dict[str, str]) -> Dict[str, Any]:
+    """Time fresh processes from spawn to exit (or to the initialize response)."""
+    sample = os.path.join(tree["root"], f"file_0{EXTENSIONS[0]}")
+    commands = {
+        "python": [sys.executable, "-c", "pass"],
+        "cli_stats": [sys.executable, "-m", "file_manager.cli", "stats", sample],
+        "import_server": [sys.executable, "-c", "import file_manager.main"],
+    }
+    results = {}
+    for name, command in commands.items():
+        latencies = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            subprocess.run(command, env={**os.environ, **env}, stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL, check=True)
+            latencies.append(time.perf_counter() - started)
+        results[name] = summarize(latencies, 1, 1)
+
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        server = StdioServer(env)
+        latencies.append(time.perf_counter() - started)
+        server.close()
+    results["stdio_initialize"] = summarize(latencies, 1, 1)
+    return results
+
+
+def run_benchmark(
+    root: Optional[str] = None,
+    scenarios: Optional[List[str]] = None,
+    modes: Optional[List[str]] = None,
+    iterations: int = 5,
+    keep: bool = False,
+    **tree_options: Any,
+) -> Dict[str, Any]:
+    """Generate a tree, run the scenarios in each mode and return the JSON report."""
+    import asyncio
+    scenarios = list(scenarios or SCENARIOS)
+    modes = list(modes or MODES)
+    for scenario in scenarios:
+        if scenario not in SCENARIOS:
+            raise ValueError(f"Unknown scenario: {scenario}. Use one of: {', '.join(SCENARIOS)}")
+    for mode in modes:
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode: {mode}. Use one of: {', '.join(MODES)}")
+
+    base = Path(root) if root else Path(tempfile.mkdtemp(prefix="file_manager_bench_"))
+    tree_root = base / "tree"
+    work_dir = base / "work"
+    # Keep caches and indexes (in-process and in subprocesses) out of the user's home
+    env = {key: str(base / name) for key, name in STORAGE_FILES.items()}
+    try:
+        started = time.perf_counter()
+        tree = generate_tree(str(tree_root), **tree_options)
+        tree["generate_seconds"] = round(time.perf_counter() - started, 3)
+        work_dir.mkdir(parents=True, exist_ok=True)
+
+        report: Dict[str, Any] = {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "iterations": iterations,
+            "tree": tree,
+            "results": {},
+        }
+        if "inprocess" in modes:
+            with isolated_storage(env):
+                report["results"]["inprocess"] = asyncio.run(
+                    run_inprocess(scenarios, tree, str(work_dir), iterations)
+                )
+        if "stdio" in modes:
+            report["results"]["stdio"] = run_stdio(scenarios, tree, str(work_dir), iterations, env)
+        if "startup" in modes:
+            report["results"]["startup"] = run_startup(tree, iterations, env)
+        return report
+    finally:
+        if not keep and root is None:
+            shutil.rmtree(base, ignore_errors=True)
+        elif not keep:
+            # A caller's --root may hold other files: remove only what the run created
+            shutil.rmtree(tree_root, ignore_errors=True)
+            shutil.rmtree(work_dir, ignore_errors=True)
+            for path in env.values():
+                for suffix in ("", "-wal", "-shm"):
+                    Path(path + suffix).unlink(missing_ok=True)
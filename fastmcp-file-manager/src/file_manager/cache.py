@@ -0,0 +1,102 @@
+"""
+Shared result cache for resource reads.
+
+Results are cached per key together with a validator (e.g. a file's
+(dev, inode, size, mtime, ctime) or a folder's mtime): an entry is reused
+only while its validator still matches and it is younger than a short TTL,
+which bounds staleness the validator cannot see (a file inside a listed
+folder changing size). Concurrent requests for the same key and validator
+share one computation instead of each running the tool.
+"""
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+DEFAULT_CACHE_ENTRIES = 4096
+DEFAULT_TTL = 2.0
+
+
+class ResultCache:
+    """Async LRU cache with validators, TTL and request coalescing."""
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_ENTRIES, ttl: float = DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[Hashable, float, Any]]" = OrderedDict()
+        self._pending: Dict[Tuple[Hashable, Hashable], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key: Hashable, validator: Hashable) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        cached_validator, stored_at, value = entry
+        if cached_validator != validator or time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        validator: Hashable,
+        compute: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """
+        Return the cached value for key, or compute and cache it.
+
+        Error results ({"error": ...}) are returned but not cached.
+        """
+        found, value = self._lookup(key, validator)
+        if found:
+            self.hits += 1
+            return value
+
+        pending_key = (key, validator)
+        future = self._pending.get(pending_key)
+        if future is None:
+            self.misses += 1
+            future = asyncio.ensure_future(compute())
+            self._pending[pending_key] = future
+            future.add_done_callback(lambda _: self._pending.pop(pending_key, None))
+        else:
+            self.hits += 1
+        value = await asyncio.shield(future)
+
+        if not (isinstance(value, dict) and "error" in value):
+            self._entries[key] = (validator, time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def stat_validator(path: str) -> Optional[Tuple[int, int, int, int, int]]:
+    """A file's identity and version, or None when it cannot be stat'ed."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns)
+
+
+resource_cache = ResultCache(
+    int(os.environ.get("FILE_MANAGER_RESOURCE_CACHE_SIZE", DEFAULT_CACHE_ENTRIES)),
+    float(os.environ.get("FILE_MANAGER_RESOURCE_CACHE_TTL", DEFAULT_TTL)),
+)
@@ -1,10 +1,18 @@
 """CLI interface for the file manager."""
 import argparse
-import json
+import os
 import sys
-import asyncio
 from pathlib import Path
-from .main import mcp, list_files_and_folders, get_file_stats, search_files
+from .benchmark import MODES, SCENARIOS, SIZE_DISTRIBUTIONS, run_benchmark
+from .digest import DIGEST_ALGORITHMS, set_default_algorithm
+from .duplicates import DUPLICATE_ACTIONS
+from .formats import OUTPUT_FORMATS, dumps
+from .http_server import HTTP_TRANSPORTS, HttpSettings, serve_http
+from .pools import DISK_KINDS, pools
+from .usage import USAGE_SORT_KEYS
+from .mime import MIME_MODES, set_default_mime_mode
+
+# The server module (and fastmcp) is only imported by the commands that need it
 
 def cli():
     """Command line interface."""
@@ -16,10 +24,23 @@ def cli():
     list_parser.add_argument("path", help="Directory path")
     list_parser.add_argument("--recursive", "-r", action="store_true", help="List recursively")
     list_parser.add_argument("--group", "-g", action="store_true", help="Group by extension")
+    list_parser.add_argument("--mime-mode", choices=MIME_MODES, default=None,
+                             help="MIME detection: off, extension or content")
+    list_parser.add_argument("--aggregate", action="store_true",
+                             help="Only report group aggregates, not their files")
+    list_parser.add_argument("--limit", type=int, default=None, help="Page size")
+    list_parser.add_argument("--cursor", default=None, help="Cursor from a previous page")
+    list_parser.add_argument("--format", choices=OUTPUT_FORMATS, default="verbose",
+                             help="Entry encoding: verbose records, or a compact/columnar table")
+    list_parser.add_argument("--human", action="store_true",
+                             help="Add humanized sizes and dates to compact/columnar output")
     
     # Stats command
     stats_parser = subparsers.add_parser("stats", help="Get file statistics")
     stats_parser.add_argument("path", help="File path")
+    stats_parser.add_argument("--algorithm", "-a", choices=DIGEST_ALGORITHMS, default=None,
+                              help="Digest algorithm")
+    stats_parser.add_argument("--no-cache", action="store_true", help="Always re-read the file")
     
     # Search command
     search_parser = subparsers.add_parser("search", help="Search files")
@@ -27,40 +48,252 @@ def cli():
     search_parser.add_argument("--pattern", "-p", help="Filename pattern")
     search_parser.add_argument("--content", "-c", help="Search content")
     search_parser.add_argument("--extension", "-e", help="File extension")
+    search_parser.add_argument("--term", "-t", action="append", help="Additional content pattern (repeatable)")
+    search_parser.add_argument("--all", action="store_true", help="Require all content patterns to match")
+    search_parser.add_argument("--regex", action="store_true", help="Treat content patterns as regexes")
+    search_parser.add_argument("--max-results", type=int, default=None, help="Stop after this many matching files")
+    search_parser.add_argument("--max-matches", type=int, default=5, help="Matching lines reported per file")
+    search_parser.add_argument("--context", "-C", type=int, default=0, help="Lines of context around matches")
+    search_parser.add_argument("--concurrency", type=int, default=None,
+                               help="Files scanned in parallel for content search (default 8)")
+    search_parser.add_argument("--limit", type=int, default=None, help="Page size")
+    search_parser.add_argument("--cursor", default=None, help="Cursor from a previous page")
+    search_parser.add_argument("--format", choices=OUTPUT_FORMATS, default="verbose",
+                               help="Result encoding: verbose records, or a compact/columnar table")
+    search_parser.add_argument("--human", action="store_true",
+                               help="Add humanized sizes to compact/columnar output")
+    
+    # Duplicates command
+    duplicates_parser = subparsers.add_parser("duplicates", help="Find duplicate files")
+    duplicates_parser.add_argument("path", help="Search directory")
+    duplicates_parser.add_argument("--extension", "-e", help="File extension")
+    duplicates_parser.add_argument("--min-size", type=int, default=1, help="Ignore smaller files (bytes)")
+    duplicates_parser.add_argument("--hidden", action="store_true", help="Include hidden files")
+    duplicates_parser.add_argument("--algorithm", "-a", choices=DIGEST_ALGORITHMS, default=None,
+                                   help="Digest algorithm")
+    duplicates_parser.add_argument("--action", choices=DUPLICATE_ACTIONS, default="report",
+                                   help="Replace duplicates with hardlinks or reflinks")
+    duplicates_parser.add_argument("--execute", action="store_true",
+                                   help="Perform the link action (default is a dry run)")
+    duplicates_parser.add_argument("--limit", type=int, default=None, help="Maximum groups to show")
+    
+    # Disk usage command
+    du_parser = subparsers.add_parser("du", help="Show the biggest subfolders")
+    du_parser.add_argument("path", help="Directory path")
+    du_parser.add_argument("--depth", "-d", type=int, default=1, help="Deepest subfolder level to report")
+    du_parser.add_argument("--top", "-n", type=int, default=20, help="Number of subfolders to show")
+    du_parser.add_argument("--sort", choices=USAGE_SORT_KEYS, default="size", help="Rank subfolders by")
+    du_parser.add_argument("--hidden", action="store_true", help="Include hidden files")
+    
+    # Benchmark command
+    benchmark_parser = subparsers.add_parser("benchmark", help="Time the tools on a synthetic tree")
+    benchmark_parser.add_argument("--root", default=None, help="Where to generate the tree (default: a temp dir)")
+    benchmark_parser.add_argument("--breadth", type=int, default=4, help="Subfolders per folder")
+    benchmark_parser.add_argument("--depth", type=int, default=3, help="Folder nesting depth")
+    benchmark_parser.add_argument("--files", type=int, default=20, help="Files per folder")
+    benchmark_parser.add_argument("--size-dist", choices=SIZE_DISTRIBUTIONS, default="lognormal",
+                                  help="File size distribution")
+    benchmark_parser.add_argument("--mean-size", type=int, default=4096, help="Mean file size in bytes")
+    benchmark_parser.add_argument("--seed", type=int, default=0, help="Random seed for the tree")
+    benchmark_parser.add_argument("--iterations", "-n", type=int, default=5, help="Timed runs per scenario")
+    benchmark_parser.add_argument("--mode", choices=MODES + ("both", "all"), default="both",
+                                  help="Call the tools in-process, over stdio JSON-RPC, or both; "
+                                       "startup times process cold starts")
+    benchmark_parser.add_argument("--scenario", action="append", choices=SCENARIOS,
+                                  help="Scenario to run (repeatable, default: all)")
+    benchmark_parser.add_argument("--output", "-o", default=None, help="Write the JSON report to this file")
+    benchmark_parser.add_argument("--keep", action="store_true", help="Keep the generated tree")
     
     # Serve command
     serve_parser = subparsers.add_parser("serve", help="Start MCP server")
-    serve_parser.add_argument("--transport", default="stdio", choices=["stdio", "sse"], 
-                             help="Transport protocol")
+    serve_parser.add_argument("--transport", default="stdio", choices=("stdio",) + HTTP_TRANSPORTS,
+                             help="Transport protocol (http is streamable HTTP)")
+    serve_parser.add_argument("--mime-mode", choices=MIME_MODES, default=None,
+                             help="Default MIME detection mode for tool calls")
+    serve_parser.add_argument("--digest-algorithm", choices=DIGEST_ALGORITHMS, default=None,
+                             help="Default digest algorithm for get_file_stats")
+    serve_parser.add_argument("--io-workers", type=int, default=None,
+                             help="Threads for filesystem work (default: sized by disk kind)")
+    serve_parser.add_argument("--cpu-workers", type=int, default=None,
+                             help="Processes for hashing/scanning (0 runs them on the io threads)")
+    serve_parser.add_argument("--disk-kind", choices=DISK_KINDS, default=None,
+                             help="Size the io pool for this disk kind instead of probing /sys")
+    serve_parser.add_argument("--metrics-export", default=None,
+                             help="Export metrics to prometheus:<file> or otlp:<collector url>")
+    serve_parser.add_argument("--metrics-interval", type=float, default=None,
+                             help="Seconds between metrics exports (default 15)")
+    http_defaults = HttpSettings()
+    serve_parser.add_argument("--host", default=http_defaults.host, help="HTTP bind address")
+    serve_parser.add_argument("--port", type=int, default=http_defaults.port, help="HTTP port")
+    serve_parser.add_argument("--path", default=None, help="HTTP endpoint path (default /mcp)")
+    serve_parser.add_argument("--workers", type=int, default=http_defaults.workers,
+                             help="HTTP worker processes (more than 1 implies --stateless)")
+    serve_parser.add_argument("--keep-alive", type=int, default=http_defaults.keep_alive,
+                             help="Seconds idle HTTP connections are kept open")
+    serve_parser.add_argument("--concurrency", type=int, default=None,
+                             help="Maximum concurrent HTTP requests per worker (503 beyond it)")
+    serve_parser.add_argument("--gzip-min-size", type=int, default=http_defaults.gzip_min_size,
+                             help="Compress HTTP responses of at least this many bytes (-1 disables)")
+    serve_parser.add_argument("--gzip-level", type=int, default=http_defaults.gzip_level,
+                             help="gzip compression level 1-9 (0 disables)")
+    serve_parser.add_argument("--json-response", action=argparse.BooleanOptionalAction,
+                             default=http_defaults.json_response,
+                             help="Answer with plain JSON (compressible) instead of an SSE stream; "
+                                  "streamed tool results need --no-json-response")
+    serve_parser.add_argument("--stateless", action="store_true",
+                             help="No HTTP session state (each request stands alone)")
+    serve_parser.add_argument("--graceful-timeout", type=float, default=http_defaults.graceful_timeout,
+                             help="Seconds to finish in-flight requests and pool work on shutdown")
     
     args = parser.parse_args()
     
     if args.command == "list":
+        import asyncio
+        from .main import list_files_and_folders
         result = asyncio.run(list_files_and_folders.fn(
             folder_path=args.path,
             recursive=args.recursive,
             group_by_extension=args.group,
             include_hidden=False,
             sort_by="name",
-            sort_order="asc"
+            sort_order="asc",
+            mime_mode=args.mime_mode,
+            use_index=True,
+            group_files=not args.aggregate,
+            limit=args.limit,
+            cursor=args.cursor,
+            stream=False,
+            chunk_size=500,
+            output_format=args.format,
+            human_readable=args.human
         ))
-        print(json.dumps(result, indent=2))
+        print(dumps(result, indent=True))
         
     elif args.command == "stats":
-        result = asyncio.run(get_file_stats.fn(args.path))
-        print(json.dumps(result, indent=2))
+        from .stats import file_stats
+        result = file_stats(args.path, args.algorithm, use_cache=not args.no_cache)
+        print(dumps(result, indent=True))
         
     elif args.command == "search":
+        import asyncio
+        from .content_search import DEFAULT_CONCURRENCY
+        from .main import search_files
         result = asyncio.run(search_files.fn(
             search_path=args.path,
             name_pattern=args.pattern,
             content_search=args.content,
-            extension=args.extension
+            content_terms=args.term,
+            match_mode="all" if args.all else "any",
+            regex=args.regex,
+            extension=args.extension,
+            min_size=None,
+            max_size=None,
+            recursive=True,
+            case_sensitive=False,
+            modified_after=None,
+            modified_before=None,
+            use_index=True,
+            limit=args.limit,
+            cursor=args.cursor,
+            stream=False,
+            chunk_size=100,
+            concurrency=args.concurrency or DEFAULT_CONCURRENCY,
+            max_results=args.max_results,
+            max_matches_per_file=args.max_matches,
+            context_lines=args.context,
+            output_format=args.format,
+            human_readable=args.human
         ))
-        print(json.dumps(result, indent=2))
+        print(dumps(result, indent=True))
+        
+    elif args.command == "duplicates":
+        import asyncio
+        from .main import find_duplicates
+        result = asyncio.run(find_duplicates.fn(
+            search_path=args.path,
+            recursive=True,
+            include_hidden=args.hidden,
+            extension=args.extension,
+            min_size=args.min_size,
+            algorithm=args.algorithm,
+            use_index=True,
+            action=args.action,
+            dry_run=not args.execute,
+            limit=args.limit
+        ))
+        print(dumps(result, indent=True))
+        
+    elif args.command == "du":
+        import asyncio
+        from .main import disk_usage
+        result = asyncio.run(disk_usage.fn(
+            folder_path=args.path,
+            max_depth=args.depth,
+            top_n=args.top,
+            sort_by=args.sort,
+            include_hidden=args.hidden,
+            refresh=False
+        ))
+        print(dumps(result, indent=True))
+        
+    elif args.command == "benchmark":
+        report = run_benchmark(
+            root=args.root,
+            scenarios=args.scenario,
+            modes={"both": ["inprocess", "stdio"], "all": list(MODES)}.get(args.mode, [args.mode]),
+            iterations=args.iterations,
+            keep=args.keep,
+            breadth=args.breadth,
+            depth=args.depth,
+            files_per_dir=args.files,
+            size_distribution=args.size_dist,
+            mean_size=args.mean_size,
+            seed=args.seed
+        )
+        if args.output:
+            Path(args.output).write_text(dumps(report, indent=True))
+        print(dumps(report, indent=True))
         
     elif args.command == "serve":
-        mcp.run(transport=args.transport)
+        from .main import mcp, start_metrics_exporter, stop_metrics_exporter
+        if args.mime_mode:
+            set_default_mime_mode(args.mime_mode)
+        if args.digest_algorithm:
+            set_default_algorithm(args.digest_algorithm)
+        pools.configure(io_workers=args.io_workers, cpu_workers=args.cpu_workers, disk_kind=args.disk_kind)
+        if args.transport in HTTP_TRANSPORTS:
+            # HTTP worker processes pick the server options up from the environment
+            options = {
+                "FILE_MANAGER_MIME_MODE": args.mime_mode,
+                "FILE_MANAGER_DIGEST_ALGORITHM": args.digest_algorithm,
+                "FILE_MANAGER_IO_WORKERS": args.io_workers,
+                "FILE_MANAGER_CPU_WORKERS": args.cpu_workers,
+                "FILE_MANAGER_DISK_KIND": args.disk_kind,
+                "FILE_MANAGER_METRICS_EXPORT": args.metrics_export,
+                "FILE_MANAGER_METRICS_INTERVAL": args.metrics_interval,
+            }
+            os.environ.update({key: str(value) for key, value in options.items() if value is not None})
+            serve_http(HttpSettings(
+                transport=args.transport,
+                host=args.host,
+                port=args.port,
+                path=args.path,
+                workers=args.workers,
+                keep_alive=args.keep_alive,
+                concurrency=args.concurrency,
+                gzip_min_size=args.gzip_min_size,
+                gzip_level=args.gzip_level,
+                json_response=args.json_response,
+                stateless=args.stateless,
+                graceful_timeout=args.graceful_timeout
+            ))
+            return
+        start_metrics_exporter(args.metrics_export, args.metrics_interval)
+        try:
+            mcp.run(transport=args.transport)
+        finally:
+            stop_metrics_exporter()
+            pools.shutdown()
         
     else:
         parser.print_help()
@@ -0,0 +1,245 @@
+"""
+Content search engine used by search_files.
+
+Files are memory-mapped and scanned with a precompiled bytes matcher (one or
+more literals or regexes, any/all), so nothing is decoded or lowercased up
+front; only matching lines and their context are decoded. Binary files are
+skipped after sniffing their first block. Files are fanned out across a worker
+pool with a bounded number in flight, and results are yielded in candidate
+order so callers can stop early (pagination, max_results) without scanning
+the rest of the tree.
+"""
+import re
+import mmap
+import asyncio
+from collections import deque
+from functools import lru_cache
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+SNIFF_BYTES = 8192
+MAX_LINE_BYTES = 1000
+COUNT_CHUNK = 1 << 20
+DEFAULT_CONCURRENCY = 8
+
+T = TypeVar("T")
+
+
+def _casefold_literal(text: str) -> bytes:
+    """Regex source matching text case-insensitively, including non-ASCII letters.
+
+    re.IGNORECASE only folds ASCII for bytes patterns, so other letters are
+    spelled out as (?:lower|upper) alternatives of their UTF-8 encodings.
+    """
+    parts = []
+    for char in text:
+        variants = {char, char.lower(), char.upper()}
+        if len(variants) == 1 or char.isascii():
+            parts.append(re.escape(char.encode('utf-8')))
+        else:
+            alternatives = b"|".join(re.escape(v.encode('utf-8')) for v in sorted(variants))
+            parts.append(b"(?:" + alternatives + b")")
+    return b"".join(parts)
+
+
+@lru_cache(maxsize=64)
+def compile_matcher(
+    patterns: Tuple[str, ...],
+    case_sensitive: bool = False,
+    regex: bool = False,
+) -> "re.Pattern[bytes]":
+    """Compile literal or regex patterns to one bytes regex matching any of them (cached per process)."""
+    sources = []
+    for pattern in patterns:
+        if regex:
+            sources.append(pattern.encode('utf-8'))
+        elif case_sensitive:
+            sources.append(re.escape(pattern.encode('utf-8')))
+        else:
+            sources.append(_casefold_literal(pattern))
+    source = sources[0] if len(sources) == 1 else b"|".join(b"(?:" + s + b")" for s in sources)
+    # The whole file is searched at once, so ^ and $ must anchor at each line
+    flags = re.MULTILINE if case_sensitive else re.MULTILINE | re.IGNORECASE
+    return re.compile(source, flags)
+
+
+def is_binary(block: bytes) -> bool:
+    """Treat a block containing NUL bytes as binary (the same heuristic grep uses)."""
+    return b"\0" in block
+
+
+def _find_spans(data, patterns: Tuple[str, ...], case_sensitive: bool, regex: bool) -> Iterator[Tuple[int, int]]:
+    if case_sensitive and not regex and len(patterns) == 1:
+        # Plain substring search is much faster than the regex engine
+        needle = patterns[0].encode('utf-8')
+        start = data.find(needle)
+        while start != -1:
+            yield start, start + len(needle)
+            start = data.find(needle, start + 1)
+    else:
+        for match in compile_matcher(patterns, case_sensitive, regex).finditer(data):
+            if match.start() != match.end():  # ignore empty regex matches
+                yield match.start(), match.end()
+
+
+def _contains_all(data, patterns: Tuple[str, ...], case_sensitive: bool, regex: bool) -> bool:
+    return all(next(_find_spans(data, (p,), case_sensitive, regex), None) for p in patterns)
+
+
+def _count_newlines(data, start: int, end: int) -> int:
+    count = 0
+    for chunk_start in range(start, end, COUNT_CHUNK):
+        count += data[chunk_start:min(end, chunk_start + COUNT_CHUNK)].count(b"\n")
+    return count
+
+
+def _decode(raw: bytes) -> str:
+    return raw.decode('utf-8', errors='replace').rstrip("\r")
+
+
+def _line_bounds(data, position: int) -> Tuple[int, int]:
+    start = data.rfind(b"\n", 0, position) + 1
+    end = data.find(b"\n", position)
+    return start, len(data) if end == -1 else end
+
+
+def _context(data, line_start: int, line_end: int, lines: int) -> Tuple[List[str], List[str]]:
+    before = []
+    position = line_start
+    while len(before) < lines and position > 0:
+        start, end = _line_bounds(data, position - 1)
+        before.insert(0, _decode(data[start:end][:MAX_LINE_BYTES]))
+        position = start
+    after = []
+    position = line_end
+    while len(after) < lines and position < len(data):
+        start, end = _line_bounds(data, position + 1)
+        if start >= len(data):
+            break
+        after.append(_decode(data[start:end][:MAX_LINE_BYTES]))
+        position = end
+    return before, after
+
+
+def scan_file(
+    path: str,
+    patterns: Tuple[str, ...],
+    case_sensitive: bool = False,
+    regex: bool = False,
+    match_all: bool = False,
+    max_matches: int = 5,
+    context: int = 20,
+    context_lines: int = 0,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Scan one file for patterns and describe the first matching lines.
+
+    Each match is a dict with line_number, line, context_before,
+    context_after and a short snippet of `context` bytes around the match.
+    With match_all the file only matches when every pattern occurs in it.
+
+    Returns None for binary, empty or unreadable files and an empty list when
+    the file does not match. Arguments are plain values so the function can
+    run in a thread or process pool.
+    """
+    if max_matches < 1:
+        raise ValueError("max_matches must be at least 1")
+    try:
+        with open(path, "rb") as f:
+            if is_binary(f.read(SNIFF_BYTES)):
+                return None
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                return None  # empty file
+    except OSError:
+        return None
+
+    with data:
+        if match_all and len(patterns) > 1 and not _contains_all(data, patterns, case_sensitive, regex):
+            return []
+
+        found = []
+        line_number = 1
+        counted_to = 0
+        last_line_start = -1
+        for start, end in _find_spans(data, patterns, case_sensitive, regex):
+            line_start, line_end = _line_bounds(data, start)
+            if line_start == last_line_start:
+                continue  # one entry per matching line, like grep
+            last_line_start = line_start
+            line_number += _count_newlines(data, counted_to, line_start)
+            counted_to = line_start
+
+            line = data[line_start:line_end]
+            if len(line) > MAX_LINE_BYTES:
+                window_start = max(line_start, start - MAX_LINE_BYTES // 2)
+                line = data[window_start:window_start + MAX_LINE_BYTES]
+            before, after = _context(data, line_start, line_end, context_lines)
+            snippet = data[max(0, start - context):end + context]
+            found.append({
+                "line_number": line_number,
+                "line": _decode(line),
+                "context_before": before,
+                "context_after": after,
+                "snippet": f"...{snippet.decode('utf-8', errors='replace')}...",
+            })
+            if len(found) >= max_matches:
+                break
+        return found
+
+
+async def scan_files(
+    candidates: AsyncIterable[T],
+    path_of: Callable[[T], str],
+    run: Callable,
+    patterns: Tuple[str, ...],
+    case_sensitive: bool = False,
+    regex: bool = False,
+    match_all: bool = False,
+    max_matches: int = 5,
+    context: int = 20,
+    context_lines: int = 0,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    size_of: Optional[Callable[[T], int]] = None,
+) -> AsyncIterator[Tuple[T, List[Dict[str, Any]]]]:
+    """
+    Scan candidates concurrently, yielding (candidate, matches) for matching files in order.
+
+    At most `concurrency` files are in flight on the pool behind `run`. When
+    size_of is given, run is called as run(size, scan_file, ...) so it can
+    pick a pool per file. Closing the generator early cancels the scans that
+    have not started yet.
+    """
+    window: "deque[Tuple[T, asyncio.Future]]" = deque()
+    concurrency = max(1, concurrency)
+    # Fail fast on invalid arguments instead of once per file in the pool
+    if max_matches < 1:
+        raise ValueError("max_matches must be at least 1")
+    compile_matcher(patterns, case_sensitive, regex)
+
+    def submit(candidate: T) -> None:
+        args = (
+            scan_file, path_of(candidate), patterns, case_sensitive, regex,
+            match_all, max_matches, context, context_lines
+        )
+        if size_of is not None:
+            args = (size_of(candidate), *args)
+        future = asyncio.ensure_future(run(*args))
+        window.append((candidate, future))
+
+    try:
+        async for candidate in candidates:
+            submit(candidate)
+            if len(window) >= concurrency:
+                done, future = window.popleft()
+                matches = await future
+                if matches:
+                    yield done, matches
+        while window:
+            done, future = window.popleft()
+            matches = await future
+            if matches:
+                yield done, matches
+    finally:
+        for _, future in window:
+            future.cancel()
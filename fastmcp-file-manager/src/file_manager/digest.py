@@ -0,0 +1,254 @@
+"""
+File digests for get_file_stats (and anything else that hashes files).
+
+A file is read exactly once, in large buffers, and that single pass feeds
+the digest, the line count and the sample used for encoding detection.
+Results are stored in a persistent SQLite cache keyed by
+(device, inode, size, mtime_ns, algorithm), so repeat stats on an
+unchanged file cost one stat and one index lookup no matter its size.
+
+Algorithms: md5, sha256 and blake2b come from hashlib; xxhash (much faster,
+not cryptographic) is used when the optional xxhash package is installed.
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+try:
+    import xxhash
+except ImportError:  # optional
+    xxhash = None
+
+DIGEST_ALGORITHMS = ("md5", "sha256", "blake2b", "xxhash")
+DEFAULT_DIGEST_CACHE_PATH = Path.home() / ".cache" / "file_manager" / "digests.sqlite3"
+DEFAULT_CACHE_ENTRIES = 100_000
+READ_BUFFER_SIZE = 1 << 20
+ENCODING_SAMPLE_BYTES = 10_000
+PRUNE_EVERY = 1000
+
+# md5 stays the default so get_file_stats keeps reporting md5_hash
+_default_algorithm = os.environ.get("FILE_MANAGER_DIGEST_ALGORITHM", "md5")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS digests (
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    algorithm TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    line_count INTEGER NOT NULL,
+    encoding TEXT,
+    used_at REAL NOT NULL,
+    PRIMARY KEY (dev, ino, size, mtime_ns, algorithm)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS digests_used_at ON digests(used_at);
+"""
+
+
+class FileDigest(NamedTuple):
+    """Everything derived from one read of a file."""
+    algorithm: str
+    digest: str
+    line_count: int
+    encoding: Optional[str]
+    cached: bool
+
+
+def available_algorithms() -> Tuple[str, ...]:
+    """Algorithms usable in this process (xxhash needs the optional package)."""
+    return tuple(a for a in DIGEST_ALGORITHMS if a != "xxhash" or xxhash is not None)
+
+
+def resolve_algorithm(algorithm: Optional[str] = None) -> str:
+    """Return the effective algorithm, falling back to the server default."""
+    algorithm = (algorithm or _default_algorithm).lower()
+    if algorithm not in DIGEST_ALGORITHMS:
+        raise ValueError(f"Unknown digest algorithm: {algorithm}. Use one of: {', '.join(DIGEST_ALGORITHMS)}")
+    if algorithm == "xxhash" and xxhash is None:
+        raise ValueError("The xxhash algorithm requires the xxhash package (pip install xxhash)")
+    return algorithm
+
+
+def set_default_algorithm(algorithm: str) -> None:
+    """Set the server-wide digest algorithm used when a call does not pass one."""
+    global _default_algorithm
+    _default_algorithm = resolve_algorithm(algorithm)
+
+
+def new_hasher(algorithm: str):
+    """A hashlib-style object with update()/hexdigest() for a resolved algorithm."""
+    if algorithm == "xxhash":
+        return xxhash.xxh3_128()
+    return hashlib.new(algorithm)
+
+
+def _detect_encoding(sample: bytes) -> Optional[str]:
+    try:
+        import chardet
+        return chardet.detect(sample)['encoding']
+    except Exception:
+        return None
+
+
+def compute_digest(path: str, algorithm: str, buffer_size: int = READ_BUFFER_SIZE) -> Tuple[FileDigest, os.stat_result, bool]:
+    """
+    Read a file once and derive its digest, line count and encoding guess.
+
+    Returns the digest, the stat of the open file, and whether the file was
+    left unchanged while it was read (only then is the result cacheable).
+    """
+    hasher = new_hasher(algorithm)
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    newlines = 0
+    last_byte = b"\n"
+    sample = b""
+
+    with open(path, "rb", buffering=0) as f:
+        before = os.fstat(f.fileno())
+        if hasattr(os, "posix_fadvise"):
+            try:
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            except OSError:
+                pass
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            chunk = view[:read]
+            hasher.update(chunk)  # hashlib releases the GIL for large buffers
+            newlines += buffer.count(b"\n", 0, read)
+            last_byte = buffer[read - 1:read]
+            if len(sample) < ENCODING_SAMPLE_BYTES:
+                sample += bytes(chunk[:ENCODING_SAMPLE_BYTES - len(sample)])
+        after = os.fstat(f.fileno())
+
+    # A trailing line without a newline still counts, as with text iteration
+    line_count = newlines + (1 if last_byte != b"\n" else 0)
+    unchanged = (before.st_size, before.st_mtime_ns) == (after.st_size, after.st_mtime_ns)
+    digest = FileDigest(algorithm, hasher.hexdigest(), line_count, _detect_encoding(sample), False)
+    return digest, before, unchanged
+
+
+class DigestCache:
+    """Persistent cache of file digests keyed by file identity and version."""
+
+    def __init__(self, db_path: Optional[str] = None, max_entries: Optional[int] = None):
+        self.db_path = str(db_path or os.environ.get("FILE_MANAGER_DIGEST_CACHE_PATH", DEFAULT_DIGEST_CACHE_PATH))
+        self.max_entries = max_entries or int(os.environ.get("FILE_MANAGER_DIGEST_CACHE_SIZE", DEFAULT_CACHE_ENTRIES))
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def key(stat: os.stat_result, algorithm: str) -> Tuple[int, int, int, int, str]:
+        return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns, algorithm)
+
+    def get(self, stat: os.stat_result, algorithm: str) -> Optional[FileDigest]:
+        key = self.key(stat, algorithm)
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT digest, line_count, encoding FROM digests "
+                "WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ? AND algorithm = ?",
+                key
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute(
+                "UPDATE digests SET used_at = ? "
+                "WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ? AND algorithm = ?",
+                (time.time(), *key)
+            )
+            self.conn.commit()
+            self.hits += 1
+        digest, line_count, encoding = row
+        return FileDigest(algorithm, digest, line_count, encoding, True)
+
+    def put(self, stat: os.stat_result, digest: FileDigest) -> None:
+        with self._lock:
+            # Older versions of the same inode can never be hit again
+            self.conn.execute(
+                "DELETE FROM digests WHERE dev = ? AND ino = ? AND algorithm = ?",
+                (stat.st_dev, stat.st_ino, digest.algorithm)
+            )
+            self.conn.execute(
+                "INSERT INTO digests (dev, ino, size, mtime_ns, algorithm, digest, line_count, encoding, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (*self.key(stat, digest.algorithm), digest.digest, digest.line_count, digest.encoding, time.time())
+            )
+            self._puts += 1
+            if self._puts % PRUNE_EVERY == 0:
+                self.prune()
+            self.conn.commit()
+
+    def prune(self) -> int:
+        """Evict least recently used entries beyond max_entries."""
+        with self._lock:
+            cursor = self.conn.execute(
+                "DELETE FROM digests WHERE used_at <= ("
+                "SELECT used_at FROM digests ORDER BY used_at DESC LIMIT 1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self.conn.commit()
+            return cursor.rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM digests")
+            self.conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (entries,) = self.conn.execute("SELECT COUNT(*) FROM digests").fetchone()
+            return {
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "path": self.db_path,
+            }
+
+
+digest_cache = DigestCache()
+
+
+def cached_digest(path: str, algorithm: str) -> Tuple[Optional[FileDigest], os.stat_result]:
+    """The cached digest of an unchanged file (or None) and the file's stat."""
+    stat = os.stat(path)
+    return digest_cache.get(stat, algorithm), stat
+
+
+def file_digest(path: str, algorithm: Optional[str] = None, use_cache: bool = True) -> Tuple[FileDigest, os.stat_result]:
+    """
+    Digest, line count and encoding of a file, served from the cache when unchanged.
+
+    Blocking; run it on an executor.
+    """
+    algorithm = resolve_algorithm(algorithm)
+    if use_cache:
+        cached, stat = cached_digest(path, algorithm)
+        if cached is not None:
+            return cached, stat
+    digest, stat, unchanged = compute_digest(path, algorithm)
+    if use_cache and unchanged:
+        digest_cache.put(stat, digest)
+    return digest, stat
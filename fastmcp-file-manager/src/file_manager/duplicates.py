@@ -0,0 +1,111 @@
+"""
+Duplicate file detection.
+
+Candidates are narrowed in three increasingly expensive stages:
+
+1. size: only files sharing a size with another file can be duplicates
+   (no I/O beyond the walk or index lookup)
+2. partial hash: a digest of the first and last block of each remaining file
+   (two small reads per file)
+3. full hash: only files still colliding are hashed completely, through the
+   digest cache (digest.file_digest), so unchanged files are never re-read
+
+Hardlinks of the same inode are reported as one copy, since linking them
+again would not reclaim anything.
+"""
+import os
+import shutil
+import hashlib
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+from .copier import reflink
+
+PARTIAL_BLOCK_SIZE = 64 * 1024
+DUPLICATE_ACTIONS = ("report", "hardlink", "reflink")
+
+T = TypeVar("T")
+
+
+def group_by(items: Iterable[T], key: Callable[[T], object]) -> List[List[T]]:
+    """Groups of items sharing a key, keeping only groups with more than one item."""
+    groups: Dict[object, List[T]] = defaultdict(list)
+    for item in items:
+        groups[key(item)].append(item)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def partial_signature(path: str, block_size: int = PARTIAL_BLOCK_SIZE) -> Optional[Tuple[Tuple[int, int], str]]:
+    """
+    (device, inode) and a digest of the first and last block of a file.
+
+    Returns None for files that cannot be read.
+    """
+    try:
+        with open(path, "rb", buffering=0) as f:
+            stat = os.fstat(f.fileno())
+            hasher = hashlib.blake2b(digest_size=16)
+            hasher.update(f.read(block_size))
+            if stat.st_size > block_size:
+                f.seek(max(block_size, stat.st_size - block_size))
+                hasher.update(f.read(block_size))
+    except OSError:
+        return None
+    return (stat.st_dev, stat.st_ino), hasher.hexdigest()
+
+
+def unique_inodes(paths: Sequence[str], identities: Sequence[Tuple[int, int]]) -> List[str]:
+    """First path of every distinct (device, inode), preserving order."""
+    seen = set()
+    unique = []
+    for path, identity in zip(paths, identities):
+        if identity not in seen:
+            seen.add(identity)
+            unique.append(path)
+    return unique
+
+
+class FileChangedError(OSError):
+    """A file changed between hashing and linking."""
+
+
+def file_signature(stat: os.stat_result) -> Tuple[int, int, int]:
+    """(size, mtime_ns, inode): what must be unchanged since a file was hashed."""
+    return (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+
+def _check_unchanged(path: str, signature: Optional[Tuple[int, int, int]]) -> None:
+    if signature is not None and file_signature(os.stat(path)) != signature:
+        raise FileChangedError(f"File changed since it was hashed: {path}")
+
+
+def replace_with_link(
+    keep: str,
+    duplicate: str,
+    action: str,
+    keep_signature: Optional[Tuple[int, int, int]] = None,
+    duplicate_signature: Optional[Tuple[int, int, int]] = None,
+) -> None:
+    """
+    Atomically replace duplicate with a hardlink or reflink of keep.
+
+    The link is created next to the duplicate under a temporary name and
+    renamed over it, so the duplicate is never missing if linking fails.
+    With signatures (file_signature at hash time), both files are re-checked
+    just before the rename and FileChangedError is raised, leaving the
+    duplicate in place, if either was modified since it was hashed.
+    """
+    temporary = f"{duplicate}.dedup-{os.getpid()}.tmp"
+    try:
+        if action == "hardlink":
+            os.link(keep, temporary)
+        else:
+            reflink(keep, temporary)
+            shutil.copystat(duplicate, temporary)
+        _check_unchanged(keep, keep_signature)
+        _check_unchanged(duplicate, duplicate_signature)
+        os.replace(temporary, duplicate)
+    except BaseException:
+        if os.path.lexists(temporary):
+            os.unlink(temporary)
+        raise
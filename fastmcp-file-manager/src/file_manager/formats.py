@@ -0,0 +1,192 @@
+"""
+Result encodings for listings and searches, and the JSON encoder.
+
+The verbose format (the default) repeats a full FileInfo record for every
+entry: the absolute path and parent folder, humanized size and ISO dates.
+For large trees most of those bytes are redundant, so tools can instead
+return one of two compact encodings of the same entries:
+
+- compact:  a table; "columns" names the fields and each row is a list.
+            Parent folders are stored once in "dirs" (relative to the
+            root) and rows refer to them by index.
+- columnar: the same fields as one array per column, with the same
+            "dirs" table (compresses best, easy to load into dataframes).
+
+Timestamps are epoch seconds and permissions the numeric mode; humanized
+sizes and ISO dates are only added when asked for (human_readable=True).
+
+dumps() encodes with orjson or msgspec when either is installed (set
+FILE_MANAGER_JSON_ENCODER to choose one) and falls back to the standard
+json module.
+"""
+import os
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from .mime import detect_mime
+from .stats import naturalsize
+
+OUTPUT_FORMATS = ("verbose", "compact", "columnar")
+JSON_ENCODERS = ("orjson", "msgspec", "json")
+
+ENTRY_COLUMNS = ("dir", "name", "is_dir", "size", "mtime", "ctime", "mode", "mime_type")
+ENTRY_HUMAN_COLUMNS = ("size_human", "modified", "created")
+SEARCH_COLUMNS = ("dir", "name", "size", "matches")
+SEARCH_HUMAN_COLUMNS = ("size_human",)
+
+_encoder: Optional[str] = None
+
+
+def resolve_output_format(output_format: Optional[str] = None) -> str:
+    """Return the effective output format (verbose when not given)."""
+    output_format = (output_format or "verbose").lower()
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}. Use one of: {', '.join(OUTPUT_FORMATS)}")
+    return output_format
+
+
+class PathTable:
+    """Interns parent folders so each is stored once, relative to a root."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._index: Dict[str, int] = {}
+
+    def dir_index(self, path: str) -> int:
+        parent = os.path.dirname(path)
+        index = self._index.get(parent)
+        if index is None:
+            index = self._index[parent] = len(self._index)
+        return index
+
+    @property
+    def dirs(self) -> List[str]:
+        return ["" if d == self.root else os.path.relpath(d, self.root) for d in self._index]
+
+
+def encode_table(
+    output_format: str,
+    paths: PathTable,
+    columns: Sequence[str],
+    rows: List[List[Any]]
+) -> Dict[str, Any]:
+    """Package rows as a compact table or as columnar arrays."""
+    table: Dict[str, Any] = {"format": output_format, "root": paths.root, "dirs": paths.dirs}
+    if output_format == "columnar":
+        table["count"] = len(rows)
+        table["columns"] = {name: [row[i] for row in rows] for i, name in enumerate(columns)}
+    else:
+        table["columns"] = list(columns)
+        table["rows"] = rows
+    return table
+
+
+def _iso(ns: int) -> str:
+    return datetime.fromtimestamp(ns / 1e9).isoformat()
+
+
+def encode_entries(
+    entries: Iterable[Any],
+    root: str,
+    output_format: str,
+    mime_mode: str = "off",
+    human_readable: bool = False
+) -> Dict[str, Any]:
+    """
+    Encode ScanEntry/IndexedEntry values without building FileInfo records.
+
+    Blocking when mime_mode is content (walked files are sniffed); run it on
+    an executor.
+    """
+    paths = PathTable(root)
+    rows = []
+    for entry in entries:
+        if entry.is_dir:
+            mime_type = None
+        elif hasattr(entry, "mime_type"):
+            mime_type = entry.mime_type
+        else:
+            mime_type = detect_mime(entry.path, entry.stat, mime_mode)
+        row = [
+            paths.dir_index(entry.path),
+            entry.name,
+            bool(entry.is_dir),
+            entry.size,
+            entry.mtime_ns / 1e9,
+            entry.ctime_ns / 1e9,
+            entry.mode & 0o7777,
+            mime_type,
+        ]
+        if human_readable:
+            row += [naturalsize(entry.size), _iso(entry.mtime_ns), _iso(entry.ctime_ns)]
+        rows.append(row)
+    columns = ENTRY_COLUMNS + ENTRY_HUMAN_COLUMNS if human_readable else ENTRY_COLUMNS
+    return encode_table(output_format, paths, columns, rows)
+
+
+def encode_search_results(
+    results: Iterable[Any],
+    root: str,
+    output_format: str,
+    human_readable: bool = False
+) -> Dict[str, Any]:
+    """
+    Encode (path, size, matches) search hits.
+
+    Each match is [line_number, line], plus the context_before and
+    context_after lists when the search asked for context lines.
+    """
+    paths = PathTable(root)
+    rows = []
+    for path, size, matches in results:
+        path = str(path)
+        row = [
+            paths.dir_index(path),
+            os.path.basename(path),
+            size,
+            [
+                [m["line_number"], m["line"], m["context_before"], m["context_after"]]
+                if m["context_before"] or m["context_after"] else [m["line_number"], m["line"]]
+                for m in matches
+            ],
+        ]
+        if human_readable:
+            row.append(naturalsize(size))
+        rows.append(row)
+    columns = SEARCH_COLUMNS + SEARCH_HUMAN_COLUMNS if human_readable else SEARCH_COLUMNS
+    return encode_table(output_format, paths, columns, rows)
+
+
+def fast_encoder() -> Optional[str]:
+    """The optional fast JSON encoder in use (orjson or msgspec), or None."""
+    global _encoder
+    if _encoder is None:
+        requested = os.environ.get("FILE_MANAGER_JSON_ENCODER")
+        if requested and requested not in JSON_ENCODERS:
+            raise ValueError(f"Unknown JSON encoder: {requested}. Use one of: {', '.join(JSON_ENCODERS)}")
+        _encoder = "json"
+        for name in ([requested] if requested else JSON_ENCODERS[:-1]):
+            if name == "json":
+                break
+            try:
+                __import__(name)
+            except ImportError:
+                continue
+            _encoder = name
+            break
+    return None if _encoder == "json" else _encoder
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """Encode obj as JSON text with the fastest available encoder."""
+    encoder = fast_encoder()
+    if encoder == "orjson":
+        import orjson
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=str, option=option).decode()
+    if encoder == "msgspec":
+        import msgspec
+        data = msgspec.json.encode(obj, enc_hook=str)
+        return (msgspec.json.format(data, indent=2) if indent else data).decode()
+    return json.dumps(obj, indent=2 if indent else None, default=str)
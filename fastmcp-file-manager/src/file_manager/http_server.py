@@ -0,0 +1,150 @@
+"""
+HTTP serving for the file manager (streamable HTTP, or legacy SSE).
+
+One warm server can be shared by many agents: requests are handled
+concurrently, connections are kept alive between calls, and JSON responses
+above a size threshold are gzip-compressed (large listings shrink ~10x).
+
+- workers > 1 runs several uvicorn worker processes behind one socket.
+  MCP sessions live in a worker's memory, so this forces stateless HTTP;
+  the SQLite caches and indexes are shared between workers on disk.
+- concurrency caps simultaneous connections/requests per worker (uvicorn
+  answers 503 beyond it) so a burst queues at clients, not in the pools.
+- On SIGINT/SIGTERM uvicorn stops accepting, in-flight requests get
+  graceful_timeout seconds to finish, and then the worker pools are drained
+  (queued work finishes, or is cancelled once the timeout passes).
+
+Settings travel through FILE_MANAGER_HTTP_* environment variables, so
+worker processes started by uvicorn build the same app.
+"""
+import os
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, fields
+from typing import Any, AsyncIterator, Dict, Optional
+
+HTTP_TRANSPORTS = ("http", "streamable-http", "sse")
+ENV_PREFIX = "FILE_MANAGER_HTTP_"
+
+
+@dataclass
+class HttpSettings:
+    """How the HTTP server listens and behaves."""
+    transport: str = "http"
+    host: str = "127.0.0.1"
+    port: int = 8000
+    path: Optional[str] = None
+    workers: int = 1
+    keep_alive: int = 75
+    concurrency: Optional[int] = None
+    backlog: int = 2048
+    gzip_min_size: int = 1024
+    gzip_level: int = 6
+    json_response: bool = True
+    stateless: bool = False
+    graceful_timeout: float = 30.0
+    log_level: str = "info"
+
+    def __post_init__(self):
+        if self.transport not in HTTP_TRANSPORTS:
+            raise ValueError(f"Unknown HTTP transport: {self.transport}. Use one of: {', '.join(HTTP_TRANSPORTS)}")
+        if self.workers < 1:
+            raise ValueError("workers must be at least 1")
+        if self.workers > 1:
+            self.stateless = True
+
+    def to_env(self) -> Dict[str, str]:
+        return {
+            ENV_PREFIX + field.name.upper(): str(value)
+            for field, value in ((f, getattr(self, f.name)) for f in fields(self))
+            if value is not None
+        }
+
+    @classmethod
+    def from_env(cls) -> "HttpSettings":
+        values: Dict[str, Any] = {}
+        for field in fields(cls):
+            raw = os.environ.get(ENV_PREFIX + field.name.upper())
+            if raw is None:
+                continue
+            default = field.default
+            if isinstance(default, bool):
+                values[field.name] = raw.lower() in ("1", "true", "yes")
+            elif isinstance(default, int) or field.name == "concurrency":
+                values[field.name] = int(raw)
+            elif isinstance(default, float):
+                values[field.name] = float(raw)
+            else:
+                values[field.name] = raw
+        return cls(**values)
+
+
+def create_app(settings: Optional[HttpSettings] = None):
+    """Build the ASGI app: the MCP endpoint with compression and a draining shutdown."""
+    import asyncio
+    from starlette.middleware import Middleware
+    from starlette.middleware.gzip import GZipMiddleware
+
+    from .main import mcp, start_metrics_exporter, stop_metrics_exporter
+    from .pools import pools
+
+    settings = settings or HttpSettings.from_env()
+    middleware = []
+    if settings.gzip_min_size >= 0 and settings.gzip_level > 0:
+        # Streamed (text/event-stream) responses are never compressed by Starlette
+        middleware.append(Middleware(
+            GZipMiddleware, minimum_size=settings.gzip_min_size, compresslevel=settings.gzip_level
+        ))
+    app = mcp.http_app(
+        path=settings.path,
+        middleware=middleware,
+        transport=settings.transport,
+        json_response=settings.json_response if settings.transport != "sse" else None,
+        stateless_http=settings.stateless if settings.transport != "sse" else None,
+    )
+
+    mcp_lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(app) -> AsyncIterator[None]:
+        start_metrics_exporter()
+        try:
+            async with mcp_lifespan(app):
+                yield
+        finally:
+            # Requests are done (or timed out); let pool work already queued finish
+            await asyncio.to_thread(pools.drain, settings.graceful_timeout)
+            stop_metrics_exporter()
+
+    app.router.lifespan_context = lifespan
+    return app
+
+
+def uvicorn_options(settings: HttpSettings) -> Dict[str, Any]:
+    return {
+        "host": settings.host,
+        "port": settings.port,
+        "timeout_keep_alive": settings.keep_alive,
+        "limit_concurrency": settings.concurrency,
+        "backlog": settings.backlog,
+        "timeout_graceful_shutdown": settings.graceful_timeout,
+        "log_level": settings.log_level,
+        "lifespan": "on",
+    }
+
+
+def serve_http(settings: HttpSettings) -> None:
+    """Run the HTTP server until interrupted."""
+    import uvicorn
+
+    if settings.workers == 1:
+        uvicorn.run(create_app(settings), **uvicorn_options(settings))
+        return
+    # Worker processes import the app by name and read their settings from the environment
+    os.environ.update(settings.to_env())
+    uvicorn.run(
+        "file_manager.http_server:create_app",
+        factory=True,
+        workers=settings.workers,
+        **uvicorn_options(settings),
+    )
+
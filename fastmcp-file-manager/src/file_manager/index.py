@@ -0,0 +1,388 @@
+"""
+Persistent metadata index for the file manager.
+
+Indexed folders ("roots") are walked once and their entries stored in SQLite
+(path, size, timestamps, extension, MIME type). Listings, searches and
+organize runs under an indexed root are then answered with index queries
+instead of filesystem walks.
+
+The index is kept fresh in two ways:
+- while the server runs, a watchfiles (inotify) watcher applies changes
+  incrementally as they happen
+- when no watcher is active (fresh process, watcher failed), a root older
+  than max_age is refreshed with an mtime/size diff rescan before use
+"""
+import os
+import time
+import sqlite3
+import asyncio
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .mime import detect_mime, resolve_mime_mode
+from .scanner import ScanEntry, scan_tree, stat_entry
+
+DEFAULT_INDEX_PATH = Path.home() / ".cache" / "file_manager" / "index.sqlite3"
+DEFAULT_MAX_AGE = 60.0
+
+SORT_COLUMNS = {
+    "name": "name COLLATE NOCASE",
+    "size": "size",
+    "modified": "mtime_ns",
+    "created": "ctime_ns",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS roots (
+    root TEXT PRIMARY KEY,
+    include_hidden INTEGER NOT NULL,
+    mime_mode TEXT NOT NULL,
+    watch INTEGER NOT NULL,
+    built_at REAL NOT NULL,
+    refreshed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    path TEXT PRIMARY KEY,
+    root TEXT NOT NULL,
+    parent TEXT NOT NULL,
+    name TEXT NOT NULL,
+    is_dir INTEGER NOT NULL,
+    hidden INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    ctime_ns INTEGER NOT NULL,
+    mode INTEGER NOT NULL,
+    extension TEXT NOT NULL,
+    mime_type TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_parent ON entries(parent);
+CREATE INDEX IF NOT EXISTS entries_root_extension ON entries(root, extension);
+CREATE INDEX IF NOT EXISTS entries_root_size ON entries(root, size);
+CREATE INDEX IF NOT EXISTS entries_root_mtime ON entries(root, mtime_ns);
+"""
+
+
+class IndexedEntry(NamedTuple):
+    """A row of the entries table."""
+    path: str
+    name: str
+    is_dir: bool
+    size: int
+    mtime_ns: int
+    ctime_ns: int
+    mode: int
+    extension: str
+    mime_type: Optional[str]
+
+
+ENTRY_COLUMNS = ", ".join(IndexedEntry._fields)
+
+
+def _subtree_bounds(folder: str) -> Tuple[str, str]:
+    """Key range covering every path strictly below folder ('0' sorts right after '/')."""
+    prefix = folder.rstrip(os.sep) + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+
+def _is_within(path: str, root: str) -> bool:
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+class MetadataIndex:
+    """SQLite-backed store of file metadata for indexed roots."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = str(db_path or os.environ.get("FILE_MANAGER_INDEX_PATH", DEFAULT_INDEX_PATH))
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    # ----- roots -----
+
+    def roots(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            cursor = self.conn.execute(
+                "SELECT root, include_hidden, mime_mode, watch, built_at, refreshed_at FROM roots"
+            )
+            return [
+                {
+                    "root": root,
+                    "include_hidden": bool(include_hidden),
+                    "mime_mode": mime_mode,
+                    "watch": bool(watch),
+                    "built_at": built_at,
+                    "refreshed_at": refreshed_at,
+                }
+                for root, include_hidden, mime_mode, watch, built_at, refreshed_at in cursor
+            ]
+
+    def get_root(self, root: str) -> Optional[Dict[str, Any]]:
+        return next((r for r in self.roots() if r["root"] == root), None)
+
+    def covering_root(self, path: str, include_hidden: bool = False) -> Optional[Dict[str, Any]]:
+        """Return the indexed root containing path, if it can serve the request."""
+        for info in sorted(self.roots(), key=lambda r: len(r["root"]), reverse=True):
+            if not _is_within(path, info["root"]):
+                continue
+            if include_hidden and not info["include_hidden"]:
+                return None
+            return info
+        return None
+
+    # ----- building and refreshing -----
+
+    def _row(self, root: str, entry: ScanEntry, mime_mode: str) -> tuple:
+        relative = os.path.relpath(entry.path, root)
+        hidden = any(part.startswith('.') for part in relative.split(os.sep))
+        st = entry.stat
+        mime_type = "inode/directory" if entry.is_dir else detect_mime(entry.path, st, mime_mode)
+        return (
+            entry.path, root, os.path.dirname(entry.path), entry.name, int(entry.is_dir),
+            int(hidden), st.st_size, st.st_mtime_ns, st.st_ctime_ns, st.st_mode,
+            entry.extension, mime_type,
+        )
+
+    def _upsert(self, rows: Iterable[tuple]) -> None:
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO entries (path, root, parent, name, is_dir, hidden, size, "
+            "mtime_ns, ctime_ns, mode, extension, mime_type) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+    def _delete_subtree(self, path: str) -> None:
+        low, high = _subtree_bounds(path)
+        self.conn.execute("DELETE FROM entries WHERE path = ? OR (path > ? AND path < ?)", (path, low, high))
+
+    def build(
+        self,
+        root: str,
+        include_hidden: bool = True,
+        mime_mode: str = "extension",
+        watch: bool = True,
+    ) -> Dict[str, Any]:
+        """(Re)build the index for root from a full walk."""
+        mime_mode = resolve_mime_mode(mime_mode)
+        for info in self.roots():
+            if info["root"] != root and _is_within(root, info["root"]):
+                raise ValueError(f"{root} is already covered by indexed folder {info['root']}")
+        started = time.time()
+        with self._lock, self.conn:
+            # Nested roots are folded into the new one
+            for info in self.roots():
+                if _is_within(info["root"], root):
+                    self.conn.execute("DELETE FROM roots WHERE root = ?", (info["root"],))
+            self._delete_subtree(root)
+            count = 0
+            batch = []
+            for entry in scan_tree(root, recursive=True, include_hidden=include_hidden):
+                batch.append(self._row(root, entry, mime_mode))
+                if len(batch) >= 5000:
+                    self._upsert(batch)
+                    count += len(batch)
+                    batch.clear()
+            self._upsert(batch)
+            count += len(batch)
+            now = time.time()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO roots VALUES (?, ?, ?, ?, ?, ?)",
+                (root, int(include_hidden), mime_mode, int(watch), now, now),
+            )
+        return {"root": root, "entries": count, "duration_seconds": round(time.time() - started, 3)}
+
+    def refresh(self, root: str) -> Dict[str, int]:
+        """Bring root up to date with an mtime/size diff rescan."""
+        info = self.get_root(root)
+        if info is None:
+            raise ValueError(f"Folder is not indexed: {root}")
+        with self._lock:
+            low, high = _subtree_bounds(root)
+            known = dict(
+                (path, (size, mtime_ns))
+                for path, size, mtime_ns in self.conn.execute(
+                    "SELECT path, size, mtime_ns FROM entries WHERE path > ? AND path < ?", (low, high)
+                )
+            )
+        changed = []
+        for entry in scan_tree(root, recursive=True, include_hidden=info["include_hidden"]):
+            previous = known.pop(entry.path, None)
+            if previous != (entry.stat.st_size, entry.stat.st_mtime_ns):
+                changed.append(self._row(root, entry, info["mime_mode"]))
+        with self._lock, self.conn:
+            self._upsert(changed)
+            self.conn.executemany("DELETE FROM entries WHERE path = ?", ((p,) for p in known))
+            self.conn.execute("UPDATE roots SET refreshed_at = ? WHERE root = ?", (time.time(), root))
+        return {"updated": len(changed), "removed": len(known)}
+
+    def apply_changes(self, root: str, paths: Iterable[str]) -> int:
+        """Re-stat the given paths (from a watcher) and update their rows."""
+        info = self.get_root(root)
+        if info is None:
+            return 0
+        rows = []
+        removed = []
+        for path in paths:
+            if not _is_within(path, root) or path == root:
+                continue
+            relative = os.path.relpath(path, root)
+            if not info["include_hidden"] and any(p.startswith('.') for p in relative.split(os.sep)):
+                continue
+            entry = stat_entry(path)
+            if entry is None:
+                removed.append(path)
+                continue
+            rows.append(self._row(root, entry, info["mime_mode"]))
+            if entry.is_dir:
+                # A folder moved in produces a single event for the whole subtree
+                for child in scan_tree(path, recursive=True, include_hidden=info["include_hidden"]):
+                    rows.append(self._row(root, child, info["mime_mode"]))
+        with self._lock, self.conn:
+            for path in removed:
+                self._delete_subtree(path)
+            self._upsert(rows)
+            self.conn.execute("UPDATE roots SET refreshed_at = ? WHERE root = ?", (time.time(), root))
+        return len(rows) + len(removed)
+
+    def invalidate(self, root: Optional[str] = None) -> List[str]:
+        """Drop one indexed root (or all of them). Returns the dropped roots."""
+        with self._lock, self.conn:
+            dropped = [r["root"] for r in self.roots() if root is None or r["root"] == root]
+            for path in dropped:
+                self._delete_subtree(path)
+                self.conn.execute("DELETE FROM roots WHERE root = ?", (path,))
+        return dropped
+
+    # ----- queries -----
+
+    def lookup(
+        self,
+        root: str,
+        folder: str,
+        recursive: bool = True,
+        include_hidden: bool = False,
+        files_only: bool = False,
+        extension: Optional[str] = None,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        modified_after_ns: Optional[int] = None,
+        modified_before_ns: Optional[int] = None,
+        sort_by: str = "name",
+        descending: bool = False,
+    ) -> List[IndexedEntry]:
+        """Return indexed entries of root below folder matching the filters."""
+        clauses, params = ["root = ?"], [root]
+        if recursive:
+            low, high = _subtree_bounds(folder)
+            clauses.append("path > ? AND path < ?")
+            params.extend([low, high])
+        else:
+            clauses.append("parent = ?")
+            params.append(folder)
+        if not include_hidden:
+            clauses.append("hidden = 0")
+        if files_only:
+            clauses.append("is_dir = 0")
+        if extension:
+            ext = extension.lower()
+            clauses.append("extension = ?")
+            params.append(ext if ext.startswith('.') else f".{ext}")
+        for clause, value in (
+            ("size >= ?", min_size),
+            ("size <= ?", max_size),
+            ("mtime_ns >= ?", modified_after_ns),
+            ("mtime_ns <= ?", modified_before_ns),
+        ):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        order = SORT_COLUMNS.get(sort_by, SORT_COLUMNS["name"])
+        sql = (
+            f"SELECT {ENTRY_COLUMNS} FROM entries WHERE {' AND '.join(clauses)} "
+            f"ORDER BY {order} {'DESC' if descending else 'ASC'}"
+        )
+        with self._lock:
+            return [IndexedEntry(*row) for row in self.conn.execute(sql, params)]
+
+    def status(self) -> List[Dict[str, Any]]:
+        result = []
+        for info in self.roots():
+            low, high = _subtree_bounds(info["root"])
+            with self._lock:
+                files, dirs, total_size = self.conn.execute(
+                    "SELECT COALESCE(SUM(is_dir = 0), 0), COALESCE(SUM(is_dir), 0), "
+                    "COALESCE(SUM(CASE WHEN is_dir = 0 THEN size ELSE 0 END), 0) "
+                    "FROM entries WHERE path > ? AND path < ?",
+                    (low, high),
+                ).fetchone()
+            result.append({**info, "files": files, "folders": dirs, "total_size": total_size})
+        return result
+
+
+class IndexWatcher:
+    """
+    Keeps indexed roots fresh from filesystem events while the server runs.
+
+    Works with any index exposing refresh(root) and apply_changes(root, paths)
+    (the metadata index here, the trigram content index in trigram.py).
+    """
+
+    def __init__(self, index: Any, max_age: Optional[float] = None):
+        self.index = index
+        self.max_age = float(os.environ.get("FILE_MANAGER_INDEX_MAX_AGE", DEFAULT_MAX_AGE)) if max_age is None else max_age
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def is_watching(self, root: str) -> bool:
+        task = self._tasks.get(root)
+        return task is not None and not task.done()
+
+    def start(self, root: str, run: Callable) -> bool:
+        """Start watching root; returns False when watchfiles is unavailable."""
+        if self.is_watching(root):
+            return True
+        try:
+            import watchfiles  # noqa: F401
+        except ImportError:
+            return False
+        self._tasks[root] = asyncio.get_running_loop().create_task(self._watch(root, run))
+        return True
+
+    def stop(self, root: Optional[str] = None) -> None:
+        for path in list(self._tasks):
+            if root is None or path == root:
+                self._tasks.pop(path).cancel()
+
+    async def _watch(self, root: str, run: Callable) -> None:
+        from watchfiles import awatch
+        try:
+            async for changes in awatch(root, watch_filter=None, recursive=True):
+                await run(self.index.apply_changes, root, {path for _, path in changes})
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # e.g. inotify watch limit reached; ensure_fresh falls back to rescans
+            pass
+
+    async def ensure_fresh(self, info: Dict[str, Any], run: Callable) -> None:
+        """Resume watching root and rescan it if nothing kept it fresh recently."""
+        root = info["root"]
+        if self.is_watching(root):
+            return
+        # Start watching first so changes made during the rescan are not lost
+        if info["watch"]:
+            self.start(root, run)
+        if time.time() - info["refreshed_at"] > self.max_age:
+            await run(self.index.refresh, root)
+
+
+metadata_index = MetadataIndex()
+index_watcher = IndexWatcher(metadata_index)
@@ -4,30 +4,95 @@ Provides tools for managing files and folders with grouping by extension.
 """
 import os
 import json
+import time
+import base64
+import inspect
 import shutil
-import hashlib
-import mimetypes
-import magic
 import asyncio
+from contextlib import aclosing
+from fnmatch import fnmatchcase
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Set, Tuple
 from datetime import datetime
 from dataclasses import dataclass, asdict
-from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import chain, islice
+from urllib.parse import urlparse
 import humanize
+import pydantic_core
 
-from fastmcp import FastMCP
+from fastmcp import Context, FastMCP
+from fastmcp.server.middleware import Middleware
 from pydantic import BaseModel, Field, validator
+from pydantic.fields import FieldInfo
+
+from .cache import resource_cache, stat_validator
+from .batch import DEFAULT_BATCH_CONCURRENCY, ERROR_POLICIES, operation_accesses, plan_dependencies, run_graph
+from .content_search import DEFAULT_CONCURRENCY, scan_files
+from .copier import CopyProgress, copy2, copy_chunk, copy_file_data, plan_copytree
+from .digest import cached_digest, compute_digest, digest_cache, resolve_algorithm
+from .duplicates import DUPLICATE_ACTIONS, FileChangedError, file_signature, group_by, partial_signature, replace_with_link, unique_inodes
+from .formats import dumps, encode_entries, encode_search_results, fast_encoder, resolve_output_format
+from .index import IndexedEntry, index_watcher, metadata_index
+from .metrics import DEFAULT_EXPORT_INTERVAL, MetricsExporter, metrics, phase, touch
+from .mime import resolve_mime_mode
+from .pools import pools, run_io, run_sized
+from .organize import CONFLICT_POLICIES, NameAllocator, chunk_operations, execute_chunk, same_device
+from .scanner import ScanEntry, scan_tree
+from .stats import file_info_dict, file_statistics
+from .trigram import DEFAULT_MAX_FILE_SIZE, content_index_watcher, trigram_index
+from .usage import SCAN_BATCH_SIZE, USAGE_SORT_KEYS, heaviest, scan_directories, subtree_totals, usage_cache
+
+class MetricsMiddleware(Middleware):
+    """Instrument every tool call and resource read (see metrics)."""
+
+    async def on_call_tool(self, context, call_next):
+        call, token = metrics.start(context.message.name)
+        error = True
+        try:
+            result = await call_next(context)
+            structured = result.structured_content
+            error = isinstance(structured, dict) and "error" in structured
+            return result
+        finally:
+            metrics.finish(call, token, error)
+
+    async def on_read_resource(self, context, call_next):
+        uri = urlparse(str(context.message.uri))
+        call, token = metrics.start(f"resource:{uri.scheme}://{uri.netloc}")
+        error = True
+        try:
+            result = await call_next(context)
+            error = False
+            return result
+        finally:
+            metrics.finish(call, token, error)
+
+def serialize_tool_result(result: Any) -> str:
+    """Tool result serializer (orjson/msgspec when installed), timed as the serialize phase."""
+    with phase("serialize"):
+        if fast_encoder() is not None:
+            return dumps(result)
+        return pydantic_core.to_json(result, fallback=str).decode()
 
 # Initialize FastMCP app
-mcp = FastMCP("file-manager")
+mcp = FastMCP("file-manager", middleware=[MetricsMiddleware()], tool_serializer=serialize_tool_result)
+
+# Periodic Prometheus/OTLP export, when configured
+metrics_exporter: Optional[MetricsExporter] = None
+
+# Background trigram index builds (kept referenced until done) and their failures
+content_index_builds: Dict[str, asyncio.Task] = {}
+content_index_errors: Dict[str, str] = {}
 
-# Global thread pool for blocking operations
-executor = ThreadPoolExecutor(max_workers=10)
+# Sort keys shared by walked (ScanEntry) and indexed (IndexedEntry) entries
+SORT_KEYS = {
+    "name": lambda e: e.name.lower(),
+    "size": lambda e: e.size,
+    "modified": lambda e: e.mtime_ns,
+    "created": lambda e: e.ctime_ns,
+}
 
-# Initialize mimetypes and magic
-mimetypes.init()
-magic_mime = magic.Magic(mime=True)
 
 # ========== Pydantic Models ==========
 
@@ -38,7 +103,7 @@ class FileInfo(BaseModel):
     size: int
     size_human: str
     extension: str
-    mime_type: str
+    mime_type: Optional[str] = None
     is_dir: bool
     created: str
     modified: str
@@ -51,7 +116,7 @@ class FileGroup(BaseModel):
     count: int
     total_size: int
     total_size_human: str
-    files: List[FileInfo]
+    files: List[FileInfo] = Field(default_factory=list)
 
 class FolderSummary(BaseModel):
     """Model for folder summary."""
@@ -65,6 +130,13 @@ class FolderSummary(BaseModel):
     oldest_file: Optional[FileInfo] = None
     newest_file: Optional[FileInfo] = None
 
+class ContentMatch(BaseModel):
+    """Model for a matching line found by content search."""
+    line_number: int
+    line: str
+    context_before: List[str] = Field(default_factory=list)
+    context_after: List[str] = Field(default_factory=list)
+
 class SearchResult(BaseModel):
     """Model for search results."""
     path: str
@@ -73,6 +145,7 @@ class SearchResult(BaseModel):
     size: int
     size_human: str
     matches: List[str] = Field(default_factory=list)
+    line_matches: List[ContentMatch] = Field(default_factory=list)
 
 class MoveRequest(BaseModel):
     """Model for move/copy operations."""
@@ -88,32 +161,265 @@ class BatchOperation(BaseModel):
 
 # ========== Helper Functions ==========
 
-def get_file_info(filepath: Path) -> FileInfo:
+def get_file_info(filepath: Path, mime_mode: Optional[str] = None) -> FileInfo:
     """Get detailed information about a file."""
-    stat = filepath.stat()
-    try:
-        mime_type = magic_mime.from_file(str(filepath))
-    except:
-        mime_type = mimetypes.guess_type(str(filepath))[0] or "application/octet-stream"
+    with phase("stat"):
+        stat = filepath.stat()
+    return file_info_from_stat(str(filepath), stat, mime_mode=resolve_mime_mode(mime_mode))
+
+def file_info_from_stat(
+    path: str,
+    stat: os.stat_result,
+    name: Optional[str] = None,
+    mime_mode: str = "content"
+) -> FileInfo:
+    """Build FileInfo from an already collected stat result (no extra syscalls).
     
+    mime_mode must already be resolved (see mime.resolve_mime_mode).
+    """
+    return FileInfo(**file_info_dict(path, stat, name, mime_mode))
+
+async def run_in_executor(func, *args):
+    """Run blocking function in the io thread pool."""
+    return await run_io(func, *args)
+
+async def run_read(size: int, func, *args):
+    """run_sized for work that reads a whole file, counted in the read phase."""
+    touch(files=1, bytes=size)
+    return await run_sized(size, func, *args, phase="read")
+
+async def digest_file(path: str, algorithm: Optional[str] = None, use_cache: bool = True):
+    """file_digest with the read-and-hash pass on the cpu pool for large files."""
+    algorithm = resolve_algorithm(algorithm)
+    if use_cache:
+        cached, stat = await run_in_executor(cached_digest, path, algorithm)
+        if cached is not None:
+            return cached, stat
+    else:
+        stat = await run_in_executor(os.stat, path)
+    digest, stat, unchanged = await run_read(stat.st_size, compute_digest, path, algorithm)
+    if use_cache and unchanged:
+        await run_in_executor(digest_cache.put, stat, digest)
+    return digest, stat
+
+def file_info_from_index(entry: IndexedEntry) -> FileInfo:
+    """Build FileInfo from a metadata index row."""
     return FileInfo(
-        name=filepath.name,
-        path=str(filepath),
-        size=stat.st_size,
-        size_human=humanize.naturalsize(stat.st_size),
-        extension=filepath.suffix.lower() if not filepath.is_dir() else "",
-        mime_type=mime_type if not filepath.is_dir() else "inode/directory",
-        is_dir=filepath.is_dir(),
-        created=datetime.fromtimestamp(stat.st_ctime).isoformat(),
-        modified=datetime.fromtimestamp(stat.st_mtime).isoformat(),
-        permissions=oct(stat.st_mode)[-3:],
-        parent=str(filepath.parent)
+        name=entry.name,
+        path=entry.path,
+        size=entry.size,
+        size_human=humanize.naturalsize(entry.size),
+        extension=entry.extension,
+        mime_type=entry.mime_type,
+        is_dir=bool(entry.is_dir),
+        created=datetime.fromtimestamp(entry.ctime_ns / 1e9).isoformat(),
+        modified=datetime.fromtimestamp(entry.mtime_ns / 1e9).isoformat(),
+        permissions=oct(entry.mode)[-3:],
+        parent=os.path.dirname(entry.path)
     )
 
-async def run_in_executor(func, *args):
-    """Run blocking function in thread pool."""
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(executor, func, *args)
+def parse_timestamp_ns(value: Optional[str]) -> Optional[int]:
+    """Convert an ISO date/datetime string to nanoseconds since the epoch."""
+    if not value:
+        return None
+    return int(datetime.fromisoformat(value).timestamp() * 1_000_000_000)
+
+def entry_file_info(entry, mime_mode: str) -> FileInfo:
+    """Build FileInfo for a walked or indexed entry."""
+    if isinstance(entry, ScanEntry):
+        return file_info_from_stat(entry.path, entry.stat, entry.name, mime_mode=mime_mode)
+    return file_info_from_index(entry)
+
+def encode_cursor(offset: int) -> str:
+    """Encode a result offset as an opaque pagination cursor."""
+    return base64.urlsafe_b64encode(json.dumps({"offset": offset}).encode()).decode()
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    """Decode a pagination cursor back to a result offset (0 for no cursor)."""
+    if not cursor:
+        return 0
+    try:
+        return int(json.loads(base64.urlsafe_b64decode(cursor.encode()))["offset"])
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+async def stream_records(ctx: Optional[Context], kind: str, records: Any, sent: int, total: Optional[int] = None):
+    """Send a chunk of result records (a list, or a compact table) to the client as a progress notification."""
+    if ctx is None or not records:
+        return
+    await ctx.report_progress(
+        progress=sent,
+        total=total,
+        message=dumps({"type": kind, "records": records})
+    )
+
+def _is_under(path: Path, folder: Path, recursive: bool) -> bool:
+    return path.parent == folder or (recursive and folder in path.parents)
+
+async def report_copy_progress(ctx: Context, progress: CopyProgress, interval: float = 0.25):
+    """Report copied bytes to the client periodically until cancelled."""
+    while True:
+        await ctx.report_progress(
+            progress=progress.done,
+            total=progress.total or None,
+            message=f"Copied {humanize.naturalsize(progress.done)} of {humanize.naturalsize(progress.total)}"
+        )
+        await asyncio.sleep(interval)
+
+async def iterate_in_executor(iterator, batch_size: int = 1000):
+    """Drain a blocking iterator on the executor in batches, yielding items on the loop."""
+    iterator = iter(iterator)
+    while True:
+        batch = await run_in_executor(lambda: list(islice(iterator, batch_size)))
+        if not batch:
+            return
+        for item in batch:
+            yield item
+
+async def query_content_index(
+    folder: Path,
+    patterns: Tuple[str, ...],
+    case_sensitive: bool = False,
+    match_all: bool = False
+) -> Optional[Set[str]]:
+    """
+    Narrow a content search to candidate files with the trigram index.
+    
+    Returns None when the folder is not content-indexed or the patterns are
+    too short to narrow anything; the caller then scans every file.
+    """
+    info = await run_in_executor(trigram_index.covering_root, str(folder), True)
+    if info is None:
+        return None
+    await content_index_watcher.ensure_fresh(info, run_in_executor)
+    return await run_in_executor(trigram_index.candidates, info["root"], patterns, case_sensitive, match_all)
+
+async def build_content_index(root: str, max_file_size: int, watch: bool):
+    """Build the trigram index for root in the background."""
+    try:
+        await run_in_executor(
+            partial(trigram_index.build, root, include_hidden=True, max_file_size=max_file_size, watch=watch)
+        )
+        content_index_errors.pop(root, None)
+        if watch:
+            content_index_watcher.start(root, run_in_executor)
+    except Exception as e:
+        content_index_errors[root] = str(e)
+    finally:
+        content_index_builds.pop(root, None)
+
+async def call_tool_fn(tool, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Call another tool's function directly (tools are not callable themselves).
+    
+    Parameters the caller leaves out get their Field defaults, which Python
+    would otherwise pass as FieldInfo objects.
+    """
+    signature = inspect.signature(tool.fn)
+    unknown = set(params) - set(signature.parameters)
+    if unknown:
+        return {"error": f"Unknown parameters for {tool.name}: {', '.join(sorted(unknown))}"}
+    arguments = dict(params)
+    for name, parameter in signature.parameters.items():
+        default = parameter.default
+        if name not in arguments and isinstance(default, FieldInfo):
+            if default.is_required():
+                return {"error": f"Missing parameter for {tool.name}: {name}"}
+            arguments[name] = default.get_default(call_default_factory=True)
+    return await tool.fn(**arguments)
+
+async def query_index(folder: Path, include_hidden: bool = False, **filters) -> Optional[List[IndexedEntry]]:
+    """
+    Answer a directory walk from the metadata index.
+    
+    Returns None when the folder is not under an indexed root (or the root
+    was indexed without the hidden files the caller needs), in which case the
+    caller falls back to walking the filesystem.
+    """
+    info = await run_in_executor(metadata_index.covering_root, str(folder), include_hidden)
+    if info is None:
+        return None
+    await index_watcher.ensure_fresh(info, run_in_executor)
+    return await run_in_executor(
+        partial(metadata_index.lookup, info["root"], str(folder), include_hidden=include_hidden, **filters)
+    )
+
+def extension_totals_of(files) -> Dict[str, Tuple[int, int]]:
+    """(count, total size) of entries per extension."""
+    totals = {}
+    for file in files:
+        ext = file.extension or "no_extension"
+        count, size = totals.get(ext, (0, 0))
+        totals[ext] = (count + 1, size + file.size)
+    return totals
+
+async def compact_listing(
+    folder: Path,
+    page: List[Any],
+    all_files: List[Any],
+    all_dirs: List[Any],
+    mime_mode: str,
+    output_format: str,
+    human_readable: bool,
+    group_by_extension: bool,
+    stream: bool,
+    chunk_size: int,
+    offset: int,
+    end: int,
+    next_cursor: Optional[str],
+    ctx: Optional[Context]
+) -> Dict[str, Any]:
+    """list_files_and_folders' result in the compact or columnar format."""
+    root = str(folder)
+    encode = partial(encode_entries, root=root, output_format=output_format,
+                     mime_mode=mime_mode, human_readable=human_readable)
+    extension_totals = extension_totals_of(all_files)
+    total_size = sum(size for _, size in extension_totals.values())
+    
+    def summary_path(key, pick):
+        return pick(all_files, key=key).path if all_files else None
+    
+    summary = {
+        "total_files": len(all_files),
+        "total_dirs": len(all_dirs),
+        "total_size": total_size,
+        "extensions": {ext: count for ext, (count, _) in extension_totals.items()},
+        "largest_file": summary_path(SORT_KEYS["size"], max),
+        "oldest_file": summary_path(SORT_KEYS["created"], min),
+        "newest_file": summary_path(SORT_KEYS["created"], max)
+    }
+    if human_readable:
+        summary["total_size_human"] = humanize.naturalsize(total_size)
+    
+    streamed = stream and ctx is not None
+    if streamed:
+        sent = offset
+        for i in range(0, len(page), chunk_size):
+            chunk = page[i:i + chunk_size]
+            sent += len(chunk)
+            await stream_records(ctx, "entries", await run_in_executor(encode, chunk), sent, end)
+        entries = await run_in_executor(encode, [])
+    else:
+        entries = await run_in_executor(encode, page)
+    
+    groups = {}
+    if group_by_extension:
+        # extension -> [count, total_size], largest groups first
+        for ext, (count, size) in sorted(extension_totals.items(), key=lambda x: x[1][0], reverse=True):
+            groups[ext] = [count, size]
+    
+    return {
+        "success": True,
+        "folder": root,
+        "format": output_format,
+        "summary": summary,
+        "entries": entries,
+        "grouped_by_extension": groups,
+        "total_items": len(all_dirs) + len(all_files),
+        "returned_items": len(page),
+        "streamed": streamed,
+        "next_cursor": next_cursor
+    }
 
 # ========== MCP Tools ==========
 
@@ -124,7 +430,17 @@ async def list_files_and_folders(
     group_by_extension: bool = Field(True, description="Group files by extension"),
     include_hidden: bool = Field(False, description="Include hidden files/folders"),
     sort_by: str = Field("name", description="Sort by: name, size, modified, created"),
-    sort_order: str = Field("asc", description="Sort order: asc or desc")
+    sort_order: str = Field("asc", description="Sort order: asc or desc"),
+    mime_mode: Optional[str] = Field(None, description="MIME detection: off, extension or content (defaults to server setting)"),
+    use_index: bool = Field(True, description="Answer from the metadata index when the folder is indexed"),
+    group_files: bool = Field(True, description="Repeat file records inside each extension group (False returns aggregates only)"),
+    limit: Optional[int] = Field(None, description="Maximum number of entries to return (folders first, then files)"),
+    cursor: Optional[str] = Field(None, description="Cursor from a previous call's next_cursor"),
+    stream: bool = Field(False, description="Send entries as progress-notification chunks instead of in the result"),
+    chunk_size: int = Field(500, description="Entries per streamed chunk"),
+    output_format: str = Field("verbose", description="Entry encoding: verbose, compact (table) or columnar"),
+    human_readable: bool = Field(False, description="Add humanized sizes and ISO dates to compact/columnar entries"),
+    ctx: Optional[Context] = None
 ) -> Dict[str, Any]:
     """
     List all files and folders in a directory with optional grouping by extension.
@@ -136,6 +452,20 @@ async def list_files_and_folders(
         include_hidden: Include hidden files and folders
         sort_by: Sort files by name, size, modified, or created
         sort_order: Ascending or descending order
+        mime_mode: How to detect MIME types (off, extension, content)
+        use_index: Use the metadata index instead of walking, when available
+        group_files: Include file records in extension groups, not just aggregates
+        limit: Page size; the response carries next_cursor when more entries remain
+        cursor: Continue from a previous page
+        stream: Deliver entries as progress-notification chunks
+        chunk_size: Number of entries per streamed chunk
+        output_format: verbose FileInfo records, or a compact/columnar table
+        human_readable: Include size_human, modified and created columns
+    
+    Summary and group aggregates always cover the whole folder; the files,
+    folders and group members only cover the requested page. The compact and
+    columnar formats return the page as one "entries" table (see formats)
+    with numeric timestamps, and aggregates without repeated file records.
     
     Returns:
         Dictionary containing files, folders, and grouped data
@@ -148,62 +478,68 @@ async def list_files_and_folders(
         if not folder.is_dir():
             return {"error": f"Path is not a directory: {folder_path}"}
         
-        all_files = []
-        all_dirs = []
-        file_groups = {}
-        
-        # Walk through directory
-        walk_func = folder.rglob if recursive else folder.glob
-        pattern = "*" if include_hidden else "[!.]*"
+        mode = resolve_mime_mode(mime_mode)
+        output_format = resolve_output_format(output_format)
+        offset = decode_cursor(cursor)
         
-        for path in walk_func(pattern):
-            if not include_hidden and any(part.startswith('.') for part in path.parts):
-                continue
-                
-            if path.is_dir():
-                all_dirs.append(get_file_info(path))
-            else:
-                file_info = get_file_info(path)
-                all_files.append(file_info)
-                
-                if group_by_extension:
-                    ext = file_info.extension or "no_extension"
-                    if ext not in file_groups:
-                        file_groups[ext] = []
-                    file_groups[ext].append(file_info)
+        # Collect lightweight entries (index rows or one stat per walked entry);
+        # FileInfo records are only built for the page that is returned
+        entries = None
+        if use_index:
+            entries = await query_index(folder, recursive=recursive, include_hidden=include_hidden)
+        if entries is None:
+            entries = await run_in_executor(
+                lambda: list(scan_tree(str(folder), recursive=recursive, include_hidden=include_hidden))
+            )
+        all_files = [e for e in entries if not e.is_dir]
+        all_dirs = [e for e in entries if e.is_dir]
         
-        # Sort files
+        # Sort files (folders are kept in name order unless sorting by name)
         reverse = sort_order.lower() == "desc"
-        if sort_by == "name":
-            all_files.sort(key=lambda x: x.name.lower(), reverse=reverse)
-            all_dirs.sort(key=lambda x: x.name.lower(), reverse=reverse)
-        elif sort_by == "size":
-            all_files.sort(key=lambda x: x.size, reverse=reverse)
-        elif sort_by == "modified":
-            all_files.sort(key=lambda x: x.modified, reverse=reverse)
-        elif sort_by == "created":
-            all_files.sort(key=lambda x: x.created, reverse=reverse)
+        sort_key = SORT_KEYS.get(sort_by)
+        if sort_key:
+            all_files.sort(key=sort_key, reverse=reverse)
+        all_dirs.sort(key=SORT_KEYS["name"], reverse=reverse and sort_by == "name")
+        
+        # Select the requested page
+        ordered = all_dirs + all_files
+        end = offset + limit if limit else len(ordered)
+        page = ordered[offset:end]
+        next_cursor = encode_cursor(end) if end < len(ordered) else None
+        if output_format != "verbose":
+            return await compact_listing(
+                folder, page, all_files, all_dirs, mode, output_format, human_readable,
+                group_by_extension, stream, chunk_size, offset, end, next_cursor, ctx
+            )
+        page_info = await run_in_executor(lambda: [entry_file_info(e, mode) for e in page])
+        page_dirs = [i for i in page_info if i.is_dir]
+        page_files = [i for i in page_info if not i.is_dir]
+        
+        # Aggregate by extension over every file
+        extension_totals = extension_totals_of(all_files)
         
         # Prepare grouped data
         grouped_data = []
         if group_by_extension:
-            for ext, files in file_groups.items():
-                total_size = sum(f.size for f in files)
+            members = {}
+            if group_files:
+                for file_info in page_files:
+                    members.setdefault(file_info.extension or "no_extension", []).append(file_info)
+            for ext, (count, total_size) in extension_totals.items():
                 grouped_data.append(FileGroup(
                     extension=ext,
-                    count=len(files),
+                    count=count,
                     total_size=total_size,
                     total_size_human=humanize.naturalsize(total_size),
-                    files=sorted(files, key=lambda x: x.name.lower())
+                    files=sorted(members.get(ext, []), key=lambda x: x.name.lower())
                 ))
             grouped_data.sort(key=lambda x: x.count, reverse=True)
         
         # Prepare summary
-        total_size = sum(f.size for f in all_files)
-        extensions_count = {}
-        for file in all_files:
-            ext = file.extension or "no_extension"
-            extensions_count[ext] = extensions_count.get(ext, 0) + 1
+        total_size = sum(size for _, size in extension_totals.values())
+        
+        def summary_file(key, pick):
+            return entry_file_info(pick(all_files, key=key), mode) if all_files else None
         
         summary = FolderSummary(
             path=str(folder),
@@ -211,20 +547,34 @@ async def list_files_and_folders(
             total_dirs=len(all_dirs),
             total_size=total_size,
             total_size_human=humanize.naturalsize(total_size),
-            extensions=extensions_count,
-            largest_file=max(all_files, key=lambda x: x.size) if all_files else None,
-            oldest_file=min(all_files, key=lambda x: x.created) if all_files else None,
-            newest_file=max(all_files, key=lambda x: x.created) if all_files else None
+            extensions={ext: count for ext, (count, _) in extension_totals.items()},
+            largest_file=summary_file(SORT_KEYS["size"], max),
+            oldest_file=summary_file(SORT_KEYS["created"], min),
+            newest_file=summary_file(SORT_KEYS["created"], max)
         )
         
+        files = [f.dict() for f in page_files]
+        folders = [d.dict() for d in page_dirs]
+        streamed = stream and ctx is not None
+        if streamed:
+            sent = offset
+            for i in range(0, len(page_info), chunk_size):
+                chunk = page_info[i:i + chunk_size]
+                sent += len(chunk)
+                await stream_records(ctx, "entries", [c.dict() for c in chunk], sent, end)
+            files, folders = [], []
+        
         return {
             "success": True,
             "folder": str(folder),
             "summary": summary.dict(),
-            "files": [f.dict() for f in all_files],
-            "folders": [d.dict() for d in all_dirs],
+            "files": files,
+            "folders": folders,
             "grouped_by_extension": [g.dict() for g in grouped_data] if group_by_extension else [],
-            "total_items": len(all_files) + len(all_dirs)
+            "total_items": len(ordered),
+            "returned_items": len(page_info),
+            "streamed": streamed,
+            "next_cursor": next_cursor
         }
         
     except Exception as e:
@@ -333,7 +683,7 @@ async def move_file(
         if target.exists() and not overwrite:
             return {"error": f"Target exists: {target_path}. Use overwrite=True to overwrite."}
         
-        await run_in_executor(shutil.move, str(source), str(target))
+        await run_in_executor(partial(shutil.move, str(source), str(target), copy_function=copy2))
         
         return {
             "success": True,
@@ -349,15 +699,24 @@ async def move_file(
 async def copy_file(
     source_path: str = Field(..., description="Source file/folder path"),
     target_path: str = Field(..., description="Destination path"),
-    overwrite: bool = Field(False, description="Overwrite if destination exists")
+    overwrite: bool = Field(False, description="Overwrite if destination exists"),
+    resume: bool = Field(False, description="Continue interrupted copies from their .partial files"),
+    concurrency: int = Field(DEFAULT_BATCH_CONCURRENCY, description="Maximum number of worker jobs when copying a folder"),
+    ctx: Optional[Context] = None
 ) -> Dict[str, Any]:
     """
     Copy a file or folder.
     
+    Files are copied with reflink, copy_file_range or sendfile when the
+    filesystem supports them, falling back to a buffered copy. Folders are
+    copied file by file in parallel. Byte progress is reported to the client.
+    
     Args:
         source_path: Path to the file/folder to copy
         target_path: Destination path
         overwrite: Overwrite if destination exists
+        resume: Resume interrupted copies instead of starting over
+        concurrency: Limit on worker jobs in flight for folder copies
     
     Returns:
         Operation result
@@ -372,14 +731,48 @@ async def copy_file(
         if target.exists() and not overwrite:
             return {"error": f"Target exists: {target_path}. Use overwrite=True to overwrite."}
         
-        if source.is_dir():
-            await run_in_executor(shutil.copytree, str(source), str(target), dirs_exist_ok=overwrite)
-        else:
-            await run_in_executor(shutil.copy2, str(source), str(target))
+        progress = CopyProgress()
+        reporter = None
+        if ctx is not None:
+            reporter = asyncio.create_task(report_copy_progress(ctx, progress))
+        
+        try:
+            if source.is_dir():
+                folders, files = await run_in_executor(plan_copytree, str(source), str(target))
+                progress.total = sum(size for _, _, size in files)
+                await run_in_executor(lambda: [os.makedirs(folder, exist_ok=overwrite) for _, folder in folders])
+                chunks = chunk_operations(files, [size for _, _, size in files])
+                chunk_results: List[List[Dict[str, Any]]] = [[] for _ in chunks]
+                
+                async def run_chunk(index: int) -> Dict[str, Any]:
+                    chunk_results[index] = await run_in_executor(copy_chunk, chunks[index], resume, progress)
+                    return {"success": True}
+                
+                await run_graph([set() for _ in chunks], run_chunk, concurrency)
+                # Folder metadata last, deepest first, as copying files changes mtimes
+                await run_in_executor(lambda: [shutil.copystat(src, dst) for src, dst in reversed(folders)])
+                
+                failed = [r for chunk in chunk_results for r in chunk if not r["success"]]
+                if failed:
+                    return {
+                        "error": f"Failed to copy {len(failed)} of {len(files)} files",
+                        "failures": failed
+                    }
+                copy_details = {"files_copied": len(files), "bytes_copied": progress.done}
+            else:
+                progress.total = source.stat().st_size
+                copy_details = await run_in_executor(copy_file_data, str(source), str(target), resume, progress)
+        finally:
+            if reporter is not None:
+                reporter.cancel()
+        
+        if ctx is not None:
+            await ctx.report_progress(progress=progress.done, total=progress.total, message="Copy complete")
         
         return {
             "success": True,
             "message": f"Copied {source_path} to {target_path}",
+            "copy": copy_details,
             "source": get_file_info(source).dict(),
             "destination": get_file_info(target).dict()
         }
@@ -391,12 +784,29 @@ async def copy_file(
 async def search_files(
     search_path: str = Field(..., description="Path to search in"),
     name_pattern: Optional[str] = Field(None, description="Filename pattern (supports wildcards)"),
-    content_search: Optional[str] = Field(None, description="Text to search in file contents"),
+    content_search: Optional[str] = Field(None, description="Text (or regex) to search in file contents"),
+    content_terms: Optional[List[str]] = Field(None, description="Additional content patterns, combined using match_mode"),
+    match_mode: str = Field("any", description="Match files containing any or all of the content patterns"),
+    regex: bool = Field(False, description="Treat content patterns as regular expressions"),
     extension: Optional[str] = Field(None, description="File extension filter"),
     min_size: Optional[int] = Field(None, description="Minimum file size in bytes"),
     max_size: Optional[int] = Field(None, description="Maximum file size in bytes"),
     recursive: bool = Field(True, description="Search recursively"),
-    case_sensitive: bool = Field(False, description="Case sensitive search")
+    case_sensitive: bool = Field(False, description="Case sensitive search"),
+    modified_after: Optional[str] = Field(None, description="Only files modified at/after this ISO date"),
+    modified_before: Optional[str] = Field(None, description="Only files modified at/before this ISO date"),
+    use_index: bool = Field(True, description="Answer from the metadata index when the folder is indexed"),
+    limit: Optional[int] = Field(None, description="Results per page"),
+    cursor: Optional[str] = Field(None, description="Cursor from a previous call's next_cursor"),
+    stream: bool = Field(False, description="Send results as progress-notification chunks as they are found"),
+    chunk_size: int = Field(100, description="Results per streamed chunk"),
+    concurrency: int = Field(DEFAULT_CONCURRENCY, description="Files scanned in parallel for content search"),
+    max_results: Optional[int] = Field(None, description="Stop searching once this many files matched"),
+    max_matches_per_file: int = Field(5, ge=1, description="Matching lines reported per file (at least 1)"),
+    context_lines: int = Field(0, description="Lines of context around each matching line"),
+    output_format: str = Field("verbose", description="Result encoding: verbose, compact (table) or columnar"),
+    human_readable: bool = Field(False, description="Add humanized sizes to compact/columnar results"),
+    ctx: Optional[Context] = None
 ) -> Dict[str, Any]:
     """
     Search for files with various criteria.
@@ -404,12 +814,34 @@ async def search_files(
     Args:
         search_path: Root directory to search
         name_pattern: Filename pattern with wildcards (*, ?)
-        content_search: Text to search in file contents
+        content_search: Text (or regex) to search in file contents
+        content_terms: Additional content patterns
+        match_mode: "any" or "all" of the content patterns must match
+        regex: Treat content patterns as regular expressions
         extension: Filter by file extension
         min_size: Minimum file size
         max_size: Maximum file size
         recursive: Search subdirectories
         case_sensitive: Case sensitive matching
+        modified_after: Only files modified at or after this date
+        modified_before: Only files modified at or before this date
+        use_index: Use the metadata index instead of walking, when available
+        limit: Page size; the search stops as soon as the page is full
+        cursor: Continue from a previous page
+        stream: Deliver results as progress-notification chunks
+        chunk_size: Number of results per streamed chunk
+        concurrency: Number of files scanned in parallel for content search
+        max_results: Stop walking and scanning once this many files matched
+        max_matches_per_file: Number of matching lines reported per file
+        context_lines: Lines of context before/after each matching line
+        output_format: verbose SearchResult records, or a compact/columnar table
+        human_readable: Include a size_human column
+    
+    Content search memory-maps each file, skips binary files and matches
+    with a precompiled bytes pattern. Matching lines are reported with their
+    line numbers; files are walked lazily so limits stop the search early.
+    The compact and columnar formats return the hits as one "results" table
+    (see formats).
     
     Returns:
         Search results
@@ -420,73 +852,174 @@ async def search_files(
         if not search_dir.exists() or not search_dir.is_dir():
             return {"error": f"Invalid search path: {search_path}"}
         
+        patterns = tuple(p for p in [content_search, *(content_terms or [])] if p)
+        if match_mode not in ("any", "all"):
+            return {"error": f"Invalid match_mode: {match_mode}. Use 'any' or 'all'"}
+        output_format = resolve_output_format(output_format)
+        if output_format == "verbose":
+            encode_results = lambda items: [r.dict() for r in items]
+        else:
+            encode_results = partial(encode_search_results, root=str(search_dir),
+                                     output_format=output_format, human_readable=human_readable)
+        
         results = []
+        offset = decode_cursor(cursor)
+        streamed = stream and ctx is not None
+        pending = []
+        matched = 0
+        next_cursor = None
         walk_func = search_dir.rglob if recursive else search_dir.glob
         pattern = name_pattern or "*"
+        modified_after_ns = parse_timestamp_ns(modified_after)
+        modified_before_ns = parse_timestamp_ns(modified_before)
         
-        for path in walk_func(pattern):
-            if path.is_dir():
-                continue
-            
-            # Extension filter
+        def passes_filters(path: Path, stat: os.stat_result) -> bool:
             if extension and not str(path).lower().endswith(extension.lower()):
-                continue
-            
-            # Size filters
-            stat = path.stat()
+                return False
             if min_size is not None and stat.st_size < min_size:
-                continue
+                return False
             if max_size is not None and stat.st_size > max_size:
-                continue
-            
-            matches = []
-            
-            # Content search
-            if content_search:
+                return False
+            if modified_after_ns is not None and stat.st_mtime_ns < modified_after_ns:
+                return False
+            if modified_before_ns is not None and stat.st_mtime_ns > modified_before_ns:
+                return False
+            return True
+        
+        def narrowed(paths: Set[str]):
+            """Apply the walk's filters to candidate paths from the trigram index."""
+            for path_str in sorted(paths):
+                path = Path(path_str)
+                if not _is_under(path, search_dir, recursive) or not fnmatchcase(path.name, pattern):
+                    continue
                 try:
-                    content = await run_in_executor(path.read_text, encoding='utf-8', errors='ignore')
-                    search_text = content_search if case_sensitive else content_search.lower()
-                    file_content = content if case_sensitive else content.lower()
-                    
-                    if search_text in file_content:
-                        # Find all occurrences
-                        start = 0
-                        while True:
-                            pos = file_content.find(search_text, start)
-                            if pos == -1:
-                                break
-                            context_start = max(0, pos - 20)
-                            context_end = min(len(file_content), pos + len(search_text) + 20)
-                            matches.append(f"...{file_content[context_start:context_end]}...")
-                            start = pos + 1
-                            if len(matches) >= 5:  # Limit matches per file
-                                break
-                except:
-                    pass
-            
-            if content_search and not matches:
-                continue
-            
-            results.append(SearchResult(
-                path=str(path),
-                name=path.name,
-                is_dir=False,
-                size=stat.st_size,
-                size_human=humanize.naturalsize(stat.st_size),
-                matches=matches
-            ))
+                    stat = path.stat()
+                except OSError:
+                    continue
+                if passes_filters(path, stat):
+                    yield path, stat.st_size
+        
+        def walk():
+            for path in walk_func(pattern):
+                if path.is_dir():
+                    continue
+                stat = path.stat()
+                if passes_filters(path, stat):
+                    yield path, stat.st_size
+        
+        # Candidate files come from the trigram index for literal content
+        # searches, else from the metadata index, else from walking the folder
+        candidates = None
+        if use_index and os.sep not in pattern:
+            if patterns and not regex:
+                paths = await query_content_index(search_dir, patterns, case_sensitive, match_mode == "all")
+                if paths is not None:
+                    candidates = iterate_in_executor(narrowed(paths))
+            if candidates is None:
+                entries = await query_index(
+                    search_dir,
+                    recursive=recursive,
+                    include_hidden=True,
+                    files_only=True,
+                    extension=extension,
+                    min_size=min_size,
+                    max_size=max_size,
+                    modified_after_ns=modified_after_ns,
+                    modified_before_ns=modified_before_ns
+                )
+                if entries is not None:
+                    candidates = iterate_in_executor(
+                        (Path(e.path), e.size) for e in entries if fnmatchcase(e.name, pattern)
+                    )
+        
+        # The walk is drained lazily so that limits stop it early
+        if candidates is None:
+            candidates = iterate_in_executor(walk())
+        
+        async def matching_candidates():
+            """Yield (path, size, matches) for candidates passing the content filter."""
+            if not patterns:
+                async for path, size in candidates:
+                    yield path, size, []
+                return
+            scanner = scan_files(
+                candidates,
+                lambda c: str(c[0]),
+                run_read,
+                patterns,
+                case_sensitive=case_sensitive,
+                regex=regex,
+                match_all=match_mode == "all",
+                max_matches=max_matches_per_file,
+                context_lines=context_lines,
+                concurrency=concurrency,
+                size_of=lambda c: c[1]
+            )
+            async with aclosing(scanner) as scanned:
+                async for (path, size), matches in scanned:
+                    yield path, size, matches
+        
+        async with aclosing(candidates), aclosing(matching_candidates()) as matching:
+            async for path, size, matches in matching:
+                # Skip results of earlier pages; stop once this page is full
+                matched += 1
+                if matched <= offset:
+                    continue
+                if limit and len(results) >= limit:
+                    next_cursor = encode_cursor(offset + len(results))
+                    break
+                
+                if output_format != "verbose":
+                    result = (path, size, matches)
+                else:
+                    result = SearchResult(
+                        path=str(path),
+                        name=path.name,
+                        is_dir=False,
+                        size=size,
+                        size_human=humanize.naturalsize(size),
+                        matches=[m["snippet"] for m in matches],
+                        line_matches=[
+                            ContentMatch(
+                                line_number=m["line_number"],
+                                line=m["line"],
+                                context_before=m["context_before"],
+                                context_after=m["context_after"]
+                            )
+                            for m in matches
+                        ]
+                    )
+                results.append(result)
+                if streamed:
+                    pending.append(result)
+                    if len(pending) >= chunk_size:
+                        await stream_records(ctx, "results", encode_results(pending), offset + len(results))
+                        pending = []
+                if max_results and matched >= max_results:
+                    break
+        
+        if streamed:
+            await stream_records(ctx, "results", encode_results(pending), offset + len(results))
         
         return {
             "success": True,
             "search_path": str(search_dir),
+            "format": output_format,
             "total_results": len(results),
-            "results": [r.dict() for r in results],
+            "results": encode_results([] if streamed else results),
+            "streamed": streamed,
+            "next_cursor": next_cursor,
             "criteria": {
                 "name_pattern": name_pattern,
                 "content_search": content_search,
+                "content_terms": content_terms,
+                "match_mode": match_mode,
+                "regex": regex,
                 "extension": extension,
                 "min_size": min_size,
-                "max_size": max_size
+                "max_size": max_size,
+                "modified_after": modified_after,
+                "modified_before": modified_before
             }
         }
         
@@ -495,13 +1028,21 @@ async def search_files(
 
 @mcp.tool()
 async def get_file_stats(
-    file_path: str = Field(..., description="Path to the file")
+    file_path: str = Field(..., description="Path to the file"),
+    algorithm: Optional[str] = Field(None, description="Digest algorithm: md5, sha256, blake2b or xxhash (defaults to server setting)"),
+    use_cache: bool = Field(True, description="Reuse the cached digest when the file is unchanged")
 ) -> Dict[str, Any]:
     """
     Get detailed statistics about a file.
     
+    The file is read once to compute the digest, line count and encoding
+    guess together; results are cached by (device, inode, size, mtime), so
+    repeat calls on an unchanged file do not read it again.
+    
     Args:
         file_path: Path to the file
+        algorithm: Digest algorithm (md5, sha256, blake2b, xxhash)
+        use_cache: Use the persistent digest cache
     
     Returns:
         Detailed file statistics
@@ -514,47 +1055,15 @@ async def get_file_stats(
         if file.is_dir():
             return {"error": f"Path is a directory, not a file: {file_path}"}
         
-        stat = file.stat()
-        
-        # Calculate MD5 hash
-        def calculate_md5():
-            hash_md5 = hashlib.md5()
-            with open(file, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
-        
-        md5_hash = await run_in_executor(calculate_md5)
-        
-        # Try to get line count
-        try:
-            line_count = await run_in_executor(lambda: sum(1 for _ in open(file, 'r', encoding='utf-8', errors='ignore')))
-        except:
-            line_count = None
-        
-        # Get encoding guess
-        try:
-            import chardet
-            rawdata = await run_in_executor(lambda: open(file, 'rb').read(10000))
-            encoding = chardet.detect(rawdata)['encoding']
-        except:
-            encoding = None
+        digest, stat = await digest_file(str(file), algorithm, use_cache)
+        file_info = await run_in_executor(
+            partial(file_info_dict, str(file), stat, mime_mode=resolve_mime_mode(None))
+        )
         
         return {
             "success": True,
-            "file_info": get_file_info(file).dict(),
-            "statistics": {
-                "md5_hash": md5_hash,
-                "line_count": line_count,
-                "encoding_guess": encoding,
-                "inode": stat.st_ino,
-                "device": stat.st_dev,
-                "hard_links": stat.st_nlink,
-                "user_id": stat.st_uid,
-                "group_id": stat.st_gid,
-                "access_time": datetime.fromtimestamp(stat.st_atime).isoformat(),
-                "change_time": datetime.fromtimestamp(stat.st_ctime).isoformat()
-            }
+            "file_info": file_info,
+            "statistics": file_statistics(digest, stat)
         }
         
     except Exception as e:
@@ -562,49 +1071,77 @@ async def get_file_stats(
 
 @mcp.tool()
 async def batch_operations(
-    operations: List[Dict[str, Any]] = Field(..., description="List of operations to perform")
+    operations: List[Dict[str, Any]] = Field(..., description="List of operations to perform"),
+    concurrency: int = Field(DEFAULT_BATCH_CONCURRENCY, description="Maximum number of operations running at once"),
+    on_error: str = Field("continue", description="continue, or stop_on_error to start no new operations after a failure")
 ) -> Dict[str, Any]:
     """
     Perform batch operations on files.
     
+    Independent operations run concurrently; operations touching the same
+    path (or a path inside another's) run in the order given, so a
+    create_folder listed before copies into it completes first.
+    
     Args:
         operations: List of operation objects with type and parameters
+        concurrency: Limit on operations in flight
+        on_error: Error policy (continue or stop_on_error)
     
     Returns:
-        Batch operation results
+        Batch operation results with per-operation timing
     """
     try:
-        results = []
+        if on_error not in ERROR_POLICIES:
+            return {"error": f"Invalid on_error: {on_error}. Use one of: {', '.join(ERROR_POLICIES)}"}
         
-        for op in operations:
-            op_type = op.get("type")
-            params = op.get("params", {})
-            
-            if op_type == "copy":
-                result = await copy_file(**params)
-            elif op_type == "move":
-                result = await move_file(**params)
-            elif op_type == "delete":
-                result = await delete_path(**params)
-            elif op_type == "create_folder":
-                result = await create_folder(**params)
+        tools = {
+            "copy": copy_file,
+            "move": move_file,
+            "delete": delete_path,
+            "create_folder": create_folder
+        }
+        ops = [(op.get("type"), op.get("params", {})) for op in operations]
+        accesses = await run_in_executor(lambda: [operation_accesses(t, p) for t, p in ops])
+        dependencies = plan_dependencies(accesses)
+        timings: Dict[int, Tuple[float, float]] = {}
+        started = time.perf_counter()
+        
+        async def run_one(index: int) -> Dict[str, Any]:
+            op_type, params = ops[index]
+            begin = time.perf_counter()
+            if op_type in tools:
+                result = await call_tool_fn(tools[op_type], params)
             else:
                 result = {"error": f"Unknown operation type: {op_type}"}
-            
-            results.append({
+            timings[index] = ((begin - started) * 1000, (time.perf_counter() - begin) * 1000)
+            return result
+        
+        outcomes = await run_graph(dependencies, run_one, concurrency, stop_on_error=on_error == "stop_on_error")
+        
+        results = []
+        for index, ((op_type, params), result) in enumerate(zip(ops, outcomes)):
+            entry = {
                 "type": op_type,
                 "params": params,
-                "result": result
-            })
+                "result": result if result is not None else {"error": "Skipped after an earlier operation failed"},
+                "skipped": result is None
+            }
+            if index in timings:
+                entry["started_ms"] = round(timings[index][0], 3)
+                entry["duration_ms"] = round(timings[index][1], 3)
+            results.append(entry)
         
         # Count successes
         success_count = sum(1 for r in results if r["result"].get("success"))
+        skipped_count = sum(1 for r in results if r["skipped"])
         
         return {
             "success": True,
             "total_operations": len(results),
             "successful_operations": success_count,
-            "failed_operations": len(results) - success_count,
+            "failed_operations": len(results) - success_count - skipped_count,
+            "skipped_operations": skipped_count,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3),
             "operations": results
         }
         
@@ -617,17 +1154,25 @@ async def organize_by_extension(
     target_dir: Optional[str] = Field(None, description="Target directory (defaults to source)"),
     create_subfolders: bool = Field(True, description="Create subfolders for each extension"),
     move_files: bool = Field(False, description="Move files instead of copying"),
-    dry_run: bool = Field(False, description="Show what would be done without actually doing it")
+    dry_run: bool = Field(False, description="Show what would be done without actually doing it"),
+    on_conflict: str = Field("rename", description="When the target name is taken: rename, skip or overwrite"),
+    concurrency: int = Field(DEFAULT_BATCH_CONCURRENCY, description="Maximum number of worker jobs running at once"),
+    ctx: Optional[Context] = None
 ) -> Dict[str, Any]:
     """
     Organize files by their extensions into subfolders.
     
+    Moves within one filesystem are plain renames; copies are spread over
+    the worker pool. Progress is reported to the client as files complete.
+    
     Args:
         source_dir: Directory containing files to organize
         target_dir: Where to organize files (defaults to source)
         create_subfolders: Create folders for each extension
         move_files: Move files instead of copying
         dry_run: Preview changes without executing
+        on_conflict: Rename ("name (1).ext"), skip or overwrite on name collisions
+        concurrency: Limit on worker jobs in flight
     
     Returns:
         Organization plan or results
@@ -638,44 +1183,45 @@ async def organize_by_extension(
         
         if not source.exists() or not source.is_dir():
             return {"error": f"Invalid source directory: {source_dir}"}
+        if on_conflict not in CONFLICT_POLICIES:
+            return {"error": f"Invalid on_conflict: {on_conflict}. Use one of: {', '.join(CONFLICT_POLICIES)}"}
         
-        # Scan files
-        files = []
-        for path in source.rglob("*"):
-            if path.is_file():
-                files.append(get_file_info(path))
-        
-        # Group by extension
-        extension_groups = {}
-        for file in files:
-            ext = file.extension.lstrip('.') if file.extension else "no_extension"
-            if ext not in extension_groups:
-                extension_groups[ext] = []
-            extension_groups[ext].append(file)
-        
-        # Create organization plan
-        plan = []
-        total_files = 0
-        
-        for ext, ext_files in extension_groups.items():
-            if create_subfolders:
-                target_folder = target / ext
-            else:
-                target_folder = target
-            
-            for file in ext_files:
-                source_path = Path(file.path)
-                target_path = target_folder / source_path.name
-                
-                operation = {
-                    "source": str(source_path),
-                    "destination": str(target_path),
+        # Scan files (from the metadata index when the folder is indexed)
+        entries = await query_index(source, recursive=True, include_hidden=True, files_only=True)
+        if entries is None:
+            entries = await run_in_executor(
+                lambda: list(scan_tree(str(source), recursive=True, include_hidden=True, files_only=True))
+            )
+        
+        # Create organization plan (target folders are listed once each)
+        def build_plan():
+            names = NameAllocator()
+            plan, sizes, skipped = [], [], []
+            extension_groups: Dict[str, int] = {}
+            in_place = 0
+            for entry in entries:
+                ext = entry.extension.lstrip('.') if entry.extension else "no_extension"
+                extension_groups[ext] = extension_groups.get(ext, 0) + 1
+                target_folder = str(target / ext) if create_subfolders else str(target)
+                if os.path.dirname(entry.path) == target_folder:
+                    in_place += 1
+                    continue
+                name = names.claim(target_folder, entry.name, on_conflict)
+                if name is None:
+                    skipped.append(entry.path)
+                    continue
+                plan.append({
+                    "source": entry.path,
+                    "destination": os.path.join(target_folder, name),
                     "extension": ext,
                     "operation": "move" if move_files else "copy",
-                    "would_create_folder": create_subfolders and not target_folder.exists()
-                }
-                plan.append(operation)
-                total_files += 1
+                    "would_create_folder": target_folder in names.missing
+                })
+                sizes.append(entry.size)
+            return plan, sizes, skipped, extension_groups, in_place
+        
+        plan, sizes, skipped, extension_groups, in_place = await run_in_executor(build_plan)
+        total_files = len(plan)
         
         if dry_run:
             return {
@@ -683,6 +1229,8 @@ async def organize_by_extension(
                 "dry_run": True,
                 "total_files": total_files,
                 "unique_extensions": len(extension_groups),
+                "already_organized": in_place,
+                "skipped_conflicts": skipped,
                 "plan": plan,
                 "summary": {
                     "source": str(source),
@@ -692,33 +1240,28 @@ async def organize_by_extension(
                 }
             }
         
-        # Execute operations
-        results = []
-        for op in plan:
-            source_path = Path(op["source"])
-            target_path = Path(op["destination"])
-            
-            # Create target folder if needed
-            if op["would_create_folder"]:
-                target_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            # Perform operation
-            try:
-                if op["operation"] == "move":
-                    shutil.move(str(source_path), str(target_path))
-                else:
-                    shutil.copy2(str(source_path), str(target_path))
-                results.append({
-                    **op,
-                    "success": True
-                })
-            except Exception as e:
-                results.append({
-                    **op,
-                    "success": False,
-                    "error": str(e)
-                })
+        # Execute operations: folders first, then chunks of files on the pool
+        folders = sorted({os.path.dirname(op["destination"]) for op in plan if op["would_create_folder"]})
+        await run_in_executor(lambda: [os.makedirs(folder, exist_ok=True) for folder in folders])
+        rename = move_files and await run_in_executor(same_device, str(source), str(target))
+        chunks = chunk_operations(plan, [0 if rename else size for size in sizes])
+        chunk_results: List[List[Dict[str, Any]]] = [[] for _ in chunks]
+        completed = 0
+        
+        async def run_chunk(index: int) -> Dict[str, Any]:
+            nonlocal completed
+            chunk_results[index] = await run_in_executor(execute_chunk, chunks[index], rename)
+            completed += len(chunks[index])
+            if ctx is not None:
+                await ctx.report_progress(
+                    progress=completed,
+                    total=total_files,
+                    message=f"Organized {completed}/{total_files} files"
+                )
+            return {"success": True}
         
+        await run_graph([set() for _ in chunks], run_chunk, concurrency)
+        results = [result for chunk in chunk_results for result in chunk]
         success_count = sum(1 for r in results if r["success"])
         
         return {
@@ -727,34 +1270,609 @@ async def organize_by_extension(
             "total_files": total_files,
             "successful_operations": success_count,
             "failed_operations": len(results) - success_count,
+            "already_organized": in_place,
+            "skipped_conflicts": skipped,
             "results": results,
-            "extension_summary": {ext: len(files) for ext, files in extension_groups.items()}
+            "extension_summary": extension_groups
         }
         
     except Exception as e:
         return {"error": f"Organization failed: {str(e)}"}
 
+@mcp.tool()
+async def find_duplicates(
+    search_path: str = Field(..., description="Directory to search for duplicate files"),
+    recursive: bool = Field(True, description="Search subdirectories"),
+    include_hidden: bool = Field(False, description="Include hidden files/folders"),
+    extension: Optional[str] = Field(None, description="Only consider files with this extension"),
+    min_size: int = Field(1, description="Ignore files smaller than this many bytes"),
+    algorithm: Optional[str] = Field(None, description="Digest algorithm for full hashes (defaults to server setting)"),
+    use_index: bool = Field(True, description="Take candidate files from the metadata index when the folder is indexed"),
+    action: str = Field("report", description="report, hardlink or reflink duplicates to the first copy"),
+    dry_run: bool = Field(True, description="Show what would be linked without actually doing it"),
+    limit: Optional[int] = Field(None, description="Maximum number of duplicate groups to return (largest savings first)")
+) -> Dict[str, Any]:
+    """
+    Find files with identical content.
+    
+    Candidates are grouped by size, then by a hash of their first and last
+    blocks, and only the remaining collisions are fully hashed (in parallel,
+    through the digest cache). Optionally replaces duplicates with hardlinks
+    or reflinks of the first copy in each group; a pair where either file
+    changed since it was hashed is skipped and reported as such.
+    
+    Args:
+        search_path: Directory to search
+        recursive: Whether to search subdirectories
+        include_hidden: Include hidden files and folders
+        extension: Restrict to one extension
+        min_size: Minimum file size (empty files are skipped by default)
+        algorithm: Full-hash algorithm (md5, sha256, blake2b, xxhash)
+        use_index: Use the metadata index instead of walking, when available
+        action: What to do with duplicates (report, hardlink, reflink)
+        dry_run: Preview link operations without executing
+        limit: Number of groups to return
+    
+    Returns:
+        Duplicate groups with reclaimable bytes, and link results
+    """
+    try:
+        root = Path(search_path).expanduser().resolve()
+        
+        if not root.exists() or not root.is_dir():
+            return {"error": f"Invalid search directory: {search_path}"}
+        if action not in DUPLICATE_ACTIONS:
+            return {"error": f"Invalid action: {action}. Use one of: {', '.join(DUPLICATE_ACTIONS)}"}
+        algorithm = resolve_algorithm(algorithm)
+        min_size = max(1, min_size)
+        
+        # Stage 1: size (from the index or a single walk, no file reads)
+        entries = None
+        if use_index:
+            entries = await query_index(
+                root,
+                include_hidden=include_hidden,
+                recursive=recursive,
+                files_only=True,
+                extension=extension,
+                min_size=min_size
+            )
+        if entries is None:
+            suffix = extension.lower() if extension else None
+            if suffix and not suffix.startswith('.'):
+                suffix = f".{suffix}"
+            entries = await run_in_executor(lambda: [
+                e for e in scan_tree(str(root), recursive=recursive, include_hidden=include_hidden, files_only=True)
+                if e.size >= min_size and (suffix is None or e.extension == suffix)
+            ])
+        size_groups = group_by(entries, lambda e: e.size)
+        
+        # Stage 2: first/last block hash of files sharing a size, bucketed by (size, partial hash)
+        candidates = [(e.path, e.size) for group in size_groups for e in group]
+        signatures = await asyncio.gather(*(run_in_executor(partial_signature, path) for path, _ in candidates))
+        partial_groups = []
+        for group in group_by(
+            [(path, size, sig) for (path, size), sig in zip(candidates, signatures) if sig is not None],
+            lambda item: (item[1], item[2][1])
+        ):
+            paths = unique_inodes([path for path, _, _ in group], [sig[0] for _, _, sig in group])
+            if len(paths) > 1:
+                partial_groups.append(paths)
+        
+        # Stage 3: full hash of the remaining collisions, in parallel
+        to_hash = [path for group in partial_groups for path in group]
+        
+        signatures_at_hash = {}
+        
+        async def full_hash(path: str):
+            try:
+                digest, stat = await digest_file(path, algorithm)
+                signatures_at_hash[path] = file_signature(stat)
+                return digest.digest, stat.st_size
+            except OSError:
+                return None
+        
+        hashes = dict(zip(to_hash, await asyncio.gather(*(full_hash(path) for path in to_hash))))
+        
+        groups = []
+        for group in partial_groups:
+            for same in group_by([p for p in group if hashes[p] is not None], lambda p: hashes[p]):
+                digest, size = hashes[same[0]]
+                groups.append({
+                    "hash": digest,
+                    "size": size,
+                    "size_human": humanize.naturalsize(size),
+                    "count": len(same),
+                    "reclaimable_bytes": size * (len(same) - 1),
+                    "reclaimable_human": humanize.naturalsize(size * (len(same) - 1)),
+                    "files": sorted(same)
+                })
+        groups.sort(key=lambda g: (-g["reclaimable_bytes"], g["files"][0]))
+        reclaimable = sum(g["reclaimable_bytes"] for g in groups)
+        
+        result = {
+            "success": True,
+            "search_path": str(root),
+            "algorithm": algorithm,
+            "files_scanned": len(entries),
+            "stages": {
+                "same_size": len(candidates),
+                "same_partial_hash": len(to_hash),
+                "duplicates": sum(g["count"] for g in groups)
+            },
+            "duplicate_groups": len(groups),
+            "reclaimable_bytes": reclaimable,
+            "reclaimable_human": humanize.naturalsize(reclaimable),
+            "groups": groups[:limit] if limit is not None else groups
+        }
+        
+        if action == "report":
+            return result
+        
+        # Link every duplicate to the first file of its group
+        plan = [
+            {"keep": group["files"][0], "duplicate": duplicate, "operation": action, "size": group["size"]}
+            for group in groups
+            for duplicate in group["files"][1:]
+        ]
+        result["dry_run"] = dry_run
+        if dry_run:
+            result["plan"] = plan
+            return result
+        
+        def link(op: Dict[str, Any]) -> Dict[str, Any]:
+            # Files modified since they were hashed are skipped, not linked over
+            try:
+                replace_with_link(
+                    op["keep"], op["duplicate"], action,
+                    signatures_at_hash[op["keep"]], signatures_at_hash[op["duplicate"]]
+                )
+                return {**op, "success": True}
+            except FileChangedError as e:
+                return {**op, "success": False, "skipped": True, "error": str(e)}
+            except Exception as e:
+                return {**op, "success": False, "error": str(e)}
+        
+        results = await asyncio.gather(*(run_in_executor(link, op) for op in plan))
+        linked = [r for r in results if r["success"]]
+        skipped = [r for r in results if r.get("skipped")]
+        result.update({
+            "successful_operations": len(linked),
+            "failed_operations": len(results) - len(linked) - len(skipped),
+            "skipped_changed": len(skipped),
+            "reclaimed_bytes": sum(r["size"] for r in linked),
+            "results": results
+        })
+        return result
+        
+    except Exception as e:
+        return {"error": f"Failed to find duplicates: {str(e)}"}
+
+@mcp.tool()
+async def disk_usage(
+    folder_path: str = Field(..., description="Folder to measure"),
+    max_depth: int = Field(1, description="Report subfolders down to this many levels below the folder"),
+    top_n: int = Field(20, description="Number of heaviest subfolders to return"),
+    sort_by: str = Field("size", description="Rank subfolders by size, files or modified"),
+    include_hidden: bool = Field(False, description="Count hidden files/folders"),
+    refresh: bool = Field(False, description="Rescan every folder instead of reusing cached scans")
+) -> Dict[str, Any]:
+    """
+    Find the biggest subfolders (du-style recursive totals).
+    
+    Every folder below folder_path is read once, level by level, with the
+    folders of a level scanned in parallel. Per-folder scans are cached and
+    reused while the folder's mtime is unchanged, so repeating the call or
+    drilling into a subfolder only costs one stat per folder.
+    
+    Args:
+        folder_path: Folder to measure
+        max_depth: Deepest level of subfolders to report (0 for the total only)
+        top_n: Number of subfolders to return
+        sort_by: Rank subfolders by size, files or modified (newest first)
+        include_hidden: Count hidden files and folders
+        refresh: Ignore cached scans (picks up files rewritten in place)
+    
+    Returns:
+        The folder's totals and its heaviest subfolders
+    """
+    try:
+        folder = Path(folder_path).expanduser().resolve()
+        
+        if not folder.exists():
+            return {"error": f"Folder not found: {folder_path}"}
+        if not folder.is_dir():
+            return {"error": f"Path is not a directory: {folder_path}"}
+        if sort_by not in USAGE_SORT_KEYS:
+            return {"error": f"Invalid sort_by: {sort_by}. Use one of: {', '.join(USAGE_SORT_KEYS)}"}
+        
+        root = str(folder)
+        scans = {}
+        cached_dirs = 0
+        level = [root]
+        while level:
+            batches = [level[i:i + SCAN_BATCH_SIZE] for i in range(0, len(level), SCAN_BATCH_SIZE)]
+            results = await asyncio.gather(*(
+                run_in_executor(scan_directories, batch, include_hidden, refresh) for batch in batches
+            ))
+            level = []
+            for path, result in zip(chain.from_iterable(batches), chain.from_iterable(results)):
+                if result is None:
+                    continue
+                scan, cached = result
+                scans[path] = scan
+                cached_dirs += cached
+                level.extend(os.path.join(path, name) for name in scan.subdirs)
+        if root not in scans:
+            return {"error": f"Cannot read folder: {folder_path}"}
+        
+        totals = await run_in_executor(subtree_totals, scans)
+        total = totals[root]
+        
+        def describe(t) -> Dict[str, Any]:
+            return {
+                "size": t.bytes,
+                "size_human": humanize.naturalsize(t.bytes),
+                "files": t.files,
+                "dirs": t.dirs,
+                "newest_modified": datetime.fromtimestamp(t.newest_mtime_ns / 1e9).isoformat() if t.newest_mtime_ns else None
+            }
+        
+        subtrees = [
+            {
+                "path": path,
+                "depth": depth,
+                **describe(t),
+                "share": round(100 * t.bytes / total.bytes, 2) if total.bytes else 0.0
+            }
+            for path, depth, t in heaviest(totals, root, max_depth, top_n, sort_by)
+        ]
+        
+        return {
+            "success": True,
+            "folder": root,
+            "total": describe(total),
+            "subtrees": subtrees,
+            "max_depth": max_depth,
+            "sort_by": sort_by,
+            "scanned_dirs": len(scans) - cached_dirs,
+            "cached_dirs": cached_dirs
+        }
+        
+    except Exception as e:
+        return {"error": f"Failed to compute disk usage: {str(e)}"}
+
+@mcp.tool()
+async def build_index(
+    folder_path: str = Field(..., description="Folder to index"),
+    include_hidden: bool = Field(True, description="Index hidden files/folders too (needed by search_files and organize_by_extension)"),
+    mime_mode: str = Field("extension", description="MIME detection for indexed files: off, extension or content"),
+    watch: bool = Field(True, description="Keep the index fresh from filesystem events"),
+    content_index: bool = Field(False, description="Also build a trigram content index in the background"),
+    max_content_file_size: int = Field(DEFAULT_MAX_FILE_SIZE, description="Larger files are not content-indexed (always scanned)")
+) -> Dict[str, Any]:
+    """
+    Build (or rebuild) the persistent metadata index for a folder.
+    
+    Once indexed, listings, searches and organize runs under the folder are
+    answered from the index instead of walking the filesystem. search_files
+    and organize_by_extension always cover hidden files, so only an index
+    built with include_hidden (the default) answers them; listings that skip
+    hidden files are served by either kind. With content_index, a trigram
+    index of the folder's text files is built in the background; literal
+    content searches then only scan files that can match.
+    
+    Args:
+        folder_path: Folder to index
+        include_hidden: Also index hidden files and folders (required for search_files and organize_by_extension)
+        mime_mode: How to detect MIME types of indexed files
+        watch: Keep the index updated incrementally from filesystem events
+        content_index: Also build the trigram content index (in the background)
+        max_content_file_size: Files above this size are always scanned instead
+    
+    Returns:
+        Build result with entry count and duration
+    """
+    try:
+        folder = Path(folder_path).expanduser().resolve()
+        
+        if not folder.exists() or not folder.is_dir():
+            return {"error": f"Invalid folder: {folder_path}"}
+        
+        index_watcher.stop(str(folder))
+        result = await run_in_executor(
+            partial(metadata_index.build, str(folder), include_hidden=include_hidden, mime_mode=mime_mode, watch=watch)
+        )
+        watching = index_watcher.start(str(folder), run_in_executor) if watch else False
+        
+        content_building = False
+        if content_index:
+            root = str(folder)
+            if root not in content_index_builds:
+                content_index_watcher.stop(root)
+                content_index_builds[root] = asyncio.create_task(
+                    build_content_index(root, max_content_file_size, watch)
+                )
+            content_building = True
+        
+        return {
+            "success": True,
+            **result,
+            "watching": watching,
+            "content_index_building": content_building,
+            "index_path": metadata_index.db_path
+        }
+        
+    except Exception as e:
+        return {"error": f"Failed to build index: {str(e)}"}
+
+@mcp.tool()
+async def pool_status() -> Dict[str, Any]:
+    """
+    Show the worker pools' configuration and load.
+    
+    A pool with queued work (saturated) is the bottleneck; raise its size
+    with --io-workers/--cpu-workers or the matching environment variables.
+    
+    Returns:
+        Pool sizes, queue depth, wait times and utilization
+    """
+    try:
+        return {
+            "success": True,
+            **pools.stats()
+        }
+    except Exception as e:
+        return {"error": f"Failed to get pool status: {str(e)}"}
+
+def pool_gauges() -> Dict[str, List[Tuple[Dict[str, str], float]]]:
+    """Current pool load as Prometheus gauge samples."""
+    gauges: Dict[str, List[Tuple[Dict[str, str], float]]] = {
+        "file_manager_pool_workers": [],
+        "file_manager_pool_active": [],
+        "file_manager_pool_queued": [],
+        "file_manager_pool_avg_wait_seconds": [],
+    }
+    for pool in pools.stats()["pools"]:
+        labels = {"pool": pool["name"]}
+        gauges["file_manager_pool_workers"].append((labels, pool["workers"]))
+        gauges["file_manager_pool_active"].append((labels, pool["active"]))
+        gauges["file_manager_pool_queued"].append((labels, pool["queued"]))
+        gauges["file_manager_pool_avg_wait_seconds"].append((labels, pool["avg_wait_ms"] / 1000))
+    return gauges
+
+def start_metrics_exporter(target: Optional[str] = None, interval: Optional[float] = None) -> Optional[MetricsExporter]:
+    """Start exporting to target (or FILE_MANAGER_METRICS_EXPORT), if one is configured."""
+    global metrics_exporter
+    target = target or os.environ.get("FILE_MANAGER_METRICS_EXPORT")
+    if not target or metrics_exporter is not None:
+        return metrics_exporter
+    interval = interval or float(os.environ.get("FILE_MANAGER_METRICS_INTERVAL", DEFAULT_EXPORT_INTERVAL))
+    metrics_exporter = MetricsExporter(target, interval, gauges=pool_gauges).start()
+    return metrics_exporter
+
+def stop_metrics_exporter() -> None:
+    """Stop the exporter after a final export."""
+    global metrics_exporter
+    if metrics_exporter is not None:
+        metrics_exporter.stop()
+        metrics_exporter = None
+
+@mcp.tool()
+async def server_metrics(
+    format: str = Field("json", description="json (per-tool breakdown) or prometheus (text exposition)"),
+    recent: int = Field(20, description="Number of most recent calls to include with their breakdown"),
+    reset: bool = Field(False, description="Clear the counters after reading them")
+) -> Dict[str, Any]:
+    """
+    Show per-tool latency broken down by phase.
+    
+    For every tool: calls, errors, latency, time per phase (walk, stat,
+    sniff, read, serialize), time spent waiting for a pool worker, and
+    files/bytes touched. The slowest recent calls are listed individually.
+    
+    Args:
+        format: json or prometheus
+        recent: Number of most recent calls to include
+        reset: Clear the counters after reading them
+    
+    Returns:
+        The metrics, plus pool and cache state
+    """
+    try:
+        if format not in ("json", "prometheus"):
+            return {"error": f"Unknown format: {format}. Use json or prometheus"}
+        if format == "prometheus":
+            result = {"success": True, "format": format, "text": metrics.prometheus_text(pool_gauges())}
+        else:
+            result = {
+                "success": True,
+                "format": format,
+                **metrics.snapshot(recent),
+                "pools": pools.stats(),
+                "caches": {
+                    "resources": resource_cache.stats(),
+                    "digests": await run_in_executor(digest_cache.stats),
+                    "usage": usage_cache.stats(),
+                },
+                "exporter": metrics_exporter.stats() if metrics_exporter is not None else None,
+            }
+        if reset:
+            metrics.reset()
+        return result
+    except Exception as e:
+        return {"error": f"Failed to get server metrics: {str(e)}"}
+
+@mcp.tool()
+async def index_status() -> Dict[str, Any]:
+    """
+    Show the indexed folders and their freshness.
+    
+    Returns:
+        Indexed roots (metadata and content) with entry counts, timestamps,
+        watcher state and background build progress
+    """
+    try:
+        roots = await run_in_executor(metadata_index.status)
+        content_roots = await run_in_executor(trigram_index.status)
+        for watcher, entries in ((index_watcher, roots), (content_index_watcher, content_roots)):
+            for root in entries:
+                root["watching"] = watcher.is_watching(root["root"])
+                root["total_size_human"] = humanize.naturalsize(root["total_size"])
+                root["built_at"] = datetime.fromtimestamp(root["built_at"]).isoformat()
+                root["refreshed_at"] = datetime.fromtimestamp(root["refreshed_at"]).isoformat()
+        
+        return {
+            "success": True,
+            "index_path": metadata_index.db_path,
+            "roots": roots,
+            "content_index_path": trigram_index.db_path,
+            "content_roots": content_roots,
+            "content_builds": {
+                root: {
+                    "files": progress.get("files", 0),
+                    "bytes": progress.get("bytes", 0),
+                    "started_at": datetime.fromtimestamp(progress["started_at"]).isoformat()
+                }
+                for root, progress in list(trigram_index.building.items())
+                if "started_at" in progress
+            },
+            "content_build_errors": content_index_errors
+        }
+        
+    except Exception as e:
+        return {"error": f"Failed to read index status: {str(e)}"}
+
+@mcp.tool()
+async def invalidate_index(
+    folder_path: Optional[str] = Field(None, description="Indexed folder to drop (all folders if omitted)")
+) -> Dict[str, Any]:
+    """
+    Drop a folder (or every folder) from the metadata and content indexes.
+    
+    Args:
+        folder_path: Indexed folder to drop, or None for all
+    
+    Returns:
+        The folders that were dropped
+    """
+    try:
+        root = str(Path(folder_path).expanduser().resolve()) if folder_path else None
+        index_watcher.stop(root)
+        content_index_watcher.stop(root)
+        dropped = await run_in_executor(metadata_index.invalidate, root)
+        dropped_content = await run_in_executor(trigram_index.invalidate, root)
+        
+        return {
+            "success": True,
+            "invalidated": dropped,
+            "invalidated_content": dropped_content
+        }
+        
+    except Exception as e:
+        return {"error": f"Failed to invalidate index: {str(e)}"}
+
 # ========== Resource Providers ==========
 
-@mcp.resource("file://stats/{path}")
-def get_file_statistics_resource(path: str) -> str:
+async def cached_file_stats(path: str, freshness) -> Dict[str, Any]:
+    """get_file_stats through the shared resource cache."""
+    return await resource_cache.get_or_compute(
+        ("stats", path),
+        freshness,
+        lambda: call_tool_fn(get_file_stats, {"file_path": path})
+    )
+
+async def cached_listing(path: str, freshness) -> Dict[str, Any]:
+    """Non-recursive list_files_and_folders through the shared resource cache."""
+    return await resource_cache.get_or_compute(
+        ("list", path),
+        freshness,
+        lambda: call_tool_fn(list_files_and_folders, {"folder_path": path, "mime_mode": "extension"})
+    )
+
+def resource_path(path: str) -> str:
+    """Resolve a path taken from a resource URI.
+    
+    URI normalization collapses "file://stats//abs/path" to "stats/abs/path",
+    so paths arrive without their leading slash; they are always absolute.
+    """
+    if not path.startswith(("/", "~")):
+        path = "/" + path
+    return str(Path(path).expanduser().resolve())
+
+def parse_resource_paths(paths: str) -> List[str]:
+    """Paths of a batched resource URI: a JSON array of paths."""
+    try:
+        parsed = json.loads(paths)
+    except ValueError:
+        raise ValueError("Batched resource paths must be a URL-encoded JSON array of paths")
+    if not isinstance(parsed, list) or not all(isinstance(p, str) for p in parsed):
+        raise ValueError("Batched resource paths must be a URL-encoded JSON array of paths")
+    return parsed
+
+async def batch_resource(paths: str, read) -> str:
+    """Read many paths in one request: stat them in one pool job, then read concurrently."""
+    try:
+        path_list = parse_resource_paths(paths)
+    except ValueError as e:
+        return dumps({"error": str(e)}, indent=True)
+    resolved = [resource_path(p) for p in path_list]
+    validators = await run_in_executor(lambda: [stat_validator(p) for p in resolved])
+    results = await asyncio.gather(*(read(p, v) for p, v in zip(resolved, validators)))
+    return dumps({
+        "success": True,
+        "count": len(results),
+        "results": [{"path": p, "result": r} for p, r in zip(path_list, results)]
+    }, indent=True)
+
+@mcp.resource("file://stats/{path*}")
+async def get_file_statistics_resource(path: str) -> str:
     """Resource endpoint for file statistics."""
-    import json
-    stats = asyncio.run(get_file_stats(path))
-    return json.dumps(stats, indent=2)
+    resolved = resource_path(path)
+    stats = await cached_file_stats(resolved, await run_in_executor(stat_validator, resolved))
+    return dumps(stats, indent=True)
 
-@mcp.resource("file://list/{path}")
-def list_directory_resource(path: str) -> str:
+@mcp.resource("file://list/{path*}")
+async def list_directory_resource(path: str) -> str:
     """Resource endpoint for directory listing."""
-    import json
-    listing = asyncio.run(list_files_and_folders(path, recursive=False))
-    return json.dumps(listing, indent=2)
+    resolved = resource_path(path)
+    listing = await cached_listing(resolved, await run_in_executor(stat_validator, resolved))
+    return dumps(listing, indent=True)
+
+@mcp.resource("file://batch/stats/{paths*}")
+async def batch_file_statistics_resource(paths: str) -> str:
+    """Resource endpoint for statistics of many files (paths: URL-encoded JSON array)."""
+    return await batch_resource(paths, cached_file_stats)
+
+@mcp.resource("file://batch/list/{paths*}")
+async def batch_list_directory_resource(paths: str) -> str:
+    """Resource endpoint for listings of many directories (paths: URL-encoded JSON array)."""
+    return await batch_resource(paths, cached_listing)
+
+@mcp.resource("metrics://server")
+async def server_metrics_resource() -> str:
+    """Resource endpoint for per-tool metrics (JSON)."""
+    return dumps({**metrics.snapshot(), "pools": pools.stats()}, indent=True)
+
+@mcp.resource("metrics://prometheus", mime_type="text/plain")
+async def prometheus_metrics_resource() -> str:
+    """Resource endpoint for metrics in the Prometheus text format."""
+    return metrics.prometheus_text(pool_gauges())
 
 # ========== Main Entry Point ==========
 def main():
-    """Main function to run the MCP server."""
-    mcp.run(transport='stdio')
-    # mcp.run(transport='http', host='localhost')
+    """Main function to run the MCP server (FILE_MANAGER_TRANSPORT=http serves over HTTP)."""
+    if os.environ.get("FILE_MANAGER_TRANSPORT", "stdio") != "stdio":
+        from dataclasses import replace
+        from .http_server import HttpSettings, serve_http
+        serve_http(replace(HttpSettings.from_env(), transport=os.environ["FILE_MANAGER_TRANSPORT"]))
+        return
+    start_metrics_exporter()
+    try:
+        mcp.run(transport='stdio')
+    finally:
+        stop_metrics_exporter()
+        pools.shutdown()
 
 if __name__ == "__main__":
     # Run the MCP server
@@ -0,0 +1,411 @@
+"""
+Per-call instrumentation for tool calls and resource reads.
+
+Each call gets a CallMetrics record held in a context variable, so code
+deep inside a tool (including blocking helpers running on the io pool,
+which inherit the caller's context) can attribute time to it:
+
+- phases: wall time spent walking folders, stat'ing, sniffing MIME types,
+  reading file contents and serializing the result
+- queue wait: time submitted work sat in a pool before a worker took it
+- files and bytes touched
+
+Phase times are summed across workers, so with parallel work they can add
+up to more than the call's wall time. Outside a call every hook is a no-op.
+
+Completed calls are aggregated per tool (counts, errors, latency histogram,
+phase totals) and the slowest recent calls are kept with their breakdown.
+The aggregates can be rendered as Prometheus text or pushed as OTLP/HTTP
+JSON by MetricsExporter (FILE_MANAGER_METRICS_EXPORT).
+"""
+import os
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+PHASES = ("walk", "stat", "sniff", "read", "serialize")
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RECENT_CALLS = 100
+SLOWEST_CALLS = 10
+DEFAULT_EXPORT_INTERVAL = 15.0
+
+
+class CallMetrics:
+    """Everything recorded for one tool call."""
+
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.error = False
+        self.phases: Dict[str, float] = {}
+        self.queue_wait = 0.0
+        self.pool_tasks = 0
+        self.files = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def add_phase(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def add_pool_task(self, wait: float) -> None:
+        with self._lock:
+            self.queue_wait += wait
+            self.pool_tasks += 1
+
+    def touch(self, files: int = 0, bytes: int = 0) -> None:
+        with self._lock:
+            self.files += files
+            self.bytes += bytes
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "tool": self.tool,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3),
+            "error": self.error,
+            "phases_ms": {name: round(seconds * 1000, 3) for name, seconds in self.phases.items()},
+            "queue_wait_ms": round(self.queue_wait * 1000, 3),
+            "pool_tasks": self.pool_tasks,
+            "files": self.files,
+            "bytes": self.bytes,
+        }
+
+
+_current_call: ContextVar[Optional[CallMetrics]] = ContextVar("file_manager_call", default=None)
+
+
+def current_call() -> Optional[CallMetrics]:
+    """The call being instrumented in this context, if any."""
+    return _current_call.get()
+
+
+@contextmanager
+def phase(name: str, files: int = 0, bytes: int = 0) -> Iterator[None]:
+    """Attribute the wall time of a block (and the files/bytes it touched) to the current call."""
+    call = _current_call.get()
+    if call is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        call.add_phase(name, time.perf_counter() - started)
+        if files or bytes:
+            call.touch(files, bytes)
+
+
+def touch(files: int = 0, bytes: int = 0) -> None:
+    """Count files/bytes touched by the current call."""
+    call = _current_call.get()
+    if call is not None:
+        call.touch(files, bytes)
+
+
+class ToolStats:
+    """Cumulative counters for one tool."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        # Non-cumulative counts per LATENCY_BUCKETS bound, plus +Inf
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.phases: Dict[str, float] = {}
+        self.queue_wait = 0.0
+        self.pool_tasks = 0
+        self.files = 0
+        self.bytes = 0
+
+    def add(self, call: CallMetrics) -> None:
+        self.calls += 1
+        self.errors += call.error
+        self.seconds += call.duration
+        self.max_seconds = max(self.max_seconds, call.duration)
+        index = 0
+        while index < len(LATENCY_BUCKETS) and call.duration > LATENCY_BUCKETS[index]:
+            index += 1
+        self.buckets[index] += 1
+        for name, seconds in call.phases.items():
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+        self.queue_wait += call.queue_wait
+        self.pool_tasks += call.pool_tasks
+        self.files += call.files
+        self.bytes += call.bytes
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bucket bound holding the q-th quantile (None past the last bound)."""
+        if not self.calls:
+            return None
+        rank = q * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def as_dict(self) -> Dict[str, Any]:
+        p50, p99 = self.quantile(0.5), self.quantile(0.99)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_ms": round(self.seconds * 1000, 3),
+            "mean_ms": round(self.seconds / self.calls * 1000, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 3),
+            "p50_ms_le": p50 * 1000 if p50 is not None else None,
+            "p99_ms_le": p99 * 1000 if p99 is not None else None,
+            "phases_ms": {name: round(seconds * 1000, 3) for name, seconds in self.phases.items()},
+            "queue_wait_ms": round(self.queue_wait * 1000, 3),
+            "pool_tasks": self.pool_tasks,
+            "files": self.files,
+            "bytes": self.bytes,
+        }
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: Any) -> str:
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    """Aggregated call metrics for the whole server."""
+
+    def __init__(self, recent: int = RECENT_CALLS):
+        self.started_at = time.time()
+        self._tools: Dict[str, ToolStats] = {}
+        self._recent: Deque[CallMetrics] = deque(maxlen=recent)
+        self._lock = threading.Lock()
+        self.enabled = os.environ.get("FILE_MANAGER_METRICS", "1") != "0"
+
+    def start(self, tool: str) -> Tuple[Optional[CallMetrics], Optional[Token]]:
+        """Begin instrumenting a call; pass the result to finish()."""
+        if not self.enabled:
+            return None, None
+        call = CallMetrics(tool)
+        return call, _current_call.set(call)
+
+    def finish(self, call: Optional[CallMetrics], token: Optional[Token], error: bool = False) -> None:
+        if call is None:
+            return
+        call.duration = time.perf_counter() - call.started
+        call.error = error
+        _current_call.reset(token)
+        with self._lock:
+            self._tools.setdefault(call.tool, ToolStats()).add(call)
+            self._recent.append(call)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started_at = time.time()
+            self._tools.clear()
+            self._recent.clear()
+
+    def snapshot(self, recent: int = 20) -> Dict[str, Any]:
+        """Per-tool aggregates, the latest calls and the slowest recent calls."""
+        with self._lock:
+            tools = {name: stats.as_dict() for name, stats in sorted(self._tools.items())}
+            calls = list(self._recent)
+        slowest = sorted(calls, key=lambda c: c.duration, reverse=True)[:SLOWEST_CALLS]
+        return {
+            "started_at": self.started_at,
+            "uptime_seconds": round(time.time() - self.started_at, 3),
+            "phases": list(PHASES),
+            "tools": tools,
+            "recent_calls": [c.as_dict() for c in calls[-recent:]] if recent else [],
+            "slowest_calls": [c.as_dict() for c in slowest],
+        }
+
+    def prometheus_text(self, gauges: Optional[Dict[str, List[Tuple[Dict[str, str], float]]]] = None) -> str:
+        """
+        Render the aggregates in the Prometheus text exposition format.
+
+        gauges maps extra metric names to (labels, value) samples, e.g. pool queue depth.
+        """
+        lines = []
+
+        def header(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def samples(name: str, value: Callable[[ToolStats], Any]) -> None:
+            for tool, stats in tools:
+                lines.append(f"{name}{_labels(tool=tool)} {value(stats)}")
+
+        with self._lock:
+            tools = sorted(self._tools.items())
+            header("file_manager_tool_calls_total", "counter", "Tool calls handled")
+            samples("file_manager_tool_calls_total", lambda s: s.calls)
+            header("file_manager_tool_errors_total", "counter", "Tool calls that returned an error")
+            samples("file_manager_tool_errors_total", lambda s: s.errors)
+            header("file_manager_tool_duration_seconds", "histogram", "Tool call wall time")
+            for tool, stats in tools:
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                    cumulative += count
+                    lines.append(f"file_manager_tool_duration_seconds_bucket{_labels(tool=tool, le=bound)} {cumulative}")
+                lines.append(f"file_manager_tool_duration_seconds_bucket{_labels(tool=tool, le='+Inf')} {stats.calls}")
+                lines.append(f"file_manager_tool_duration_seconds_sum{_labels(tool=tool)} {stats.seconds}")
+                lines.append(f"file_manager_tool_duration_seconds_count{_labels(tool=tool)} {stats.calls}")
+            header("file_manager_tool_phase_seconds_total", "counter", "Time spent per phase, summed across workers")
+            for tool, stats in tools:
+                for name, seconds in sorted(stats.phases.items()):
+                    lines.append(f"file_manager_tool_phase_seconds_total{_labels(tool=tool, phase=name)} {seconds}")
+            header("file_manager_tool_queue_wait_seconds_total", "counter", "Time work waited for a pool worker")
+            samples("file_manager_tool_queue_wait_seconds_total", lambda s: s.queue_wait)
+            header("file_manager_tool_files_total", "counter", "Files touched")
+            samples("file_manager_tool_files_total", lambda s: s.files)
+            header("file_manager_tool_bytes_total", "counter", "Bytes read or written")
+            samples("file_manager_tool_bytes_total", lambda s: s.bytes)
+
+        for metric, samples in (gauges or {}).items():
+            header(metric, "gauge", metric.replace("_", " "))
+            for labels, value in samples:
+                lines.append(f"{metric}{_labels(**labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def otlp_payload(self, service_name: str = "file-manager") -> Dict[str, Any]:
+        """The aggregates as an OTLP/HTTP JSON ExportMetricsServiceRequest (cumulative)."""
+        now = str(time.time_ns())
+        start = str(int(self.started_at * 1e9))
+        with self._lock:
+            tools = [(name, stats.as_dict(), list(stats.buckets), stats.seconds, dict(stats.phases))
+                     for name, stats in sorted(self._tools.items())]
+
+        def attributes(**labels: str) -> List[Dict[str, Any]]:
+            return [{"key": key, "value": {"stringValue": value}} for key, value in labels.items()]
+
+        def counter(name: str, unit: str, points: List[Tuple[Dict[str, str], Any]]) -> Dict[str, Any]:
+            data_points = []
+            for labels, value in points:
+                point = {"attributes": attributes(**labels), "startTimeUnixNano": start, "timeUnixNano": now}
+                if isinstance(value, int):
+                    point["asInt"] = str(value)
+                else:
+                    point["asDouble"] = value
+                data_points.append(point)
+            return {"name": name, "unit": unit, "sum": {
+                "dataPoints": data_points, "aggregationTemporality": 2, "isMonotonic": True
+            }}
+
+        metrics = [
+            counter("file_manager.tool.calls", "1", [({"tool": n}, s["calls"]) for n, s, *_ in tools]),
+            counter("file_manager.tool.errors", "1", [({"tool": n}, s["errors"]) for n, s, *_ in tools]),
+            counter("file_manager.tool.phase_time", "s", [
+                ({"tool": n, "phase": p}, seconds) for n, _, _, _, phases in tools for p, seconds in sorted(phases.items())
+            ]),
+            counter("file_manager.tool.queue_wait", "s", [({"tool": n}, s["queue_wait_ms"] / 1000) for n, s, *_ in tools]),
+            counter("file_manager.tool.files", "1", [({"tool": n}, s["files"]) for n, s, *_ in tools]),
+            counter("file_manager.tool.bytes", "By", [({"tool": n}, s["bytes"]) for n, s, *_ in tools]),
+            {"name": "file_manager.tool.duration", "unit": "s", "histogram": {
+                "aggregationTemporality": 2,
+                "dataPoints": [{
+                    "attributes": attributes(tool=n),
+                    "startTimeUnixNano": start,
+                    "timeUnixNano": now,
+                    "count": str(s["calls"]),
+                    "sum": seconds,
+                    "bucketCounts": [str(c) for c in buckets],
+                    "explicitBounds": list(LATENCY_BUCKETS),
+                } for n, s, buckets, seconds, _ in tools],
+            }},
+        ]
+        return {"resourceMetrics": [{
+            "resource": {"attributes": attributes(**{
+                "service.name": service_name,
+                # HTTP worker processes each export their own counters
+                "service.instance.id": str(os.getpid()),
+            })},
+            "scopeMetrics": [{"scope": {"name": "file_manager.metrics"}, "metrics": metrics}],
+        }]}
+
+
+metrics = MetricsRegistry()
+
+
+class MetricsExporter:
+    """
+    Periodically export the registry from a background thread.
+
+    target is "prometheus:<file>" (atomically rewritten, for node_exporter's
+    textfile collector or any scraper that reads files) or "otlp:<url>"
+    (POSTed as JSON to <url>/v1/metrics, e.g. a local OpenTelemetry collector).
+    """
+
+    def __init__(self, target: str, interval: float = DEFAULT_EXPORT_INTERVAL,
+                 registry: MetricsRegistry = metrics,
+                 gauges: Optional[Callable[[], Dict[str, List[Tuple[Dict[str, str], float]]]]] = None):
+        kind, _, destination = target.partition(":")
+        if kind not in ("prometheus", "otlp") or not destination:
+            raise ValueError(f"Invalid metrics export target: {target}. Use prometheus:<file> or otlp:<url>")
+        self.kind = kind
+        self.destination = destination
+        self.interval = interval
+        self.registry = registry
+        self.gauges = gauges
+        self.exports = 0
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def export(self) -> None:
+        """Export once (blocking)."""
+        try:
+            if self.kind == "prometheus":
+                path = Path(self.destination)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                temp = path.with_name(path.name + ".tmp")
+                temp.write_text(self.registry.prometheus_text(self.gauges() if self.gauges else None))
+                os.replace(temp, path)
+            else:
+                import urllib.request
+                request = urllib.request.Request(
+                    self.destination.rstrip("/") + "/v1/metrics",
+                    data=json.dumps(self.registry.otlp_payload()).encode(),
+                    headers={"Content-Type": "application/json"},
+                    method="POST",
+                )
+                with urllib.request.urlopen(request, timeout=10) as response:
+                    response.read()
+            self.exports += 1
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.export()
+
+    def start(self) -> "MetricsExporter":
+        self._thread = threading.Thread(target=self._run, name="file-manager-metrics", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the thread and flush a final export."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.export()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "destination": self.destination,
+            "interval": self.interval,
+            "exports": self.exports,
+            "last_error": self.last_error,
+        }
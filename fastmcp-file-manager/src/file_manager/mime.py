@@ -0,0 +1,133 @@
+"""
+MIME type detection with selectable cost tiers.
+
+- off:       no detection at all
+- extension: guess from the file name via mimetypes (no I/O)
+- content:   sniff file contents with libmagic (opens and reads the file)
+
+Content sniffs are cached by (device, inode, mtime, size), so listing an
+unchanged tree a second time never re-reads any file. libmagic is loaded
+on the first content sniff, so modes that never sniff never pay for it.
+"""
+import os
+import mimetypes
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from .metrics import phase
+
+MIME_MODES = ("off", "extension", "content")
+DEFAULT_CACHE_SIZE = 100_000
+
+_default_mode = os.environ.get("FILE_MANAGER_MIME_MODE", "content")
+
+_magic_mime = None
+# libmagic handles are not thread-safe and we sniff from executor threads
+_magic_lock = threading.Lock()
+
+
+def _sniffer():
+    """The shared libmagic handle, loaded on first use (call with _magic_lock held)."""
+    global _magic_mime
+    if _magic_mime is None:
+        import magic
+        _magic_mime = magic.Magic(mime=True)
+    return _magic_mime
+
+
+def resolve_mime_mode(mode: Optional[str] = None) -> str:
+    """Return the effective mode, falling back to the server default."""
+    mode = (mode or _default_mode).lower()
+    if mode not in MIME_MODES:
+        raise ValueError(f"Unknown MIME mode: {mode}. Use one of: {', '.join(MIME_MODES)}")
+    return mode
+
+
+def set_default_mime_mode(mode: str) -> None:
+    """Set the server-wide MIME mode used when a call does not pass one."""
+    global _default_mode
+    _default_mode = resolve_mime_mode(mode)
+
+
+def get_default_mime_mode() -> str:
+    """Get the server-wide MIME mode."""
+    return _default_mode
+
+
+class MimeCache:
+    """Thread-safe LRU cache of sniffed MIME types."""
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, int, int, int], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(stat: os.stat_result) -> Tuple[int, int, int, int]:
+        return (stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def get(self, stat: os.stat_result) -> Optional[str]:
+        key = self.key(stat)
+        with self._lock:
+            mime_type = self._entries.get(key)
+            if mime_type is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return mime_type
+
+    def put(self, stat: os.stat_result, mime_type: str) -> None:
+        key = self.key(stat)
+        with self._lock:
+            self._entries[key] = mime_type
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+mime_cache = MimeCache(int(os.environ.get("FILE_MANAGER_MIME_CACHE_SIZE", DEFAULT_CACHE_SIZE)))
+
+
+def guess_from_extension(path: str) -> str:
+    """Guess the MIME type from the file name only."""
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def detect_mime(path: str, stat: os.stat_result, mode: str) -> Optional[str]:
+    """
+    Detect the MIME type of a regular file using an already resolved mode.
+
+    Returns None when mode is "off".
+    """
+    if mode == "off":
+        return None
+    if mode == "extension":
+        return guess_from_extension(path)
+
+    mime_type = mime_cache.get(stat)
+    if mime_type is not None:
+        return mime_type
+    try:
+        with phase("sniff"), _magic_lock:
+            mime_type = _sniffer().from_file(path)
+    except Exception:
+        return guess_from_extension(path)
+    mime_cache.put(stat, mime_type)
+    return mime_type
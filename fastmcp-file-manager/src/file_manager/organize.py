@@ -0,0 +1,108 @@
+"""
+Planning and execution helpers for organize_by_extension.
+
+Target folders are listed once and the names already taken are tracked in
+memory, so collision handling never stats the target per file. Operations
+are executed in chunks on the worker pool: a move within one filesystem is
+a single os.rename, and copies are grouped by bytes so that many small
+files share a pool job while large files get one each.
+"""
+import os
+import errno
+import shutil
+from typing import Any, Dict, List, Optional, Set, TypeVar
+
+from .copier import copy2
+
+CONFLICT_POLICIES = ("rename", "skip", "overwrite")
+CHUNK_OPERATIONS = 500
+CHUNK_COPY_BYTES = 64 * 1024 * 1024
+
+T = TypeVar("T")
+
+
+class NameAllocator:
+    """Names taken in each target folder, including ones claimed by the plan."""
+
+    def __init__(self):
+        self._taken: Dict[str, Set[str]] = {}
+        self.missing: Set[str] = set()
+
+    def _names(self, folder: str) -> Set[str]:
+        names = self._taken.get(folder)
+        if names is None:
+            try:
+                names = set(os.listdir(folder))
+            except FileNotFoundError:
+                names = set()
+                self.missing.add(folder)
+            self._taken[folder] = names
+        return names
+
+    def claim(self, folder: str, name: str, policy: str) -> Optional[str]:
+        """
+        Reserve a file name in folder according to the conflict policy.
+
+        Returns the name to use ("report (1).txt" style renames), or None
+        when the file should be skipped.
+        """
+        names = self._names(folder)
+        if name in names:
+            if policy == "skip":
+                return None
+            if policy == "rename":
+                stem, suffix = os.path.splitext(name)
+                counter = 1
+                while f"{stem} ({counter}){suffix}" in names:
+                    counter += 1
+                name = f"{stem} ({counter}){suffix}"
+        names.add(name)
+        return name
+
+
+def same_device(source: str, target: str) -> bool:
+    """Whether target (or its nearest existing parent) is on source's filesystem."""
+    while not os.path.exists(target):
+        parent = os.path.dirname(target)
+        if parent == target:
+            return False
+        target = parent
+    return os.stat(source).st_dev == os.stat(target).st_dev
+
+
+def chunk_operations(plan: List[T], sizes: List[int]) -> List[List[T]]:
+    """Split a plan into pool jobs of bounded operation count and copied bytes."""
+    chunks: List[List[T]] = []
+    current: List[T] = []
+    current_bytes = 0
+    for op, size in zip(plan, sizes):
+        if current and (len(current) >= CHUNK_OPERATIONS or current_bytes + size > CHUNK_COPY_BYTES):
+            chunks.append(current)
+            current, current_bytes = [], 0
+        current.append(op)
+        current_bytes += size
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def execute_chunk(ops: List[Dict[str, Any]], rename: bool) -> List[Dict[str, Any]]:
+    """Run a chunk of planned moves/copies, returning one result per operation."""
+    results = []
+    for op in ops:
+        try:
+            if op["operation"] == "copy":
+                copy2(op["source"], op["destination"])
+            elif rename:
+                try:
+                    os.rename(op["source"], op["destination"])
+                except OSError as e:
+                    if e.errno != errno.EXDEV:  # a nested mount point
+                        raise
+                    shutil.move(op["source"], op["destination"], copy_function=copy2)
+            else:
+                shutil.move(op["source"], op["destination"], copy_function=copy2)
+            results.append({**op, "success": True})
+        except Exception as e:
+            results.append({**op, "success": False, "error": str(e)})
+    return results
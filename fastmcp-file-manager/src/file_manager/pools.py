@@ -0,0 +1,307 @@
+"""
+Worker pools for blocking and CPU-bound work.
+
+- io pool: threads for filesystem calls (stat, scandir, copies, SQLite).
+  Its size follows the disk the data lives on: few threads for rotational
+  disks (parallel seeks only thrash), more for SSDs and most for NVMe.
+- cpu pool: processes for pure-CPU work (hashing with encoding detection,
+  content scanning), so it runs in parallel instead of contending for the
+  GIL with the io threads. Setting cpu workers to 0 runs that work on the
+  io pool instead.
+
+Only work on files of at least CPU_OFFLOAD_BYTES goes to the cpu pool;
+for smaller files the inter-process round trip costs more than the GIL.
+Both pools are created lazily, so CLI flags can configure them first.
+Configuration: FILE_MANAGER_IO_WORKERS, FILE_MANAGER_CPU_WORKERS,
+FILE_MANAGER_DISK_KIND (hdd, ssd, nvme), FILE_MANAGER_DATA_PATH (the path
+whose disk is probed, default the home folder) and
+FILE_MANAGER_CPU_OFFLOAD_BYTES.
+
+Every submission is timed, so stats() shows queue depth, wait times and
+utilization: a pool that keeps a queue is saturated. The wait (and, when a
+phase is named, the worker time) is also charged to the submitting tool
+call, and io work runs in the caller's context so its helpers can record
+their own phases (see metrics).
+"""
+import os
+import time
+import threading
+import contextvars
+from concurrent.futures import CancelledError, Executor, Future, InvalidStateError, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .metrics import current_call
+
+DISK_KINDS = ("hdd", "ssd", "nvme", "unknown")
+# Below this size, shipping a file's work to another process costs more than it saves
+CPU_OFFLOAD_BYTES = int(os.environ.get("FILE_MANAGER_CPU_OFFLOAD_BYTES", 4 * 1024 * 1024))
+
+
+def detect_disk_kind(path: str) -> str:
+    """Classify the block device holding path via /sys (Linux only)."""
+    try:
+        dev = os.stat(path).st_dev
+        device = Path(f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}").resolve()
+    except OSError:
+        return "unknown"
+    # Partitions keep their queue settings on the parent disk
+    for candidate in (device, device.parent):
+        rotational = candidate / "queue" / "rotational"
+        if rotational.exists():
+            if rotational.read_text().strip() == "1":
+                return "hdd"
+            return "nvme" if candidate.name.startswith("nvme") else "ssd"
+    return "unknown"
+
+
+def default_io_workers(disk_kind: str) -> int:
+    cpus = os.cpu_count() or 4
+    return {
+        "hdd": 4,
+        "ssd": min(32, cpus * 4),
+        "nvme": min(64, cpus * 8),
+    }.get(disk_kind, min(32, cpus + 4))
+
+
+def _timed_call(func: Callable, *args) -> Tuple[float, float, Any]:
+    """Run func, returning when it started and finished (monotonic, system-wide on Linux)."""
+    started = time.monotonic()
+    result = func(*args)
+    return started, time.monotonic(), result
+
+
+def _process_pool(workers: int) -> Executor:
+    # multiprocessing is imported here: commands that never offload work skip it
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+class MonitoredPool:
+    """An executor wrapper that records queue depth, wait and busy time."""
+
+    def __init__(self, name: str, kind: str, workers: int, factory: Callable[[], Executor]):
+        self.name = name
+        self.kind = kind
+        self.workers = workers
+        self._factory = factory
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self.created_at = time.monotonic()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.busy_seconds = 0.0
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = self._factory()
+        return self._executor
+
+    def submit(self, func: Callable, *args, phase: Optional[str] = None) -> Future:
+        """Submit func(*args); phase names the metrics phase its worker time counts towards."""
+        submitted_at = time.monotonic()
+        call = current_call()
+        with self._lock:
+            self.in_flight += 1
+            self.submitted += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        inner = self.executor.submit(_timed_call, func, *args)
+        outer: Future = Future()
+
+        def done(future: Future) -> None:
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+                # Work cancelled by shutdown(wait=False) never ran
+                error = CancelledError() if future.cancelled() else future.exception()
+                if error is None:
+                    started, finished, result = future.result()
+                    wait = max(0.0, started - submitted_at)
+                    self.wait_seconds += wait
+                    self.max_wait_seconds = max(self.max_wait_seconds, wait)
+                    self.busy_seconds += finished - started
+                else:
+                    self.failed += 1
+            if error is None and call is not None:
+                call.add_pool_task(wait)
+                if phase is not None:
+                    call.add_phase(phase, finished - started)
+            try:
+                if error is None:
+                    outer.set_result(result)
+                elif isinstance(error, CancelledError):
+                    outer.cancel()
+                    outer.set_running_or_notify_cancel()
+                else:
+                    outer.set_exception(error)
+            except InvalidStateError:
+                # The awaiting caller gave up (e.g. a search hit its limit),
+                # possibly from another thread while this callback ran
+                pass
+
+        inner.add_done_callback(done)
+        return outer
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=not wait)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            uptime = max(time.monotonic() - self.created_at, 1e-9)
+            finished = max(self.completed - self.failed, 1)
+            active = min(self.in_flight, self.workers)
+            return {
+                "name": self.name,
+                "kind": self.kind,
+                "workers": self.workers,
+                "started": self._executor is not None,
+                "active": active,
+                "queued": self.in_flight - active,
+                "peak_in_flight": self.peak_in_flight,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_wait_ms": round(self.wait_seconds / finished * 1000, 3),
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+                "busy_seconds": round(self.busy_seconds, 3),
+                "utilization": round(active / self.workers, 3) if self.workers else 0.0,
+                "average_utilization": round(self.busy_seconds / (uptime * self.workers), 3) if self.workers else 0.0,
+                "saturated": self.in_flight > self.workers,
+            }
+
+
+class Pools:
+    """The server's io and cpu pools."""
+
+    def __init__(self):
+        self._io: Optional[MonitoredPool] = None
+        self._cpu: Optional[MonitoredPool] = None
+        self._lock = threading.RLock()
+        self.disk_kind: Optional[str] = None
+        self.io_workers: Optional[int] = None
+        self.cpu_workers: Optional[int] = None
+
+    def configure(self, io_workers: Optional[int] = None, cpu_workers: Optional[int] = None,
+                  disk_kind: Optional[str] = None) -> None:
+        """Override pool sizes; must be called before the pools are first used."""
+        if self._io is not None or self._cpu is not None:
+            raise RuntimeError("Worker pools are already running")
+        if disk_kind is not None and disk_kind not in DISK_KINDS:
+            raise ValueError(f"Unknown disk kind: {disk_kind}. Use one of: {', '.join(DISK_KINDS)}")
+        self.io_workers = io_workers if io_workers is not None else self.io_workers
+        self.cpu_workers = cpu_workers if cpu_workers is not None else self.cpu_workers
+        self.disk_kind = disk_kind or self.disk_kind
+
+    def _resolve(self) -> None:
+        if self.disk_kind is None:
+            self.disk_kind = os.environ.get("FILE_MANAGER_DISK_KIND") or detect_disk_kind(
+                os.environ.get("FILE_MANAGER_DATA_PATH", str(Path.home()))
+            )
+        if self.io_workers is None:
+            env = os.environ.get("FILE_MANAGER_IO_WORKERS")
+            self.io_workers = int(env) if env else default_io_workers(self.disk_kind)
+        if self.cpu_workers is None:
+            env = os.environ.get("FILE_MANAGER_CPU_WORKERS")
+            self.cpu_workers = int(env) if env else (os.cpu_count() or 1)
+
+    @property
+    def io(self) -> MonitoredPool:
+        if self._io is None:
+            with self._lock:
+                if self._io is None:
+                    self._resolve()
+                    workers = max(1, self.io_workers)
+                    self._io = MonitoredPool(
+                        "io", "thread", workers,
+                        lambda: ThreadPoolExecutor(max_workers=workers, thread_name_prefix="file-manager-io")
+                    )
+        return self._io
+
+    @property
+    def cpu(self) -> MonitoredPool:
+        """The process pool, or the io pool when cpu workers is 0."""
+        if self._cpu is None:
+            with self._lock:
+                if self._cpu is None:
+                    self._resolve()
+                    if self.cpu_workers <= 0:
+                        return self.io
+                    workers = self.cpu_workers
+                    # spawn: forking a process that runs threads can deadlock
+                    self._cpu = MonitoredPool(
+                        "cpu", "process", workers,
+                        lambda: _process_pool(workers)
+                    )
+        return self._cpu
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            for pool in (self._io, self._cpu):
+                if pool is not None:
+                    pool.shutdown(wait=wait)
+            self._io = self._cpu = None
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for submitted work to finish, then shut the pools down.
+
+        Work still queued after timeout seconds is cancelled. Returns whether
+        everything finished.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            running = [pool for pool in (self._io, self._cpu) if pool is not None]
+        while any(pool.in_flight for pool in running):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            time.sleep(0.05)
+        drained = not any(pool.in_flight for pool in running)
+        self.shutdown(wait=drained)
+        return drained
+
+    def stats(self) -> Dict[str, Any]:
+        self._resolve()
+        pools = [pool.stats() for pool in (self._io, self._cpu) if pool is not None]
+        return {
+            "disk_kind": self.disk_kind,
+            "io_workers": self.io_workers,
+            "cpu_workers": self.cpu_workers,
+            "cpu_offload_bytes": CPU_OFFLOAD_BYTES,
+            "pools": pools,
+            "saturated": any(p["saturated"] for p in pools),
+        }
+
+
+pools = Pools()
+
+
+async def run_io(func: Callable, *args, phase: Optional[str] = None) -> Any:
+    """Run a blocking function on the io thread pool, in the caller's context."""
+    # Imported here (already loaded once a loop runs) so the CLI can import this module cheaply
+    import asyncio
+    context = contextvars.copy_context()
+    return await asyncio.wrap_future(pools.io.submit(context.run, func, *args, phase=phase))
+
+
+async def run_cpu(func: Callable, *args, phase: Optional[str] = None) -> Any:
+    """Run a CPU-bound, picklable function on the process pool."""
+    import asyncio
+    return await asyncio.wrap_future(pools.cpu.submit(func, *args, phase=phase))
+
+
+async def run_sized(size: int, func: Callable, *args, phase: Optional[str] = None) -> Any:
+    """Run per-file work on the cpu pool for large files, else on the io pool."""
+    if size >= CPU_OFFLOAD_BYTES:
+        return await run_cpu(func, *args, phase=phase)
+    return await run_io(func, *args, phase=phase)
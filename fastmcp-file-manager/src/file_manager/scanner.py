@@ -0,0 +1,134 @@
+"""
+Directory traversal helpers built on os.scandir.
+
+scandir hands back the file type from the directory read itself, so walking a
+tree only costs one stat() per entry. When a tool call is being instrumented,
+directory reads count as the "walk" phase and per-entry stats as "stat".
+"""
+import os
+import time
+import stat as stat_module
+from pathlib import PurePath
+from typing import Iterator, NamedTuple, Optional
+
+from .metrics import current_call, phase
+
+
+class ScanEntry(NamedTuple):
+    """A single entry produced by scan_tree."""
+    path: str
+    name: str
+    is_dir: bool
+    stat: os.stat_result
+
+    # Same accessors as index.IndexedEntry so callers can treat both alike
+
+    @property
+    def size(self) -> int:
+        return self.stat.st_size
+
+    @property
+    def mtime_ns(self) -> int:
+        return self.stat.st_mtime_ns
+
+    @property
+    def ctime_ns(self) -> int:
+        return self.stat.st_ctime_ns
+
+    @property
+    def mode(self) -> int:
+        return self.stat.st_mode
+
+    @property
+    def extension(self) -> str:
+        return "" if self.is_dir else PurePath(self.name).suffix.lower()
+
+
+def is_hidden(name: str) -> bool:
+    """Return True for dot-files and dot-folders."""
+    return name.startswith('.')
+
+
+def scan_tree(
+    root: str,
+    recursive: bool = True,
+    include_hidden: bool = False,
+    files_only: bool = False,
+) -> Iterator[ScanEntry]:
+    """
+    Walk a directory tree yielding one ScanEntry per file or folder.
+
+    Hidden folders are pruned before descending, so nothing below them is ever
+    read. Symlinked folders are reported but not followed, matching Path.rglob.
+    Entries that vanish or cannot be stat'ed mid-walk are skipped.
+
+    Args:
+        root: Directory to walk
+        recursive: Descend into subdirectories
+        include_hidden: Include dot-files and dot-folders
+        files_only: Only yield regular files (folders are still descended)
+    """
+    call = current_call()
+    if call is None:
+        yield from _scan(root, recursive, include_hidden, files_only)
+        return
+
+    # Time spent inside the walk between yields, minus the stat() calls
+    walk_seconds = stat_seconds = 0.0
+    entries = 0
+    resumed = time.perf_counter()
+    try:
+        for entry, seconds in _scan(root, recursive, include_hidden, files_only, timed=True):
+            paused = time.perf_counter()
+            walk_seconds += paused - resumed
+            stat_seconds += seconds
+            entries += 1
+            yield entry
+            resumed = time.perf_counter()
+        walk_seconds += time.perf_counter() - resumed
+    finally:
+        call.add_phase("walk", walk_seconds - stat_seconds)
+        call.add_phase("stat", stat_seconds)
+        call.touch(files=entries)
+
+
+def _scan(root: str, recursive: bool, include_hidden: bool, files_only: bool, timed: bool = False):
+    """scan_tree's loop; with timed=True it yields (entry, seconds spent in stat())."""
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            iterator = os.scandir(current)
+        except OSError:
+            continue
+
+        with iterator:
+            for entry in iterator:
+                if not include_hidden and is_hidden(entry.name):
+                    continue
+                try:
+                    is_dir = entry.is_dir()
+                    if is_dir and recursive and not entry.is_symlink():
+                        stack.append(entry.path)
+                    if files_only and is_dir:
+                        continue
+                    if timed:
+                        started = time.perf_counter()
+                        stat = entry.stat()
+                        seconds = time.perf_counter() - started
+                    else:
+                        stat = entry.stat()
+                except OSError:
+                    continue
+                scan_entry = ScanEntry(entry.path, entry.name, is_dir, stat)
+                yield (scan_entry, seconds) if timed else scan_entry
+
+
+def stat_entry(path: str) -> Optional[ScanEntry]:
+    """Build a ScanEntry for a single path, or None if it does not exist."""
+    try:
+        with phase("stat"):
+            stat = os.stat(path)
+    except OSError:
+        return None
+    return ScanEntry(path, os.path.basename(path), stat_module.S_ISDIR(stat.st_mode), stat)
@@ -0,0 +1,88 @@
+"""
+File information and statistics without the server.
+
+These build the same dictionaries as the FileInfo model and get_file_stats,
+but need neither fastmcp nor pydantic, so `file_manager_cli stats` can
+answer without importing the server (see cli). humanize is imported on
+first use.
+"""
+import os
+from datetime import datetime
+from pathlib import Path
+from stat import S_ISDIR
+from typing import Any, Dict, Optional
+
+from .digest import FileDigest, file_digest
+from .mime import detect_mime, resolve_mime_mode
+
+
+def naturalsize(size: int) -> str:
+    """Human readable size ("4.1 kB"), via humanize."""
+    import humanize
+    return humanize.naturalsize(size)
+
+
+def file_info_dict(
+    path: str,
+    stat: os.stat_result,
+    name: Optional[str] = None,
+    mime_mode: str = "content"
+) -> Dict[str, Any]:
+    """FileInfo fields for an already collected stat result (mime_mode must be resolved)."""
+    name = name if name is not None else os.path.basename(path)
+    is_dir = S_ISDIR(stat.st_mode)
+    return {
+        "name": name,
+        "path": path,
+        "size": stat.st_size,
+        "size_human": naturalsize(stat.st_size),
+        "extension": Path(name).suffix.lower() if not is_dir else "",
+        "mime_type": "inode/directory" if is_dir else detect_mime(path, stat, mime_mode),
+        "is_dir": is_dir,
+        "created": datetime.fromtimestamp(stat.st_ctime).isoformat(),
+        "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
+        "permissions": oct(stat.st_mode)[-3:],
+        "parent": os.path.dirname(path),
+    }
+
+
+def file_statistics(digest: FileDigest, stat: os.stat_result) -> Dict[str, Any]:
+    """The "statistics" section of get_file_stats."""
+    statistics = {
+        "hash": digest.digest,
+        "hash_algorithm": digest.algorithm,
+        "hash_cached": digest.cached,
+        "line_count": digest.line_count,
+        "encoding_guess": digest.encoding,
+        "inode": stat.st_ino,
+        "device": stat.st_dev,
+        "hard_links": stat.st_nlink,
+        "user_id": stat.st_uid,
+        "group_id": stat.st_gid,
+        "access_time": datetime.fromtimestamp(stat.st_atime).isoformat(),
+        "change_time": datetime.fromtimestamp(stat.st_ctime).isoformat()
+    }
+    if digest.algorithm == "md5":
+        statistics["md5_hash"] = digest.digest
+    return statistics
+
+
+def file_stats(file_path: str, algorithm: Optional[str] = None, use_cache: bool = True) -> Dict[str, Any]:
+    """get_file_stats as a blocking function (same result and errors)."""
+    try:
+        file = Path(file_path).expanduser().resolve()
+
+        if not file.exists():
+            return {"error": f"File not found: {file_path}"}
+        if file.is_dir():
+            return {"error": f"Path is a directory, not a file: {file_path}"}
+
+        digest, stat = file_digest(str(file), algorithm, use_cache)
+        return {
+            "success": True,
+            "file_info": file_info_dict(str(file), stat, mime_mode=resolve_mime_mode(None)),
+            "statistics": file_statistics(digest, stat)
+        }
+
+    except Exception as e:
+        return {"error": f"Failed to get file stats: {str(e)}"}
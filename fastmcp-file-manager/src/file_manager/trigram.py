@@ -0,0 +1,403 @@
+"""
+Trigram index for content search.
+
+For every text file under an indexed root we store the set of distinct
+(ASCII-lowercased) 3-byte sequences it contains. A literal query can only
+match files that contain all of its trigrams, so content searches first
+narrow the candidate files with an index lookup and then verify the few
+remaining files with a real scan (content_search.scan_file).
+
+Files the index cannot describe (binary, too large, unreadable) are kept
+as "unindexed" and are always treated as candidates, so narrowing never
+drops a real match. Roots are kept fresh the same way as the metadata
+index: an index.IndexWatcher applies filesystem events, and stale roots
+are refreshed with an mtime/size diff rescan.
+"""
+import os
+import re
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .content_search import SNIFF_BYTES, is_binary
+from .index import IndexWatcher
+from .scanner import ScanEntry, scan_tree, stat_entry
+
+DEFAULT_CONTENT_INDEX_PATH = Path.home() / ".cache" / "file_manager" / "content_index.sqlite3"
+DEFAULT_MAX_FILE_SIZE = 8 * 1024 * 1024
+BATCH_FILES = 200
+IN_CLAUSE_LIMIT = 500
+
+_ANY_THREE_BYTES = re.compile(rb"(?s)...")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS roots (
+    root TEXT PRIMARY KEY,
+    include_hidden INTEGER NOT NULL,
+    max_file_size INTEGER NOT NULL,
+    watch INTEGER NOT NULL,
+    built_at REAL NOT NULL,
+    refreshed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    root TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    indexed INTEGER NOT NULL,
+    grams BLOB
+);
+CREATE TABLE IF NOT EXISTS postings (
+    gram BLOB NOT NULL,
+    file_id INTEGER NOT NULL,
+    PRIMARY KEY (gram, file_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS files_root ON files(root, indexed);
+"""
+
+
+def extract_trigrams(data: bytes) -> Set[bytes]:
+    """Distinct ASCII-lowercased trigrams of data."""
+    data = data.lower()
+    grams: Set[bytes] = set()
+    for offset in range(3):
+        grams.update(_ANY_THREE_BYTES.findall(data, offset))
+    return grams
+
+
+def query_trigrams(pattern: str, case_sensitive: bool) -> Set[bytes]:
+    """Trigrams every file matching the literal pattern must contain.
+
+    The index is ASCII-lowercased, so for case-insensitive queries trigrams
+    with non-ASCII bytes are dropped (their case variants are not indexed).
+    """
+    grams = extract_trigrams(pattern.encode('utf-8'))
+    if not case_sensitive:
+        grams = {g for g in grams if g.isascii()}
+    return grams
+
+
+def _is_within(path: str, root: str) -> bool:
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+def _subtree_bounds(folder: str) -> Tuple[str, str]:
+    prefix = folder.rstrip(os.sep) + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+
+class TrigramIndex:
+    """SQLite-backed trigram postings for indexed roots."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = str(db_path or os.environ.get("FILE_MANAGER_CONTENT_INDEX_PATH", DEFAULT_CONTENT_INDEX_PATH))
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        # root -> progress of builds running in this process
+        self.building: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    # ----- roots -----
+
+    def roots(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            cursor = self.conn.execute(
+                "SELECT root, include_hidden, max_file_size, watch, built_at, refreshed_at FROM roots"
+            )
+            return [
+                {
+                    "root": root,
+                    "include_hidden": bool(include_hidden),
+                    "max_file_size": max_file_size,
+                    "watch": bool(watch),
+                    "built_at": built_at,
+                    "refreshed_at": refreshed_at,
+                }
+                for root, include_hidden, max_file_size, watch, built_at, refreshed_at in cursor
+            ]
+
+    def get_root(self, root: str) -> Optional[Dict[str, Any]]:
+        return next((r for r in self.roots() if r["root"] == root), None)
+
+    def covering_root(self, path: str, include_hidden: bool = False) -> Optional[Dict[str, Any]]:
+        """Return the indexed root containing path, if it can serve the request."""
+        for info in sorted(self.roots(), key=lambda r: len(r["root"]), reverse=True):
+            if not _is_within(path, info["root"]):
+                continue
+            if include_hidden and not info["include_hidden"]:
+                return None
+            return info
+        return None
+
+    # ----- indexing -----
+
+    def _read_grams(self, entry: ScanEntry, max_file_size: int) -> Optional[Set[bytes]]:
+        """Trigrams of a file, or None when it cannot be indexed."""
+        if entry.size > max_file_size:
+            return None
+        try:
+            with open(entry.path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if is_binary(data[:SNIFF_BYTES]):
+            return None
+        return extract_trigrams(data)
+
+    def _remove_file(self, path: str) -> None:
+        row = self.conn.execute("SELECT id, grams FROM files WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            return
+        file_id, grams = row
+        self._remove_postings(file_id, grams)
+        self.conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def _remove_postings(self, file_id: int, grams: Optional[bytes]) -> None:
+        # Delete by the (gram, file_id) primary key: postings has no file_id index
+        if grams:
+            self.conn.executemany(
+                "DELETE FROM postings WHERE gram = ? AND file_id = ?",
+                ((grams[i:i + 3], file_id) for i in range(0, len(grams), 3)),
+            )
+
+    def _remove_subtree(self, path: str) -> None:
+        low, high = _subtree_bounds(path)
+        paths = [p for (p,) in self.conn.execute(
+            "SELECT path FROM files WHERE path = ? OR (path > ? AND path < ?)", (path, low, high)
+        )]
+        for child in paths:
+            self._remove_file(child)
+
+    def _index_files(self, root: str, entries: Iterable[ScanEntry], max_file_size: int, progress: Optional[Dict[str, Any]] = None) -> int:
+        """(Re)index files in batches, committing between batches so readers are not blocked."""
+        count = 0
+        batch: List[Tuple[ScanEntry, Optional[Set[bytes]]]] = []
+
+        def flush():
+            with self._lock, self.conn:
+                for entry, grams in batch:
+                    self._remove_file(entry.path)
+                    blob = b"".join(sorted(grams)) if grams is not None else None
+                    cursor = self.conn.execute(
+                        "INSERT INTO files (path, root, size, mtime_ns, indexed, grams) VALUES (?, ?, ?, ?, ?, ?)",
+                        (entry.path, root, entry.size, entry.mtime_ns, int(grams is not None), blob),
+                    )
+                    if grams:
+                        file_id = cursor.lastrowid
+                        self.conn.executemany(
+                            "INSERT OR IGNORE INTO postings (gram, file_id) VALUES (?, ?)",
+                            ((gram, file_id) for gram in grams),
+                        )
+            batch.clear()
+
+        for entry in entries:
+            batch.append((entry, self._read_grams(entry, max_file_size)))
+            count += 1
+            if progress is not None:
+                progress["files"] = progress.get("files", 0) + 1
+                progress["bytes"] = progress.get("bytes", 0) + entry.size
+            if len(batch) >= BATCH_FILES:
+                flush()
+        flush()
+        return count
+
+    def build(
+        self,
+        root: str,
+        include_hidden: bool = True,
+        max_file_size: int = DEFAULT_MAX_FILE_SIZE,
+        watch: bool = True,
+    ) -> Dict[str, Any]:
+        """(Re)build the trigram index for root from a full walk."""
+        for info in self.roots():
+            if info["root"] != root and _is_within(root, info["root"]):
+                raise ValueError(f"{root} is already covered by content-indexed folder {info['root']}")
+        started = time.time()
+        progress = self.building.setdefault(root, {})
+        progress.update({"started_at": started, "files": 0, "bytes": 0})
+        try:
+            with self._lock, self.conn:
+                for info in self.roots():
+                    if _is_within(info["root"], root):
+                        self.conn.execute("DELETE FROM roots WHERE root = ?", (info["root"],))
+            with self._lock:
+                self._remove_subtree(root)
+                self.conn.commit()
+            count = self._index_files(
+                root,
+                scan_tree(root, recursive=True, include_hidden=include_hidden, files_only=True),
+                max_file_size,
+                progress,
+            )
+            now = time.time()
+            with self._lock, self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO roots VALUES (?, ?, ?, ?, ?, ?)",
+                    (root, int(include_hidden), max_file_size, int(watch), now, now),
+                )
+        finally:
+            self.building.pop(root, None)
+        return {"root": root, "files": count, "duration_seconds": round(time.time() - started, 3)}
+
+    def refresh(self, root: str) -> Dict[str, int]:
+        """Re-index files whose size or mtime changed and drop deleted ones."""
+        info = self.get_root(root)
+        if info is None:
+            raise ValueError(f"Folder is not content-indexed: {root}")
+        with self._lock:
+            known = {
+                path: (size, mtime_ns)
+                for path, size, mtime_ns in self.conn.execute(
+                    "SELECT path, size, mtime_ns FROM files WHERE root = ?", (root,)
+                )
+            }
+        changed = []
+        for entry in scan_tree(root, recursive=True, include_hidden=info["include_hidden"], files_only=True):
+            if known.pop(entry.path, None) != (entry.size, entry.mtime_ns):
+                changed.append(entry)
+        self._index_files(root, changed, info["max_file_size"])
+        with self._lock, self.conn:
+            for path in known:
+                self._remove_file(path)
+            self.conn.execute("UPDATE roots SET refreshed_at = ? WHERE root = ?", (time.time(), root))
+        return {"updated": len(changed), "removed": len(known)}
+
+    def apply_changes(self, root: str, paths: Iterable[str]) -> int:
+        """Re-index the given paths (from a watcher)."""
+        info = self.get_root(root)
+        if info is None:
+            return 0
+        changed = []
+        removed = []
+        for path in paths:
+            if not _is_within(path, root) or path == root:
+                continue
+            relative = os.path.relpath(path, root)
+            if not info["include_hidden"] and any(p.startswith('.') for p in relative.split(os.sep)):
+                continue
+            entry = stat_entry(path)
+            if entry is None:
+                removed.append(path)
+            elif entry.is_dir:
+                changed.extend(scan_tree(path, recursive=True, include_hidden=info["include_hidden"], files_only=True))
+            else:
+                changed.append(entry)
+        with self._lock, self.conn:
+            for path in removed:
+                self._remove_subtree(path)
+        self._index_files(root, changed, info["max_file_size"])
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE roots SET refreshed_at = ? WHERE root = ?", (time.time(), root))
+        return len(changed) + len(removed)
+
+    def invalidate(self, root: Optional[str] = None) -> List[str]:
+        """Drop one indexed root (or all of them). Returns the dropped roots."""
+        with self._lock, self.conn:
+            dropped = [r["root"] for r in self.roots() if root is None or r["root"] == root]
+            for path in dropped:
+                self.conn.execute("DELETE FROM roots WHERE root = ?", (path,))
+                for file_id, grams in self.conn.execute("SELECT id, grams FROM files WHERE root = ?", (path,)).fetchall():
+                    self._remove_postings(file_id, grams)
+                self.conn.execute("DELETE FROM files WHERE root = ?", (path,))
+        return dropped
+
+    # ----- queries -----
+
+    def _select_ids(self, sql: str, params: tuple, within: Optional[Set[int]]) -> Set[int]:
+        """Run a file-id query, restricted to `within` (in chunks) when it is small."""
+        if within is None or len(within) > IN_CLAUSE_LIMIT * 10:
+            ids = {i for (i,) in self.conn.execute(sql, params)}
+            return ids if within is None else ids & within
+        ids: Set[int] = set()
+        chunk_ids = sorted(within)
+        for start in range(0, len(chunk_ids), IN_CLAUSE_LIMIT):
+            chunk = chunk_ids[start:start + IN_CLAUSE_LIMIT]
+            marks = ", ".join("?" * len(chunk))
+            ids.update(i for (i,) in self.conn.execute(f"{sql} AND file_id IN ({marks})", params + tuple(chunk)))
+        return ids
+
+    def _files_with_all(self, root: str, grams: Set[bytes]) -> Set[str]:
+        # Intersect the rarest postings first
+        counted = []
+        for gram in grams:
+            (count,) = self.conn.execute("SELECT COUNT(*) FROM postings WHERE gram = ?", (gram,)).fetchone()
+            if count == 0:
+                return set()
+            counted.append((count, gram))
+        file_ids: Optional[Set[int]] = None
+        for _, gram in sorted(counted):
+            file_ids = self._select_ids("SELECT file_id FROM postings WHERE gram = ?", (gram,), file_ids)
+            if not file_ids:
+                return set()
+        paths = set()
+        chunk_ids = sorted(file_ids or ())
+        for start in range(0, len(chunk_ids), IN_CLAUSE_LIMIT):
+            chunk = chunk_ids[start:start + IN_CLAUSE_LIMIT]
+            marks = ", ".join("?" * len(chunk))
+            paths.update(p for (p,) in self.conn.execute(
+                f"SELECT path FROM files WHERE root = ? AND id IN ({marks})", (root, *chunk)
+            ))
+        return paths
+
+    def candidates(
+        self,
+        root: str,
+        patterns: Tuple[str, ...],
+        case_sensitive: bool = False,
+        match_all: bool = False,
+    ) -> Optional[Set[str]]:
+        """
+        Files under root that may match the literal patterns.
+
+        Returns None when the patterns cannot narrow the search (a pattern
+        shorter than three characters in "any" mode), in which case every file
+        is a candidate. Unindexed files are always included.
+        """
+        per_pattern = [query_trigrams(p, case_sensitive) for p in patterns]
+        if match_all:
+            per_pattern = [g for g in per_pattern if g]
+            if not per_pattern:
+                return None
+        elif not all(per_pattern):
+            return None
+
+        with self._lock:
+            matched: Optional[Set[str]] = None
+            for grams in per_pattern:
+                paths = self._files_with_all(root, grams)
+                if matched is None:
+                    matched = paths
+                else:
+                    matched = matched & paths if match_all else matched | paths
+            unindexed = {p for (p,) in self.conn.execute(
+                "SELECT path FROM files WHERE root = ? AND indexed = 0", (root,)
+            )}
+        return (matched or set()) | unindexed
+
+    def status(self) -> List[Dict[str, Any]]:
+        result = []
+        for info in self.roots():
+            with self._lock:
+                files, unindexed, total_size = self.conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(indexed = 0), 0), COALESCE(SUM(size), 0) FROM files WHERE root = ?",
+                    (info["root"],),
+                ).fetchone()
+            result.append({**info, "files": files, "unindexed_files": unindexed, "total_size": total_size})
+        return result
+
+
+trigram_index = TrigramIndex()
+content_index_watcher = IndexWatcher(trigram_index)
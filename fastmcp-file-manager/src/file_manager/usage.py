@@ -0,0 +1,183 @@
+"""
+Directory size aggregation (du-style) for the disk_usage tool.
+
+Each directory is read once with os.scandir, recording what sits directly
+in it: the bytes, count and newest mtime of its files, and its subfolder
+names. Those per-directory scans are cached and validated by the folder's
+own (device, inode, mtime): creating, deleting or renaming anything inside a
+folder bumps its mtime, so a later walk of an unchanged hierarchy costs one
+stat() per directory instead of one per file, and drilling into a subfolder
+reuses the scans of the walk that covered it.
+
+Sizes are apparent sizes (st_size, as du --apparent-size), symlinks are
+counted as entries but not followed, and hard links count once per link.
+A file rewritten in place does not change its folder's mtime; pass
+refresh=True to rescan regardless of the cache.
+"""
+import os
+import heapq
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .metrics import phase
+from .scanner import is_hidden
+
+DEFAULT_CACHE_ENTRIES = 200_000
+SCAN_BATCH_SIZE = 32
+USAGE_SORT_KEYS = ("size", "files", "modified")
+
+
+class DirScan(NamedTuple):
+    """What sits directly in one directory."""
+    bytes: int
+    files: int
+    newest_mtime_ns: int
+    subdirs: Tuple[str, ...]
+
+
+class DirTotals(NamedTuple):
+    """Recursive totals of a directory's subtree."""
+    bytes: int
+    files: int
+    dirs: int
+    newest_mtime_ns: int
+
+
+class UsageCache:
+    """Thread-safe LRU of directory scans keyed by path, validated by the folder's mtime."""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or int(os.environ.get("FILE_MANAGER_USAGE_CACHE_SIZE", DEFAULT_CACHE_ENTRIES))
+        self._entries: "OrderedDict[Tuple[str, bool], Tuple[Tuple[int, int, int], DirScan]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def validator(stat: os.stat_result) -> Tuple[int, int, int]:
+        return (stat.st_dev, stat.st_ino, stat.st_mtime_ns)
+
+    def get(self, key: Tuple[str, bool], stat: os.stat_result) -> Optional[DirScan]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != self.validator(stat):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Tuple[str, bool], stat: os.stat_result, scan: DirScan) -> None:
+        with self._lock:
+            self._entries[key] = (self.validator(stat), scan)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+usage_cache = UsageCache()
+
+
+def _read_directory(path: str, include_hidden: bool) -> DirScan:
+    total = files = newest = 0
+    subdirs = []
+    with os.scandir(path) as iterator:
+        for entry in iterator:
+            if not include_hidden and is_hidden(entry.name):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                    continue
+                stat = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            total += stat.st_size
+            files += 1
+            newest = max(newest, stat.st_mtime_ns)
+    return DirScan(total, files, newest, tuple(subdirs))
+
+
+def scan_directory(path: str, include_hidden: bool = False, refresh: bool = False) -> Optional[Tuple[DirScan, bool]]:
+    """
+    The scan of one directory and whether it came from the cache.
+
+    Returns None when the directory cannot be read. Blocking.
+    """
+    key = (path, include_hidden)
+    try:
+        with phase("stat"):
+            stat = os.stat(path)
+        if not refresh:
+            cached = usage_cache.get(key, stat)
+            if cached is not None:
+                return cached, True
+        with phase("walk"):
+            scan = _read_directory(path, include_hidden)
+    except OSError:
+        return None
+    # A folder changed during the read is caught by its new mtime next time
+    usage_cache.put(key, stat, scan)
+    return scan, False
+
+
+def scan_directories(paths: List[str], include_hidden: bool = False, refresh: bool = False) -> List[Optional[Tuple[DirScan, bool]]]:
+    """scan_directory for a batch of directories (one pool job)."""
+    return [scan_directory(path, include_hidden, refresh) for path in paths]
+
+
+def subtree_totals(scans: Dict[str, DirScan]) -> Dict[str, DirTotals]:
+    """Fold per-directory scans of a whole hierarchy into recursive totals."""
+    totals: Dict[str, DirTotals] = {}
+    # Deepest folders first, so children are always folded before parents
+    for path in sorted(scans, key=lambda p: p.count(os.sep), reverse=True):
+        scan = scans[path]
+        total, files, dirs, newest = scan.bytes, scan.files, 0, scan.newest_mtime_ns
+        for name in scan.subdirs:
+            child = totals.get(os.path.join(path, name))
+            if child is None:
+                continue
+            total += child.bytes
+            files += child.files
+            dirs += child.dirs + 1
+            newest = max(newest, child.newest_mtime_ns)
+        totals[path] = DirTotals(total, files, dirs, newest)
+    return totals
+
+
+def heaviest(
+    totals: Dict[str, DirTotals],
+    root: str,
+    max_depth: int,
+    top_n: int,
+    sort_by: str = "size"
+) -> List[Tuple[str, int, DirTotals]]:
+    """The top_n subtrees at depth 1..max_depth below root as (path, depth, totals)."""
+    if sort_by not in USAGE_SORT_KEYS:
+        raise ValueError(f"Unknown sort key: {sort_by}. Use one of: {', '.join(USAGE_SORT_KEYS)}")
+    index = {"size": 0, "files": 1, "modified": 3}[sort_by]
+    base = root.rstrip(os.sep).count(os.sep)
+    candidates: Iterable[Tuple[str, int, DirTotals]] = (
+        (path, path.count(os.sep) - base, subtree)
+        for path, subtree in totals.items()
+        if path != root
+    )
+    return heapq.nlargest(
+        top_n,
+        (c for c in candidates if c[1] <= max_depth),
+        key=lambda c: c[2][index]
+    )
@@ -10,6 +10,9 @@ import tempfile
 import os
 from pathlib import Path
 import time
+import urllib.error
+import urllib.request
+from urllib.parse import quote
 
 class MCPClient:
     """Simple MCP client for testing stdio transport."""
@@ -61,6 +64,20 @@ class MCPClient:
                 return json.loads(response_line.strip())
         return None
 
+    def initialize(self):
+        """Complete the MCP handshake so tool calls are accepted."""
+        response = self.send_request("initialize", {
+            "protocolVersion": "2024-11-05",
+            "capabilities": {},
+            "clientInfo": {
+                "name": "test-client",
+                "version": "1.0.0"
+            }
+        })
+        self.process.stdin.write(json.dumps({"jsonrpc": "2.0", "method": "notifications/initialized"}) + "\n")
+        self.process.stdin.flush()
+        return response
+
 def test_list_files_and_folders():
     """Test the list_files_and_folders tool."""
     print("=== Testing list_files_and_folders ===")
@@ -224,6 +241,18 @@ def test_search_files():
             print("Content search response:")
             print(json.dumps(response, indent=2))
 
+            # Test an anchored regex: ^ and $ match at every line, not just the file
+            response = client.send_request("tools/call", {
+                "name": "search_files",
+                "arguments": {
+                    "search_path": str(temp_path),
+                    "content_search": r"^\s+return '\w+'$",
+                    "regex": True
+                }
+            })
+            print("Anchored regex search response:")
+            print(json.dumps(response, indent=2))
+
             # Test extension filter
             response = client.send_request("tools/call", {
                 "name": "search_files",
@@ -280,7 +309,9 @@ def test_batch_operations():
             response = client.send_request("tools/call", {
                 "name": "batch_operations",
                 "arguments": {
-                    "operations": operations
+                    "operations": operations,
+                    "concurrency": 4,
+                    "on_error": "continue"
                 }
             })
             print("Batch operations response:")
@@ -361,6 +392,369 @@ def test_resources():
             print("Directory listing resource response:")
             print(json.dumps(response, indent=2))
 
+            # Test batched stats resource (URL-encoded JSON array of paths)
+            paths = quote(json.dumps([str(test_file), str(temp_path / "missing.txt")]))
+            response = client.send_request("resources/read", {
+                "uri": f"file://batch/stats/{paths}"
+            })
+            print("Batched stats resource response:")
+            print(json.dumps(response, indent=2))
+
+        finally:
+            client.stop_server()
+
+def test_metadata_index():
+    """Test build_index, index_status and invalidate_index tools."""
+    print("=== Testing metadata index ===")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+
+        (temp_path / "notes.txt").write_text("indexed notes")
+        (temp_path / "app.py").write_text("print('indexed')")
+        (temp_path / "sub").mkdir()
+        (temp_path / "sub" / "deep.txt").write_text("deep file")
+
+        client = MCPClient(["uv", "run", "file_manager_cli", "serve"])
+        client.start_server()
+
+        try:
+            response = client.send_request("tools/call", {
+                "name": "build_index",
+                "arguments": {
+                    "folder_path": str(temp_path),
+                    "content_index": True
+                }
+            })
+            print("Build index response:")
+            print(json.dumps(response, indent=2))
+
+            # Listing and searching are now answered from the index
+            response = client.send_request("tools/call", {
+                "name": "search_files",
+                "arguments": {
+                    "search_path": str(temp_path),
+                    "extension": ".txt",
+                    "modified_after": "2000-01-01"
+                }
+            })
+            print("Indexed search response:")
+            print(json.dumps(response, indent=2))
+
+            # Literal content searches are narrowed by the trigram index
+            response = client.send_request("tools/call", {
+                "name": "search_files",
+                "arguments": {
+                    "search_path": str(temp_path),
+                    "content_search": "indexed"
+                }
+            })
+            print("Content-indexed search response:")
+            print(json.dumps(response, indent=2))
+
+            response = client.send_request("tools/call", {
+                "name": "index_status",
+                "arguments": {}
+            })
+            print("Index status response:")
+            print(json.dumps(response, indent=2))
+
+            response = client.send_request("tools/call", {
+                "name": "invalidate_index",
+                "arguments": {
+                    "folder_path": str(temp_path)
+                }
+            })
+            print("Invalidate index response:")
+            print(json.dumps(response, indent=2))
+
+        finally:
+            client.stop_server()
+
+def test_index_invalidation():
+    """Test invalidating a content index over many files."""
+    print("=== Testing index invalidation ===")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+
+        for i in range(1000):
+            folder = temp_path / f"part{i % 20}"
+            folder.mkdir(exist_ok=True)
+            (folder / f"file{i}.txt").write_text(f"bulk file {i} " * 200)
+
+        client = MCPClient(["uv", "run", "file_manager_cli", "serve"])
+        client.start_server()
+
+        try:
+            client.initialize()
+            response = client.send_request("tools/call", {
+                "name": "build_index",
+                "arguments": {
+                    "folder_path": str(temp_path),
+                    "content_index": True
+                }
+            })
+            print("Build index response:")
+            print(json.dumps(response, indent=2))
+
+            # The content index builds in the background: wait until it is listed
+            deadline = time.time() + 120
+            while time.time() < deadline:
+                response = client.send_request("tools/call", {
+                    "name": "index_status",
+                    "arguments": {}
+                }, id=2)
+                if response["result"]["structuredContent"]["content_roots"]:
+                    break
+                time.sleep(0.5)
+
+            # Postings are deleted by key, so this stays proportional to the root's size
+            started = time.time()
+            response = client.send_request("tools/call", {
+                "name": "invalidate_index",
+                "arguments": {
+                    "folder_path": str(temp_path)
+                }
+            }, id=2)
+            print(f"Invalidate index response ({time.time() - started:.2f}s for 1000 files):")
+            print(json.dumps(response, indent=2))
+
+            response = client.send_request("tools/call", {
+                "name": "index_status",
+                "arguments": {}
+            }, id=3)
+            print("Index status after invalidation:")
+            print(json.dumps(response, indent=2))
+
+        finally:
+            client.stop_server()
+
+def test_find_duplicates():
+    """Test find_duplicates tool."""
+    print("=== Testing find_duplicates ===")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+
+        (temp_path / "report.txt").write_text("same content")
+        (temp_path / "copy").mkdir()
+        (temp_path / "copy" / "report.txt").write_text("same content")
+        (temp_path / "other.txt").write_text("different content")
+
+        client = MCPClient(["uv", "run", "file_manager_cli", "serve"])
+        client.start_server()
+
+        try:
+            response = client.send_request("tools/call", {
+                "name": "find_duplicates",
+                "arguments": {
+                    "search_path": str(temp_path)
+                }
+            })
+            print("Find duplicates response:")
+            print(json.dumps(response, indent=2))
+
+            # Preview replacing duplicates with hardlinks
+            response = client.send_request("tools/call", {
+                "name": "find_duplicates",
+                "arguments": {
+                    "search_path": str(temp_path),
+                    "action": "hardlink",
+                    "dry_run": True
+                }
+            })
+            print("Hardlink dry run response:")
+            print(json.dumps(response, indent=2))
+
+        finally:
+            client.stop_server()
+
+def test_disk_usage():
+    """Test disk_usage tool."""
+    print("=== Testing disk_usage ===")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+
+        (temp_path / "big" / "nested").mkdir(parents=True)
+        (temp_path / "small").mkdir()
+        (temp_path / "big" / "nested" / "data.bin").write_bytes(b"x" * 50000)
+        (temp_path / "big" / "notes.txt").write_text("disk usage test\n")
+        (temp_path / "small" / "readme.md").write_text("# small\n")
+
+        client = MCPClient(["uv", "run", "file_manager_cli", "serve"])
+        client.start_server()
+
+        try:
+            response = client.send_request("tools/call", {
+                "name": "disk_usage",
+                "arguments": {
+                    "folder_path": str(temp_path),
+                    "max_depth": 2,
+                    "top_n": 5
+                }
+            })
+            print("Disk usage response:")
+            print(json.dumps(response, indent=2))
+
+            # The second walk is answered from cached folder scans
+            response = client.send_request("tools/call", {
+                "name": "disk_usage",
+                "arguments": {
+                    "folder_path": str(temp_path / "big"),
+                    "sort_by": "files"
+                }
+            })
+            print("Cached disk usage response:")
+            print(json.dumps(response, indent=2))
+
+        finally:
+            client.stop_server()
+
+def test_compact_output():
+    """Test compact and columnar output formats."""
+    print("=== Testing compact output ===")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+
+        (temp_path / "docs").mkdir()
+        (temp_path / "docs" / "readme.md").write_text("# compact test\n")
+        (temp_path / "notes.txt").write_text("compact output test\n")
+
+        client = MCPClient(["uv", "run", "file_manager_cli", "serve"])
+        client.start_server()
+
+        try:
+            # Table rows referring to a deduplicated folder list
+            response = client.send_request("tools/call", {
+                "name": "list_files_and_folders",
+                "arguments": {
+                    "folder_path": str(temp_path),
+                    "recursive": True,
+                    "output_format": "compact"
+                }
+            })
+            print("Compact list response:")
+            print(json.dumps(response, indent=2))
+
+            # One array per column, with humanized sizes and dates
+            response = client.send_request("tools/call", {
+                "name": "list_files_and_folders",
+                "arguments": {
+                    "folder_path": str(temp_path),
+                    "recursive": True,
+                    "output_format": "columnar",
+                    "human_readable": True
+                }
+            })
+            print("Columnar list response:")
+            print(json.dumps(response, indent=2))
+
+            response = client.send_request("tools/call", {
+                "name": "search_files",
+                "arguments": {
+                    "search_path": str(temp_path),
+                    "content_search": "compact",
+                    "output_format": "compact"
+                }
+            })
+            print("Compact search response:")
+            print(json.dumps(response, indent=2))
+
+        finally:
+            client.stop_server()
+
+def test_http_server():
+    """Test serving over streamable HTTP with the default options."""
+    print("=== Testing HTTP server ===")
+
+    # No extra flags: every HTTP option falls back to its default
+    client = MCPClient(["uv", "run", "file_manager_cli", "serve", "--transport", "http"])
+    client.start_server()
+
+    try:
+        request = urllib.request.Request(
+            "http://127.0.0.1:8000/mcp",
+            data=json.dumps({
+                "jsonrpc": "2.0",
+                "id": 1,
+                "method": "initialize",
+                "params": {
+                    "protocolVersion": "2024-11-05",
+                    "capabilities": {},
+                    "clientInfo": {"name": "test-client", "version": "1.0.0"}
+                }
+            }).encode(),
+            headers={
+                "Content-Type": "application/json",
+                "Accept": "application/json, text/event-stream"
+            }
+        )
+        deadline = time.time() + 30
+        while True:
+            if client.process.poll() is not None:
+                print("HTTP server exited early:")
+                print(client.process.stderr.read())
+                return
+            try:
+                with urllib.request.urlopen(request, timeout=5) as response:
+                    print("HTTP initialize response:")
+                    print(response.read().decode())
+                break
+            except urllib.error.URLError:
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.5)
+
+    finally:
+        client.stop_server()
+
+def test_server_metrics():
+    """Test server_metrics tool and metrics resources."""
+    print("=== Testing server_metrics ===")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+
+        (temp_path / "notes.txt").write_text("metrics test\n")
+        (temp_path / "data.json").write_text('{"key": "value"}')
+
+        client = MCPClient(["uv", "run", "file_manager_cli", "serve"])
+        client.start_server()
+
+        try:
+            # Make a few calls so there is something to report
+            client.send_request("tools/call", {
+                "name": "list_files_and_folders",
+                "arguments": {
+                    "folder_path": str(temp_path),
+                    "recursive": True
+                }
+            })
+            client.send_request("tools/call", {
+                "name": "get_file_stats",
+                "arguments": {
+                    "file_path": str(temp_path / "notes.txt")
+                }
+            })
+
+            response = client.send_request("tools/call", {
+                "name": "server_metrics",
+                "arguments": {
+                    "recent": 5
+                }
+            })
+            print("Server metrics response:")
+            print(json.dumps(response, indent=2))
+
+            response = client.send_request("resources/read", {
+                "uri": "metrics://prometheus"
+            })
+            print("Prometheus metrics resource response:")
+            print(json.dumps(response, indent=2))
+
         finally:
             client.stop_server()
 
@@ -445,6 +839,13 @@ if __name__ == "__main__":
     test_batch_operations()
     test_organize_by_extension()
     test_resources()
+    test_metadata_index()
+    test_index_invalidation()
+    test_find_duplicates()
+    test_disk_usage()
+    test_compact_output()
+    test_http_server()
+    test_server_metrics()
     test_error_handling()
 
     print("=" * 50)
@@ -1,7 +1,7 @@
 import os
+import sys
 from langchain.document_loaders import GitLoader
 from langchain.text_splitter import Language, RecursiveCharacterTextSplitter
-from langchain.embeddings import OpenAIEmbeddings
 from langchain.vectorstores import Chroma
 from langchain.chat_models import ChatOpenAI
 from langchain.chains import ConversationalRetrievalChain
@@ -10,10 +10,15 @@ from typing import List, Optional
 import tempfile
 import shutil
 
+# embedding_service sits at the repository root, shared with pdfs_qna_llm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embedding_service import create_embeddings
+
 
 class CodeBaseQATool:
     def __init__(self):
-        self.embeddings = OpenAIEmbeddings()
+        # Batched, cached and rate-limit aware; unchanged files are not re-embedded
+        self.embeddings = create_embeddings()
         self.llm = ChatOpenAI(temprature=0,model="gpt-4")
         self.memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
         self.vector_store = None
@@ -0,0 +1,127 @@
+import os
+import re
+import math
+import time
+import threading
+from collections import OrderedDict
+
+ANSWER_CACHE_SIZE = int(os.environ.get("ANSWER_CACHE_SIZE", 1000))
+ANSWER_CACHE_TTL = float(os.environ.get("ANSWER_CACHE_TTL", 3600))
+# Cosine similarity above which two questions count as the same; unset disables semantic matching
+SEMANTIC_THRESHOLD = float(os.environ["ANSWER_CACHE_SEMANTIC_THRESHOLD"]) if os.environ.get("ANSWER_CACHE_SEMANTIC_THRESHOLD") else None
+
+
+def normalize_question(question):
+    question = re.sub(r"\s+", " ", question.strip().lower())
+    return question.rstrip("?!. ")
+
+
+def cosine(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class AnswerCache:
+    """
+    Answers of the QA chain keyed by normalized question and retrieved chunks.
+
+    A hit needs the same retrieved chunk set as the cached answer, so an
+    answer is only reused for the context it was generated from. With a
+    semantic threshold, a differently worded question over the same chunks
+    also hits when its embedding is close enough to a cached question's.
+    Entries expire after ttl seconds, the least recently used are evicted
+    beyond max_entries, and invalidate() drops everything (on re-ingest).
+    """
+
+    def __init__(self, max_entries=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL, semantic_threshold=SEMANTIC_THRESHOLD):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.semantic_threshold = semantic_threshold
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def semantic(self):
+        return self.semantic_threshold is not None
+
+    def _expired(self, entry, now):
+        return self.ttl is not None and now - entry["stored_at"] > self.ttl
+
+    def get(self, question, chunk_ids, question_vector=None):
+        chunks = frozenset(chunk_ids)
+        key = (normalize_question(question), chunks)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, now):
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+            if entry is None and self.semantic and question_vector is not None:
+                entry = self._nearest(chunks, question_vector, now)
+                if entry is not None:
+                    self.semantic_hits += 1
+            elif entry is not None:
+                self.hits += 1
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(entry["key"])
+            return entry["answer"]
+
+    def _nearest(self, chunks, question_vector, now):
+        best, best_score = None, self.semantic_threshold
+        for key, entry in list(self._entries.items()):
+            if key[1] != chunks or entry["vector"] is None:
+                continue
+            if self._expired(entry, now):
+                del self._entries[key]
+                self.expired += 1
+                continue
+            score = cosine(question_vector, entry["vector"])
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def put(self, question, chunk_ids, answer, question_vector=None):
+        key = (normalize_question(question), frozenset(chunk_ids))
+        with self._lock:
+            self._entries[key] = {
+                "key": key,
+                "answer": answer,
+                "vector": question_vector,
+                "stored_at": time.monotonic(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "semantic_threshold": self.semantic_threshold,
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.semantic_hits) / lookups, 3) if lookups else 0.0,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -1,14 +1,22 @@
 import streamlit as st
-from agent_chain import create_agent_chain 
 from query_processor import Query
 
-query = Query()
+
+@st.cache_resource(show_spinner="Loading PDFs...")
+def get_query(folder):
+    # One warm vector store and chain per folder, shared by every session and rerun
+    return Query(folder)
+
 
 st.set_page_config(page_title="Doc Searcher", page_icon=":robot:")
 st.header("Query PDF Source")
+folder = st.sidebar.text_input("PDF folder", "pdfs")
+query = get_query(folder)
 form_input = st.text_input("Enter Query")
 submit = st.button("Generate")
 
 if submit :
-    st.write(query.chain(form_input))
-    # st.write(form_input)
+    st.write(query.get_llm_response(form_input))
+
+st.sidebar.caption("Answer cache")
+st.sidebar.json(query.answer_cache.stats(), expanded=False)
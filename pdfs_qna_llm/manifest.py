@@ -0,0 +1,78 @@
+import os
+import json
+import hashlib
+
+MANIFEST_NAME = "ingest_manifest.json"
+MANIFEST_VERSION = 1
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def file_sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+class IngestManifest:
+    """
+    Record of what is already embedded in the persisted vector store.
+
+    files maps each PDF name to its content hash (plus size and mtime, so
+    unchanged files are not re-hashed), and documents maps each content hash
+    to the ids of its chunks in the collection. Vectors are stored once per
+    distinct content: a copied or renamed PDF reuses the existing chunks.
+    """
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, MANIFEST_NAME)
+        self.files = {}
+        self.documents = {}
+        self.embedding_model = None
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return self
+        with open(self.path) as f:
+            data = json.load(f)
+        if data.get("version") == MANIFEST_VERSION:
+            self.files = data.get("files", {})
+            self.documents = data.get("documents", {})
+            self.embedding_model = data.get("embedding_model")
+        return self
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({
+                "version": MANIFEST_VERSION,
+                "embedding_model": self.embedding_model,
+                "files": self.files,
+                "documents": self.documents
+            }, f, indent=2)
+        # Replace in one step so a crash never leaves a half-written manifest
+        os.replace(temp_path, self.path)
+
+    def reset(self):
+        self.files = {}
+        self.documents = {}
+
+    def scan(self, folder):
+        """Content hash of every PDF in folder, re-hashing only files whose size or mtime changed."""
+        files = {}
+        for name in sorted(os.listdir(folder)):
+            if not name.endswith(".pdf"):
+                continue
+            stat = os.stat(os.path.join(folder, name))
+            known = self.files.get(name)
+            if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+                digest = known["sha256"]
+            else:
+                digest = file_sha256(os.path.join(folder, name))
+            files[name] = {"sha256": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        return files
+
+    def chunk_ids(self, digest, count):
+        return [f"{digest}-{i}" for i in range(count)]
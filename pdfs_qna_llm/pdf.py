@@ -1,40 +1,128 @@
 import os
+import sys
 from dotenv import load_dotenv
 
-from langchain.document_loaders import PyPDFLoader
-from langchain.text_splitter import CharacterTextSplitter
-from langchain.embeddings import OpenAIEmbeddings
-from langchain.chains.question_answering import load_qa_chain
-from langchain.chat_models import ChatOpenAI
 from langchain.vectorstores import Chroma
-import chromadb
+
+from manifest import IngestManifest
+from pdf_pipeline import EMBED_BATCH_SIZE, PARSE_WORKERS, batched, parse_pdfs
+
+# embedding_service sits at the repository root, shared with github_qa
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embedding_service import create_embeddings
+
+COLLECTION_NAME = "pdfs"
 
 class Pdf:
-    def __init__(self,folder):
+    def __init__(self,folder,persist_directory=None,workers=PARSE_WORKERS,batch_size=EMBED_BATCH_SIZE):
         self.folder=folder
-    
-    def load_persist_pdfs(self) -> Chroma :
-        documents = []
-        for file in os.listdir(self.folder) :
-            if file.endswith(".pdf") :
-                pdf_path = os.path.join(self.folder,file)
-                loader = PyPDFLoader(pdf_path)
-                documents.extend(loader.load())
-        if documents.count==0 :
-            print("No pdf document found in given folder")
+        self.persist_directory = persist_directory or os.path.join(folder, ".chroma")
+        self.manifest = IngestManifest(self.persist_directory)
+        self.workers = workers
+        self.batch_size = batch_size
+        self.embeddings = create_embeddings()
+        self.last_sync = {"added": [], "removed": [], "unchanged": 0}
 
-        print("All PDF loaded")
-        text_splitter = CharacterTextSplitter(chunk_size=1000,chunk_overlap=10)
-        chunked_documents = text_splitter.split_documents(documents)
-        client = chromadb.Client()
-        if client.list_collections():
-            consent_colections = client.create_collection("consent_collection")
-        else :
-            print("Collection already exists")
-        vectordb = Chroma.from_documents(
-            documents=chunked_documents,
-            embedding=OpenAIEmbeddings(),
-            persist_directory=os.getcwd()
+    def open_store(self) -> Chroma :
+        # Reopens the collection persisted by earlier runs (or creates it)
+        return Chroma(
+            collection_name=COLLECTION_NAME,
+            embedding_function=self.embeddings,
+            persist_directory=self.persist_directory
         )
-        vectordb.persist()
-        return vectordb
\ No newline at end of file
+
+    def folder_state(self) :
+        """Cheap fingerprint of the folder's PDFs (names, sizes, mtimes) for change detection."""
+        state = []
+        for name in sorted(os.listdir(self.folder)):
+            if name.endswith(".pdf") :
+                stat = os.stat(os.path.join(self.folder,name))
+                state.append((name, stat.st_size, stat.st_mtime_ns))
+        return tuple(state)
+
+    def store_lost(self, vectordb) :
+        """True when the manifest records chunks but none of them are in the store."""
+        # PDFs without any text have no chunks, so an empty store alone proves nothing
+        recorded = [doc["chunk_ids"][0] for doc in self.manifest.documents.values() if doc["chunk_ids"]]
+        return bool(recorded) and not vectordb.get(ids=recorded, include=[])["ids"]
+
+    def load_persist_pdfs(self, vectordb=None) -> Chroma :
+        """
+        Bring the persisted vector store in line with the PDFs in the folder.
+
+        Only new or changed PDFs (by content hash) are parsed, chunked and
+        embedded; the chunks of PDFs that were removed are deleted. PDFs are
+        parsed across a process pool and their chunks embedded in batches as
+        they arrive, so memory is bounded by the batch size, not the corpus.
+        Pass the store returned by an earlier call to refresh it in place.
+        """
+        vectordb = vectordb or self.open_store()
+        self.manifest.load()
+        if self.store_lost(vectordb) :
+            # The store was deleted behind the manifest's back, start over
+            self.manifest.reset()
+        if self.manifest.embedding_model not in (None, self.embeddings.model) :
+            # Vectors of another model are not comparable with the new ones
+            print(f"Embedding model changed from {self.manifest.embedding_model}, re-ingesting")
+            vectordb.delete_collection()
+            vectordb = self.open_store()
+            self.manifest.reset()
+        self.manifest.embedding_model = self.embeddings.model
+
+        files = self.manifest.scan(self.folder)
+        if not files :
+            print("No pdf document found in given folder")
+        sources = {}
+        for name, info in files.items():
+            sources.setdefault(info["sha256"], name)
+
+        removed = [digest for digest in self.manifest.documents if digest not in sources]
+        for digest in removed :
+            chunk_ids = self.manifest.documents.pop(digest)["chunk_ids"]
+            if chunk_ids :
+                vectordb.delete(ids=chunk_ids)
+        self.manifest.files = {name: info for name, info in files.items() if info["sha256"] in self.manifest.documents}
+        self.manifest.save()
+
+        added = []
+        pending = {
+            os.path.join(self.folder,name): (digest, name)
+            for digest, name in sources.items() if digest not in self.manifest.documents
+        }
+        batch = []
+        finished = []
+        for pdf_path, chunks in parse_pdfs(pending, self.workers):
+            digest, name = pending[pdf_path]
+            if isinstance(chunks, Exception) :
+                print(f"Failed to parse {name}: {chunks}")
+                continue
+            chunk_ids = self.manifest.chunk_ids(digest, len(chunks))
+            for chunk, chunk_id in zip(chunks, chunk_ids):
+                chunk.metadata["sha256"] = digest
+                chunk.metadata["chunk_id"] = chunk_id
+                batch.append((chunk, chunk_id))
+            finished.append((digest, name, chunk_ids))
+            if len(batch) >= self.batch_size :
+                self.embed_batch(vectordb, batch, finished, files)
+                added.extend(name for _, name, _ in finished)
+                batch, finished = [], []
+        if finished :
+            self.embed_batch(vectordb, batch, finished, files)
+            added.extend(name for _, name, _ in finished)
+
+        unchanged = len(sources)-len(pending)
+        self.last_sync = {"added": added, "removed": removed, "unchanged": unchanged}
+        print(f"PDFs added: {len(added)}, removed: {len(removed)}, unchanged: {unchanged}")
+        if added or removed :
+            vectordb.persist()
+        return vectordb
+
+    def embed_batch(self, vectordb, batch, finished, files) :
+        """Embed a batch of chunks, then record the PDFs it completed in the manifest."""
+        for part in batched(batch, self.batch_size):
+            vectordb.add_documents([chunk for chunk, _ in part], ids=[chunk_id for _, chunk_id in part])
+        for digest, name, chunk_ids in finished:
+            self.manifest.documents[digest] = {"source": name, "chunk_ids": chunk_ids}
+            self.manifest.files.update({n: i for n, i in files.items() if i["sha256"]==digest})
+        # Saved per batch so an interrupted run resumes where it stopped
+        self.manifest.save()
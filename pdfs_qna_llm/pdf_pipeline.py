@@ -0,0 +1,76 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from langchain.document_loaders import PyPDFLoader
+from langchain.text_splitter import CharacterTextSplitter
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 10
+PARSE_WORKERS = int(os.environ.get("PDF_PARSE_WORKERS", os.cpu_count() or 1))
+EMBED_BATCH_SIZE = int(os.environ.get("PDF_EMBED_BATCH_SIZE", 1024))
+
+
+def iter_pages(pdf_path):
+    loader = PyPDFLoader(pdf_path)
+    # lazy_load parses one page at a time where the installed langchain has it
+    if hasattr(loader, "lazy_load"):
+        return loader.lazy_load()
+    return iter(loader.load())
+
+
+def iter_chunks(pdf_path, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """Chunks of a PDF, splitting each page as it is parsed."""
+    text_splitter = CharacterTextSplitter(chunk_size=chunk_size,chunk_overlap=chunk_overlap)
+    for page in iter_pages(pdf_path):
+        yield from text_splitter.split_documents([page])
+
+
+def split_pdf(pdf_path, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """Worker entry point: every chunk of one PDF."""
+    return list(iter_chunks(pdf_path, chunk_size, chunk_overlap))
+
+
+def parse_pdfs(pdf_paths, workers=PARSE_WORKERS, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """
+    Yield (pdf_path, chunks) as PDFs finish parsing, or (pdf_path, error).
+
+    PDFs are parsed and split across a process pool; at most two per worker
+    are in flight, so memory holds a few documents rather than the corpus.
+    With one worker (or one PDF) they are parsed in this process.
+    """
+    pdf_paths = list(pdf_paths)
+    workers = min(workers, len(pdf_paths))
+    if workers <= 1:
+        for pdf_path in pdf_paths:
+            try:
+                yield pdf_path, split_pdf(pdf_path, chunk_size, chunk_overlap)
+            except Exception as e:
+                yield pdf_path, e
+        return
+
+    remaining = iter(pdf_paths)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = {}
+
+        def submit(batch):
+            for pdf_path in batch:
+                in_flight[executor.submit(split_pdf, pdf_path, chunk_size, chunk_overlap)] = pdf_path
+
+        submit(islice(remaining, workers * 2))
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                pdf_path = in_flight.pop(future)
+                error = future.exception()
+                yield pdf_path, error if error is not None else future.result()
+            submit(islice(remaining, len(done)))
+
+
+def batched(items, size):
+    items = iter(items)
+    while True:
+        batch = list(islice(items, size))
+        if not batch:
+            return
+        yield batch
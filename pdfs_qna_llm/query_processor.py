@@ -1,18 +1,61 @@
+import time
+import hashlib
+import threading
+
 from pdf import Pdf
+from answer_cache import AnswerCache
 from agent_chain import create_agent_chain 
 
+# How often a query checks the folder for added, changed or removed PDFs
+REFRESH_INTERVAL = 5.0
+
 class Query:
     def __init__(self,folder=None):
         if folder==None :
             folder = 'pdfs'
-        pdf = Pdf(folder)
-        self.vectordb =  pdf.load_persist_pdfs()
+        self.folder = folder
+        self.pdf = Pdf(folder)
+        self._lock = threading.Lock()
+        self.folder_state = self.pdf.folder_state()
+        self.vectordb =  self.pdf.load_persist_pdfs()
         self.chain = create_agent_chain()
+        self.answer_cache = AnswerCache()
+        self.checked_at = time.monotonic()
+
+    def refresh(self):
+        """Ingest what changed in the folder since the last check (at most every REFRESH_INTERVAL)."""
+        if time.monotonic() - self.checked_at < REFRESH_INTERVAL :
+            return False
+        with self._lock:
+            if time.monotonic() - self.checked_at < REFRESH_INTERVAL :
+                return False
+            state = self.pdf.folder_state()
+            changed = state != self.folder_state
+            if changed :
+                # Incremental: only new or changed PDFs are embedded, into the same warm store
+                self.vectordb = self.pdf.load_persist_pdfs(self.vectordb)
+                self.folder_state = state
+                self.answer_cache.invalidate()
+            self.checked_at = time.monotonic()
+            return changed
         
     def get_llm_response(self,query):
-        matching_docs = self.vectordb.similarity_search(query)
-        answer = self.chain.run(input_documents=matching_docs, question=query)
+        self.refresh()
+        question_vector = None
+        if self.answer_cache.semantic :
+            # One embedding serves both the semantic cache lookup and the retrieval
+            question_vector = self.pdf.embeddings.embed_query(query)
+            matching_docs = self.vectordb.similarity_search_by_vector(question_vector)
+        else :
+            matching_docs = self.vectordb.similarity_search(query)
+        chunk_ids = [self.chunk_id(doc) for doc in matching_docs]
+        answer = self.answer_cache.get(query, chunk_ids, question_vector)
+        if answer is None :
+            answer = self.chain.run(input_documents=matching_docs, question=query)
+            self.answer_cache.put(query, chunk_ids, answer, question_vector)
         return answer
 
-
-    
\ No newline at end of file
+    @staticmethod
+    def chunk_id(doc):
+        # Chunks ingested before chunk ids were stored are identified by their text
+        return doc.metadata.get("chunk_id") or hashlib.sha256(doc.page_content.encode()).hexdigest()